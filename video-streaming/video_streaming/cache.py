@@ -1,11 +1,20 @@
 import json
+import time
+import threading
 import redis
+from collections import OrderedDict
 from video_streaming import settings
+from video_streaming.core.constants.cache_keys import CacheKeysTemplates
 
 
 class RedisCache:
+    """keys that include HASH_FIELD_SEPARATOR are saved as fields of a
+    hash, e.g. all keys of a job in the job hash, the TTL is set for
+    the whole hash by every change of its fields
+    """
     TIMEOUT_SECOND = settings.REDIS_TIMEOUT_SECOND
     REDIS_URL = settings.REDIS_URL
+    HASH_FIELD_SEPARATOR = CacheKeysTemplates.HASH_FIELD_SEPARATOR
 
     def __init__(self, url=None, **kwargs):
         url = url or self.REDIS_URL
@@ -14,25 +23,85 @@ class RedisCache:
             charset="utf-8",
             decode_responses=True,
             **kwargs)
+        # lua script -> registered script, to run them by EVALSHA
+        self._scripts = {}
+
+    @classmethod
+    def split_key(cls, key) -> tuple[str, str] or None:
+        """returns name of the hash and the field of the key, or None
+        when the key is not a field of a hash
+        """
+        name, separator, field = key.partition(cls.HASH_FIELD_SEPARATOR)
+        if separator:
+            return name, field
+        return None
 
     def set(self, key, value, timeout: int = None):
         if timeout is None:
             timeout = self.TIMEOUT_SECOND
-        self.redis.set(key, value, ex=timeout)
+        hash_field = self.split_key(key)
+        if hash_field is None:
+            self.redis.set(key, value, ex=timeout)
+            return
+        name, field = hash_field
+        pipe = self.redis.pipeline()
+        pipe.hset(name, field, value)
+        pipe.expire(name, timeout)
+        pipe.execute()
+
+    def set_many(self, items: dict, timeout: int = None):
+        """set many keys by one pipeline, same as set"""
+        if timeout is None:
+            timeout = self.TIMEOUT_SECOND
+        pipe = self.redis.pipeline()
+        for key, value in items.items():
+            hash_field = self.split_key(key)
+            if hash_field is None:
+                pipe.set(key, value, ex=timeout)
+                continue
+            name, field = hash_field
+            pipe.hset(name, field, value)
+            pipe.expire(name, timeout)
+        pipe.execute()
 
-    def incr(self, key, amount: int = 1):
-        self.redis.incr(key, amount=amount)
+    def incr(self, key, amount: int = 1) -> int:
+        """returns the value after the increment"""
+        hash_field = self.split_key(key)
+        if hash_field is None:
+            return self.redis.incr(key, amount=amount)
+        name, field = hash_field
+        pipe = self.redis.pipeline()
+        pipe.hincrby(name, field, amount=amount)
+        pipe.expire(name, self.TIMEOUT_SECOND)
+        return pipe.execute()[0]
 
     def incr_by_float(self, key, amount: float = 1.0):
-        self.redis.incrbyfloat(key, amount=amount)
+        hash_field = self.split_key(key)
+        if hash_field is None:
+            self.redis.incrbyfloat(key, amount=amount)
+            return
+        name, field = hash_field
+        pipe = self.redis.pipeline()
+        pipe.hincrbyfloat(name, field, amount=amount)
+        pipe.expire(name, self.TIMEOUT_SECOND)
+        pipe.execute()
 
-    def get(self, key, decode=True):
+    def hset(self, key, field, value, timeout: int = None):
+        if timeout is None:
+            timeout = self.TIMEOUT_SECOND
+        pipe = self.redis.pipeline()
+        pipe.hset(key, field, value)
+        pipe.expire(key, timeout)
+        pipe.execute()
+
+    def hgetall(self, key) -> dict:
         """
-        set decode to False when value stored as a string
+        returns fields and values of the hash as strings
         """
-        value = self.redis.get(key)
-        if not decode:
-            return value
+        return self.redis.hgetall(key)
+
+    @staticmethod
+    def decode(value):
         if value is not None:
             try:
                 return json.loads(value)
@@ -41,7 +110,235 @@ class RedisCache:
                 print(e)
         return value
 
+    def get(self, key, decode=True):
+        """
+        set decode to False when value stored as a string
+        """
+        hash_field = self.split_key(key)
+        if hash_field is None:
+            value = self.redis.get(key)
+        else:
+            value = self.redis.hget(*hash_field)
+        if not decode:
+            return value
+        return self.decode(value)
+
+    def get_snapshot(self, name) -> 'HashSnapshot':
+        """read all fields of the hash by one HGETALL, to get them
+        by the keys without more round trips
+        """
+        return HashSnapshot(self, name, self.redis.hgetall(name))
+
+    def get_snapshots(self, *name) -> list['HashSnapshot']:
+        """read many hashes by one pipeline of HGETALL, the snapshots
+        are in the order of the names
+        """
+        pipe = self.redis.pipeline()
+        for item in name:
+            pipe.hgetall(item)
+        return [
+            HashSnapshot(self, item, fields)
+            for item, fields in zip(name, pipe.execute())]
+
+    def run_script(self, script: str, keys: list, args: list):
+        """run a lua script atomically, the script is loaded once and
+        then it's called by its sha
+        """
+        registered = self._scripts.get(script)
+        if registered is None:
+            registered = self._scripts[script] = \
+                self.redis.register_script(script)
+        return registered(keys=keys, args=args)
+
+    def publish(self, channel, message) -> int:
+        """returns number of the subscribers that received it"""
+        return self.redis.publish(channel, message)
+
+    def pipeline(self) -> redis.client.Pipeline:
+        """a pipeline of the raw commands, the keys are not routed
+        to the hashes
+        """
+        return self.redis.pipeline()
+
+    def pubsub(self, **kwargs) -> redis.client.PubSub:
+        return self.redis.pubsub(**kwargs)
+
     def delete(self, *key):
-        return self.redis.delete(*key)
+        pipe = self.redis.pipeline()
+        for item in key:
+            hash_field = self.split_key(item)
+            if hash_field is None:
+                pipe.delete(item)
+            else:
+                pipe.hdel(*hash_field)
+        return sum(pipe.execute())
+
+
+class HashSnapshot:
+    """values of a hash that have been read at once, get method is the
+    same as RedisCache.get for the keys of the hash
+
+    the keys outside of the hash are read by the cache, unless
+    allow_fallback is False, then KeyError is raised for them
+    """
+
+    def __init__(self,
+                 cache: 'RedisCache or AsyncRedisCache',
+                 name: str,
+                 fields: dict,
+                 allow_fallback: bool = True):
+        self.cache = cache
+        self.name = name
+        self.fields = fields
+        self.allow_fallback = allow_fallback
+
+    def get(self, key, decode=True):
+        hash_field = self.cache.split_key(key)
+        if hash_field is None or hash_field[0] != self.name:
+            # it's not a key of the hash
+            if not self.allow_fallback:
+                raise KeyError(key)
+            return self.cache.get(key, decode=decode)
+        value = self.fields.get(hash_field[1])
+        if not decode:
+            return value
+        return self.cache.decode(value)
+
+
+class AsyncRedisCache:
+    """asyncio counterpart of RedisCache by aioredis, for the asyncio
+    gRPC server, the keys are the same as RedisCache
+
+    the snapshots of it are without fallback, get of a key outside of
+    their hash raises KeyError, because get of it is a coroutine
+    """
+    TIMEOUT_SECOND = settings.REDIS_TIMEOUT_SECOND
+    REDIS_URL = settings.REDIS_URL
+
+    split_key = RedisCache.split_key
+    decode = staticmethod(RedisCache.decode)
+
+    def __init__(self, url=None, **kwargs):
+        # aioredis is just required by the asyncio gRPC server
+        import aioredis
+        url = url or self.REDIS_URL
+        self.redis = aioredis.from_url(
+            url,
+            encoding="utf-8",
+            decode_responses=True,
+            **kwargs)
+
+    async def set(self, key, value, timeout: int = None):
+        if timeout is None:
+            timeout = self.TIMEOUT_SECOND
+        hash_field = self.split_key(key)
+        if hash_field is None:
+            await self.redis.set(key, value, ex=timeout)
+            return
+        name, field = hash_field
+        pipe = self.redis.pipeline()
+        pipe.hset(name, field, value)
+        pipe.expire(name, timeout)
+        await pipe.execute()
+
+    async def get(self, key, decode=True):
+        """
+        set decode to False when value stored as a string
+        """
+        hash_field = self.split_key(key)
+        if hash_field is None:
+            value = await self.redis.get(key)
+        else:
+            value = await self.redis.hget(*hash_field)
+        if not decode:
+            return value
+        return self.decode(value)
+
+    async def get_snapshot(self, name) -> 'HashSnapshot':
+        return HashSnapshot(
+            self,
+            name,
+            await self.redis.hgetall(name),
+            allow_fallback=False)
+
+    async def get_snapshots(self, *name) -> list['HashSnapshot']:
+        """read many hashes by one pipeline of HGETALL, the snapshots
+        are in the order of the names
+        """
+        pipe = self.redis.pipeline()
+        for item in name:
+            pipe.hgetall(item)
+        return [
+            HashSnapshot(self, item, fields, allow_fallback=False)
+            for item, fields in zip(name, await pipe.execute())]
+
+    async def publish(self, channel, message) -> int:
+        """returns number of the subscribers that received it"""
+        return await self.redis.publish(channel, message)
+
+    def pubsub(self, **kwargs):
+        return self.redis.pubsub(**kwargs)
+
+    async def delete(self, *key):
+        pipe = self.redis.pipeline()
+        for item in key:
+            hash_field = self.split_key(item)
+            if hash_field is None:
+                pipe.delete(item)
+            else:
+                pipe.hdel(*hash_field)
+        return sum(await pipe.execute())
+
+    async def close(self):
+        await self.redis.close()
+
+
+class MemoryCache:
+    """a bounded in-process cache with TTL, for immutable values of
+    Redis that are read many times, e.g. JOB_DETAILS
+
+    the least recently used keys are removed when it's full, hits and
+    misses are counted to monitor it
+    """
+
+    def __init__(self, max_size: int, timeout: float):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        # key -> (expire time, value)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """returns None when the key is not cached or it's expired"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.timeout, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
 
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
 
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                size=len(self._items),
+                hits=self.hits,
+                misses=self.misses)
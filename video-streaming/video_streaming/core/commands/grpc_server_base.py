@@ -1,5 +1,6 @@
 import grpc
 import time
+import asyncio
 from concurrent import futures
 from grpc_health.v1 import health_pb2
 from .base import BaseCommand
@@ -43,12 +44,22 @@ class GrpcServerBaseCommand(BaseCommand):
             required=False,
             help='Server certificate key.'
         )
+        parser.add_argument(
+            '--aio',
+            action='store_true',
+            help='Serve by asyncio (grpc.aio) instead of a thread pool.'
+        )
 
     def create_server(self):
         server = grpc.server(futures.ThreadPoolExecutor(
             max_workers=self._MAX_WORKERS))
         return server
 
+    def create_aio_server(self):
+        # RPCs are coroutines of one event loop, no thread per RPC
+        server = grpc.aio.server()
+        return server
+
     def config_ssl(self, args, server):
         ca_cert = None
         client_auth = False
@@ -81,3 +92,14 @@ class GrpcServerBaseCommand(BaseCommand):
                                 health_pb2.HealthCheckResponse.NOT_SERVING)
             time.sleep(10)
             server.stop(1)
+
+    async def set_aio_server_status(self, server, health_servicer):
+        await health_servicer.set(
+            '', health_pb2.HealthCheckResponse.SERVING)
+        try:
+            await server.wait_for_termination()
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            await health_servicer.set(
+                '', health_pb2.HealthCheckResponse.NOT_SERVING)
+            await asyncio.sleep(10)
+            await server.stop(1)
@@ -1,3 +1,4 @@
 from .errors import *
 from .status import *
 from .cache_keys import *
+from .cache_scripts import *
@@ -8,6 +8,52 @@ __all__ = [
 class CacheKeysTemplates:
     _PREFIX = "req_"
 
+    # RedisCache saves a key that includes the separator as a field of
+    # a hash, the hash name is before the separator
+    HASH_FIELD_SEPARATOR = "|"
+
+    # hash
+    # all keys of a job are fields of the job hash, to read them by one
+    # HGETALL and expire them by one TTL
+    JOB_HASH = _PREFIX + "h_{request_id}"
+    _JOB = JOB_HASH + HASH_FIELD_SEPARATOR
+
+    # pub/sub channel
+    # to publish revoke signals of jobs and outputs to the workers,
+    # see CancellationBus
+    CANCELLATION_CHANNEL = _PREFIX + "cancellation"
+
+    # pub/sub channel
+    # to notify the watch_jobs streams that the job has been changed,
+    # the message is the request_id
+    JOB_CHANGES_CHANNEL = _PREFIX + "changes_{request_id}"
+
+    # sorted set
+    # indexes of the jobs to list them, members are tracking ids and
+    # scores are the creation times, see JobIndex
+    JOBS_BY_CREATION = _PREFIX + "idx_created"
+    JOBS_BY_REFERENCE = _PREFIX + "idx_ref_{reference_id}"
+    JOBS_BY_STATUS = _PREFIX + "idx_status_{status}"
+
+    # sorted set
+    # the slots of the tenants of a resource, e.g. "encode", members
+    # are the holders of the slots and scores are the end of their
+    # leases, see TenantQuota
+    TENANT_LEASES = _PREFIX + "tenant_leases_{resource}"
+    # hash
+    # the tenant of every holder
+    TENANT_HOLDERS = _PREFIX + "tenant_holders_{resource}"
+    # hash
+    # running slots of every tenant
+    TENANT_RUNNING = _PREFIX + "tenant_running_{resource}"
+    # sorted set
+    # the tenants that have deferred tasks, scores are the time of
+    # their last deferral
+    TENANT_WAITING = _PREFIX + "tenant_waiting_{resource}"
+    # hash
+    # weights of the tenants that have been seen
+    TENANT_WEIGHTS = _PREFIX + "tenant_weights"
+
     PLAYLIST_OUTPUT_ID = "p{number}"
     THUMBNAIL_OUTPUT_ID = "t{number}"
     WATERMARKED_PLAYLIST_OUTPUT_ID = "wp{number}"
@@ -16,106 +62,139 @@ class CacheKeysTemplates:
 
     # dict
     # to save job details
-    JOB_DETAILS = _PREFIX + "job_{request_id}"
+    JOB_DETAILS = _JOB + "job"
 
     # string
     # to save celery result id of the request
-    REQUEST_RESULT_ID = _PREFIX + "result_{request_id}"
+    REQUEST_RESULT_ID = _JOB + "result"
+
+    # string
+    # the primary status that the job is in its index
+    INDEXED_STATUS = _JOB + "indexed_status"
 
     # boolean
     # force stop all tasks of request, and delete all inputs and outputs
-    FORCE_STOP_REQUEST = _PREFIX + "stop_{request_id}"
+    FORCE_STOP_REQUEST = _JOB + "stop"
 
     # boolean
     # force stop one output pip and inc the ready outputs to delete inputs and outputs
-    FORCE_STOP_OUTPUT_REQUEST = _PREFIX + "o_stop_{request_id}_{output_id}"
+    FORCE_STOP_OUTPUT_REQUEST = _JOB + "o_stop_{output_id}"
 
     # dict
     # to save ffprobe data of input video
-    INPUT_FFPROBE_DATA = _PREFIX + "i_ffprobe_{request_id}_{input_number}"
+    INPUT_FFPROBE_DATA = _JOB + "i_ffprobe_{input_number}"
+
+    # dict
+    # CRF bitrates of the video input by the sizes, to plan the per
+    # title representations of the playlists, see PerTitleMixin
+    INPUT_SAMPLE_BITRATES = _JOB + "i_sample_bitrates"
 
     # string
-    INPUT_VIDEO_PATH = _PREFIX + "video_path_{request_id}"
-    INPUT_WATERMARK_PATH = _PREFIX + "watermark_path_{request_id}"
+    INPUT_VIDEO_PATH = _JOB + "video_path"
+    INPUT_WATERMARK_PATH = _JOB + "watermark_path"
+
+    # string
+    # to save local path of a streaming video input, when the tee_input
+    # task has been downloaded it completely
+    INPUT_VIDEO_TEE_PATH = _JOB + "video_tee_path"
 
     # integer
     # to save number of aggregated inputs in inputs_funnel
-    AGGREGATED_INPUTS = _PREFIX + "aggregated_{request_id}"
+    AGGREGATED_INPUTS = _JOB + "aggregated"
+
+    # integer
+    # to save number of finished dependencies of a job graph node
+    # that joins them in inputs_funnel
+    FUNNEL_DEPENDENCIES = _JOB + "funnel_{funnel_id}"
 
     # integer
     # to save number of passed checks
-    PASSED_CHECKS = _PREFIX + "passed_{request_id}"
+    PASSED_CHECKS = _JOB + "passed"
 
     # integer
     # to save number of downloaded inputs
-    READY_INPUTS = _PREFIX + "ready_inputs_{request_id}"
+    READY_INPUTS = _JOB + "ready_inputs"
 
     # integer
     # to save number of processed outputs
-    PROCESSED_OUTPUTS = _PREFIX + "processed_outputs_{request_id}"
+    PROCESSED_OUTPUTS = _JOB + "processed_outputs"
 
     # integer
     # to save number of ready outputs
-    READY_OUTPUTS = _PREFIX + "ready_outputs_{request_id}"
+    READY_OUTPUTS = _JOB + "ready_outputs"
 
     # integer
     # to save number of revoked outputs
-    REVOKED_OUTPUTS = _PREFIX + "revoked_outputs_{request_id}"
+    REVOKED_OUTPUTS = _JOB + "revoked_outputs"
 
     # integer
     # to save number of failed outputs
-    FAILED_OUTPUTS = _PREFIX + "failed_outputs_{request_id}"
+    FAILED_OUTPUTS = _JOB + "failed_outputs"
 
     # save status
 
     # string
     # to save primary status name
-    PRIMARY_STATUS = _PREFIX + "status_{request_id}"
+    PRIMARY_STATUS = _JOB + "status"
 
     # string
     # to save stop reason
-    STOP_REASON = _PREFIX + "stop_reason_{request_id}"
+    STOP_REASON = _JOB + "stop_reason"
 
     # string
     # to save input status name
-    INPUT_STATUS = _PREFIX + "i_status_{request_id}_{input_number}"
+    INPUT_STATUS = _JOB + "i_status_{input_number}"
 
     # string
     # to save output status name
-    OUTPUT_STATUS = _PREFIX + "o_status_{request_id}_{output_id}"
+    OUTPUT_STATUS = _JOB + "o_status_{output_id}"
 
     # progress
 
     # dict
     # to save progress of downloading for every input
-    INPUT_DOWNLOADING_PROGRESS = _PREFIX + "i_down_{request_id}_{input_number}"
+    INPUT_DOWNLOADING_PROGRESS = _JOB + "i_down_{input_number}"
 
     # dict
     # to save progress of processing or uploading for every output
-    OUTPUT_PROGRESS = _PREFIX + "o_progress_{request_id}_{output_id}"
+    OUTPUT_PROGRESS = _JOB + "o_progress_{output_id}"
+
+    # hash
+    # a separate hash, not a field of the job hash
+    # to save processed seconds of every chunk of an output that
+    # has been encoded in chunks, to aggregate them as OUTPUT_PROGRESS
+    OUTPUT_CHUNKS_PROGRESS = _PREFIX + "o_chunks_progress_{request_id}_{output_id}"
 
     # details
 
     # integer
     # to save size of playlist directory
-    OUTPUT_SIZE = _PREFIX + "o_size_{request_id}_{output_id}"
-
-    # usage
+    OUTPUT_SIZE = _JOB + "o_size_{output_id}"
 
     # integer
-    # save video proceeding time
-    OUTPUT_START_PROCESSING_TIME = _PREFIX + "o_start_processing_time_{request_id}_{output_id}"
-    OUTPUT_END_PROCESSING_TIME = _PREFIX + "o_end_processing_time_{request_id}_{output_id}"
+    # to save size of the segments that have been uploaded while
+    # processing the playlist, see SegmentsUploader
+    OUTPUT_UPLOADED_SIZE = _JOB + "o_uploaded_size_{output_id}"
 
-    # list
-    # save cpu usage of output psutil cpu_times
-    OUTPUT_START_CPU_TIMES = _PREFIX + "o_start_cpu_times_{request_id}_{output_id}"
-    OUTPUT_END_CPU_TIMES = _PREFIX + "o_end_cpu_times_{request_id}_{output_id}"
+    # usage
 
     # integer
-    # save memory usage of output using psutil memory rss
-    OUTPUT_START_MEMORY_RSS = _PREFIX + "o_start_memory_rss_{request_id}_{output_id}"
-    OUTPUT_END_MEMORY_RSS = _PREFIX + "o_end_memory_rss_{request_id}_{output_id}"
+    # save video proceeding time
+    OUTPUT_START_PROCESSING_TIME = _JOB + "o_start_processing_time_{output_id}"
+    OUTPUT_END_PROCESSING_TIME = _JOB + "o_end_processing_time_{output_id}"
 
+    # dict
+    # to save resource usage of the ffmpeg process of the output,
+    # see ResourceSampler
+    OUTPUT_RESOURCE_USAGE = _JOB + "o_resource_usage_{output_id}"
 
+    # list of dict
+    # the representations that have been dropped or capped by the
+    # input video, or dropped by per title, see
+    # CreatePlaylistMixin.prune_representations
+    OUTPUT_PRUNED_REPRESENTATIONS = _JOB + "o_pruned_representations_{output_id}"
 
+    # boolean
+    # sampling the video for per title has been failed, so the output
+    # has the requested bitrates, see PerTitleMixin
+    OUTPUT_PER_TITLE_FAILED = _JOB + "o_per_title_failed_{output_id}"
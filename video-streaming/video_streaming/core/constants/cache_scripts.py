@@ -0,0 +1,309 @@
+
+
+__all__ = [
+    'CacheScripts',
+]
+
+
+class CacheScripts:
+    """lua scripts of the state machine of a job, every script is run
+    by RedisCache.run_script as one atomic round trip
+
+    all fields are fields of the job hash ( KEYS[1] ), names of
+    the fields and statuses are passed by ARGV
+    """
+
+    # returns -1 when JOB_DETAILS has been not set, 0 when the current
+    # status is a final status and 1 when the status has been set
+    #
+    # ARGV[1]: field of JOB_DETAILS
+    # ARGV[2]: field of the status
+    # ARGV[3]: the new status
+    # ARGV[4]: TTL of the job hash
+    # ARGV[5]: number of final statuses, the final statuses are next
+    # the rest of ARGV: fields to delete after setting the status
+    SET_STATUS = """
+local job = KEYS[1]
+if redis.call('HEXISTS', job, ARGV[1]) == 0 then
+    return -1
+end
+local total_final = tonumber(ARGV[5])
+local current = redis.call('HGET', job, ARGV[2])
+for i = 6, 5 + total_final do
+    if current == ARGV[i] then
+        return 0
+    end
+end
+redis.call('HSET', job, ARGV[2], ARGV[3])
+for i = 6 + total_final, #ARGV do
+    redis.call('HDEL', job, ARGV[i])
+end
+redis.call('EXPIRE', job, ARGV[4])
+return 1
+"""
+
+    # returns {-1} when JOB_DETAILS has been not set and {0} when the
+    # current status of the output is a final status, otherwise
+    # {1, primary status that has been set or "", is all outputs
+    # finished, is all outputs processed}
+    #
+    # KEYS[2]: OUTPUT_CHUNKS_PROGRESS of the output
+    # ARGV[1]: field of JOB_DETAILS
+    # ARGV[2]: field of the output status
+    # ARGV[3]: the new status
+    # ARGV[4]: TTL of the job hash
+    # ARGV[5]: field of the counter of the new status or "" when the
+    #   status has no counter, outputs are finished by the counters
+    # ARGV[6]: field of OUTPUT_PROGRESS
+    # ARGV[7], ARGV[8]: final statuses of the output,
+    #   'OUTPUT_REVOKED' and 'OUTPUT_FAILED'
+    # ARGV[9]: field of PRIMARY_STATUS
+    # ARGV[10], ARGV[11], ARGV[12]: 'FINISHED', 'REVOKED' and 'FAILED'
+    #   primary statuses
+    # ARGV[13], ARGV[14], ARGV[15], ARGV[16]: fields of READY_OUTPUTS,
+    #   REVOKED_OUTPUTS, FAILED_OUTPUTS and PROCESSED_OUTPUTS
+    SET_OUTPUT_STATUS = """
+local job = KEYS[1]
+if redis.call('HEXISTS', job, ARGV[1]) == 0 then
+    return {-1}
+end
+local current = redis.call('HGET', job, ARGV[2])
+if current == ARGV[7] or current == ARGV[8] then
+    return {0}
+end
+redis.call('HSET', job, ARGV[2], ARGV[3])
+redis.call('EXPIRE', job, ARGV[4])
+if ARGV[5] == '' then
+    return {1, '', 0, 0}
+end
+
+redis.call('HINCRBY', job, ARGV[5], 1)
+-- delete unnecessary data
+redis.call('HDEL', job, ARGV[6])
+redis.call('DEL', KEYS[2])
+
+local function count(field)
+    return tonumber(redis.call('HGET', job, field) or 0)
+end
+local total = cjson.decode(
+    redis.call('HGET', job, ARGV[1]))['total_outputs']
+local ready = count(ARGV[13])
+local revoked = count(ARGV[14])
+local failed = count(ARGV[15])
+local processed = count(ARGV[16])
+
+local is_finished = 0
+local primary_status = ''
+if failed == total then
+    primary_status = ARGV[12]
+elseif revoked == total then
+    primary_status = ARGV[11]
+elseif ready + revoked + failed == total then
+    primary_status = ARGV[10]
+end
+if primary_status ~= '' then
+    is_finished = 1
+    -- to prevent set any status after 'FAILED' or 'REVOKED'
+    local current_primary = redis.call('HGET', job, ARGV[9])
+    if current_primary == ARGV[11] or current_primary == ARGV[12] then
+        primary_status = ''
+    else
+        redis.call('HSET', job, ARGV[9], primary_status)
+    end
+end
+
+local is_processed = 0
+if processed + revoked + failed == total then
+    is_processed = 1
+end
+return {1, primary_status, is_finished, is_processed}
+"""
+
+    # increments a counter of the job and sets the primary status when
+    # the counter reaches to a total of JOB_DETAILS, returns {-1, 0}
+    # when JOB_DETAILS has been not set, otherwise {the counter, 1 if
+    # the primary status has been set else 0}
+    #
+    # ARGV[1]: field of JOB_DETAILS
+    # ARGV[2]: field of the counter
+    # ARGV[3]: TTL of the job hash
+    # ARGV[4]: name of the total in JOB_DETAILS, e.g. 'total_inputs'
+    # ARGV[5]: field of PRIMARY_STATUS
+    # ARGV[6]: the new primary status
+    # the rest of ARGV: the primary statuses that the new one can not
+    #   be set after them
+    INCR_COUNTER = """
+local job = KEYS[1]
+if redis.call('HEXISTS', job, ARGV[1]) == 0 then
+    return {-1, 0}
+end
+local counter = redis.call('HINCRBY', job, ARGV[2], 1)
+redis.call('EXPIRE', job, ARGV[3])
+local total = cjson.decode(redis.call('HGET', job, ARGV[1]))[ARGV[4]]
+if counter == total then
+    local current = redis.call('HGET', job, ARGV[5])
+    for i = 7, #ARGV do
+        if current == ARGV[i] then
+            return {counter, 0}
+        end
+    end
+    redis.call('HSET', job, ARGV[5], ARGV[6])
+    return {counter, 1}
+end
+return {counter, 0}
+"""
+
+    # moves the job to the index of its current primary status, the
+    # status is read from the job hash, so calls of concurrent status
+    # changes end with the last status. returns 0 when JOB_DETAILS or
+    # PRIMARY_STATUS has been not set or the status has no index,
+    # otherwise 1
+    #
+    # KEYS[1]: JOB_HASH
+    # KEYS[2], KEYS[3], ...: JOBS_BY_STATUS of all primary statuses, in
+    #   the order of the statuses in ARGV
+    # ARGV[1]: field of JOB_DETAILS
+    # ARGV[2]: field of PRIMARY_STATUS
+    # ARGV[3]: field of INDEXED_STATUS
+    # ARGV[4]: the request id
+    # ARGV[5]: TTL of the index
+    # ARGV[6]: the jobs that have been created before it are removed
+    #   from the index
+    # ARGV[7], ARGV[8], ...: all primary statuses
+    INDEX_PRIMARY_STATUS = """
+local job = KEYS[1]
+local details = redis.call('HGET', job, ARGV[1])
+local status = redis.call('HGET', job, ARGV[2])
+if not details or not status then
+    return 0
+end
+local indexed = redis.call('HGET', job, ARGV[3])
+if indexed == status then
+    return 1
+end
+-- the index key of a status is in the same position of it
+local index, indexed_index
+for position = 7, #ARGV do
+    if ARGV[position] == status then
+        index = KEYS[position - 5]
+    end
+    if ARGV[position] == indexed then
+        indexed_index = KEYS[position - 5]
+    end
+end
+if not index then
+    return 0
+end
+if indexed_index then
+    redis.call('ZREM', indexed_index, ARGV[4])
+end
+local created_at = cjson.decode(details)['created_at'] or 0
+redis.call('ZADD', index, created_at, ARGV[4])
+redis.call('ZREMRANGEBYSCORE', index, '-inf', '(' .. ARGV[6])
+redis.call('EXPIRE', index, ARGV[5])
+redis.call('HSET', job, ARGV[3], status)
+return 1
+"""
+
+    # acquires a slot of a resource for the tenant, the capacity of the
+    # resource is shared between the running and waiting tenants by
+    # their weights. a tenant can borrow the idle slots, when no other
+    # tenant is waiting. returns 1 when the slot has been acquired or
+    # renewed, otherwise 0 and the tenant is waiting
+    #
+    # KEYS[1], KEYS[2], KEYS[3], KEYS[4]: TENANT_LEASES, TENANT_HOLDERS,
+    #   TENANT_RUNNING and TENANT_WAITING of the resource
+    # KEYS[5]: TENANT_WEIGHTS
+    # ARGV[1]: the tenant
+    # ARGV[2]: the holder of the slot, e.g. id of the task
+    # ARGV[3]: the current time
+    # ARGV[4]: seconds of the lease
+    # ARGV[5]: capacity of the resource
+    # ARGV[6]: maximum slots of a tenant, 0 means no maximum
+    # ARGV[7]: weight of the tenant
+    # ARGV[8]: seconds that a tenant is waiting after its last deferral
+    ACQUIRE_TENANT_SLOT = """
+local leases, holders, running, waiting, weights =
+    KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5]
+local tenant, holder = ARGV[1], ARGV[2]
+local now = tonumber(ARGV[3])
+local capacity = tonumber(ARGV[5])
+local maximum = tonumber(ARGV[6])
+
+-- the slots of the expired leases, e.g. of a killed worker
+for _, expired in ipairs(
+        redis.call('ZRANGEBYSCORE', leases, '-inf', now)) do
+    local owner = redis.call('HGET', holders, expired)
+    if owner and redis.call('HINCRBY', running, owner, -1) <= 0 then
+        redis.call('HDEL', running, owner)
+    end
+    redis.call('HDEL', holders, expired)
+end
+redis.call('ZREMRANGEBYSCORE', leases, '-inf', now)
+redis.call('ZREMRANGEBYSCORE', waiting, '-inf', now - tonumber(ARGV[8]))
+redis.call('HSET', weights, tenant, ARGV[7])
+
+local expires_at = now + tonumber(ARGV[4])
+if redis.call('ZSCORE', leases, holder) then
+    redis.call('ZADD', leases, expires_at, holder)
+    return 1
+end
+
+local active = {[tenant] = true}
+for _, item in ipairs(redis.call('HKEYS', running)) do
+    active[item] = true
+end
+for _, item in ipairs(redis.call('ZRANGE', waiting, 0, -1)) do
+    active[item] = true
+end
+local total_weight = 0
+for item in pairs(active) do
+    total_weight = total_weight +
+        tonumber(redis.call('HGET', weights, item) or 1)
+end
+local share = math.max(
+    1, math.floor(capacity * tonumber(ARGV[7]) / total_weight))
+if maximum > 0 then
+    share = math.min(share, maximum)
+end
+local held = tonumber(redis.call('HGET', running, tenant) or 0)
+
+local granted = false
+if redis.call('ZCARD', leases) < capacity then
+    if held < share then
+        granted = true
+    else
+        local others = redis.call('ZCARD', waiting)
+        if redis.call('ZSCORE', waiting, tenant) then
+            others = others - 1
+        end
+        granted = others == 0 and (maximum == 0 or held < maximum)
+    end
+end
+if not granted then
+    redis.call('ZADD', waiting, now, tenant)
+    return 0
+end
+redis.call('ZADD', leases, expires_at, holder)
+redis.call('HSET', holders, holder, tenant)
+redis.call('HINCRBY', running, tenant, 1)
+return 1
+"""
+
+    # releases a slot that ACQUIRE_TENANT_SLOT has been acquired,
+    # returns 0 when its lease has been expired, otherwise 1
+    #
+    # KEYS[1], KEYS[2], KEYS[3]: TENANT_LEASES, TENANT_HOLDERS and
+    #   TENANT_RUNNING of the resource
+    # ARGV[1]: the holder of the slot
+    RELEASE_TENANT_SLOT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+local tenant = redis.call('HGET', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+if tenant and redis.call('HINCRBY', KEYS[3], tenant, -1) <= 0 then
+    redis.call('HDEL', KEYS[3], tenant)
+end
+return 1
+"""
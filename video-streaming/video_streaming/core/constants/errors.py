@@ -45,6 +45,11 @@ class ErrorMessages:
     INPUT_TYPE_IS_REQUIRED = "input type is required."
     JOB_DETAILS_NOT_FOUND = "job details not found."
     WAITING_FOR_AGGREGATE_INPUTS = "waiting for aggregate inputs."
+    JOB_HAS_BEEN_STOPPED = "job has been failed or revoked."
+    CHUNK_PATH_IS_REQUIRED = "chunk_path is required."
+    CHUNKS_DIRECTORY_IS_REQUIRED = "chunks_directory is required."
+    SOME_CHUNKS_ARE_NOT_ENCODED = "some chunks have not been encoded."
+    OUTPUT_HAS_BEEN_FAILED = "output has been failed."
 
     # gRPC
     INTERNAL_ERROR = "internal server error"
@@ -57,6 +62,7 @@ class ErrorMessages:
     JOB_IS_REVOKED = "job is revoked"
     JOB_IS_FINISHED = "job is finished"
     NO_WATERMARK_TO_USE = "no watermark to use"
+    PAGE_TOKEN_IS_NOT_VALID = "page token is not valid"
 
 
 class ErrorCodes:
@@ -72,3 +78,4 @@ class ErrorCodes:
     JOB_IS_REVOKED = 1007
     JOB_IS_FINISHED = 1008
     NO_WATERMARK_TO_USE = 1009
+    PAGE_TOKEN_IS_NOT_VALID = 1010
@@ -107,6 +107,16 @@ class StopReason:
     FAILED_CREATE_PLAYLIST = "FAILED_CREATE_PLAYLIST"
     INPUT_VIDEO_SIZE_CAN_NOT_BE_ZERO = "INPUT_VIDEO_SIZE_CAN_NOT_BE_ZERO"
     REPRESENTATION_NEEDS_BOTH_SIZE_AND_BITRATE = "REPRESENTATION_NEEDS_BOTH_SIZE_AND_BITRATE"
+    FAILED_SPLIT_INPUT_TO_CHUNKS = "FAILED_SPLIT_INPUT_TO_CHUNKS"
+
+    # EncodePlaylistChunkTask
+    FAILED_ENCODE_PLAYLIST_CHUNK = "FAILED_ENCODE_PLAYLIST_CHUNK"
+
+    # StitchPlaylistChunksTask
+    FAILED_STITCH_PLAYLIST_CHUNKS = "FAILED_STITCH_PLAYLIST_CHUNKS"
+
+    # EncodeSharedRenditionsTask
+    FAILED_ENCODE_SHARED_RENDITIONS = "FAILED_ENCODE_SHARED_RENDITIONS"
 
     # UploadDirectoryTask
     FAILED_UPLOAD_DIRECTORY = "FAILED_UPLOAD_DIRECTORY"
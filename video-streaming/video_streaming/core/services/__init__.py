@@ -1,6 +1,16 @@
 from .s3 import S3Service
+from .input_cache import InputCache
+from .cancellation_bus import CancellationBus
+from .job_index import JobIndex
+from .cpu_slots import CpuSlots
+from .tenant_quota import TenantQuota
 
 
 __all__ = [
-    'S3Service'
+    'S3Service',
+    'InputCache',
+    'CancellationBus',
+    'JobIndex',
+    'CpuSlots',
+    'TenantQuota'
 ]
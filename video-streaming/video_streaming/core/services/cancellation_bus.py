@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from video_streaming.cache import RedisCache
+from video_streaming.core.constants.cache_keys import CacheKeysTemplates
+
+
+class CancellationBus:
+    """push revoke signals of jobs and outputs to the workers by Redis
+    pub/sub, to kill their running ffmpeg processes immediately
+
+    the gRPC server publishes the signals after setting the force stop
+    keys, every worker process runs one subscriber thread that keeps
+    the cancelled jobs and outputs on memory and kills the registered
+    processes of them.
+
+    the force stop keys are checked when a process is registered and
+    after every (re)subscribing, to not miss the signals that have been
+    published when the worker was not subscribed
+    """
+
+    CHANNEL = CacheKeysTemplates.CANCELLATION_CHANNEL
+    # seconds to wait before subscribing again after an error
+    RECONNECT_INTERVAL = 1.0
+    # maximum of cancelled jobs and outputs that are kept on memory,
+    # the older ones are still in the force stop keys
+    MAX_CANCELLED = 10000
+
+    def __init__(self, cache: RedisCache = None):
+        self.cache = cache or RedisCache()
+        self._lock = threading.Lock()
+        # (request_id, output_id) -> None, output_id is None when the
+        # whole job is cancelled
+        self._cancelled = OrderedDict()
+        # id of the process -> (process, request_id, output_ids)
+        self._processes = {}
+        # the subscriber of the worker process, see _ensure_subscriber
+        self._subscriber_pid = None
+
+    def publish(self, request_id: str, output_id: str = None):
+        self.cache.publish(
+            self.CHANNEL,
+            json.dumps(dict(request_id=request_id, output_id=output_id)))
+
+    def is_cancelled(self,
+                     request_id: str,
+                     output_ids: list[str]) -> bool:
+        """a shared process is cancelled when all of its outputs
+        are cancelled
+        """
+        with self._lock:
+            return self._is_cancelled(request_id, output_ids)
+
+    def _is_cancelled(self, request_id, output_ids) -> bool:
+        if (request_id, None) in self._cancelled:
+            return True
+        return None not in output_ids and all(
+            (request_id, output_id) in self._cancelled
+            for output_id in output_ids)
+
+    def _is_forced_to_stop(self, request_id, output_ids) -> bool:
+        """check the force stop keys, same as is_cancelled"""
+        if self.cache.get(CacheKeysTemplates.FORCE_STOP_REQUEST.format(
+                request_id=request_id)):
+            return True
+        return None not in output_ids and all(
+            self.cache.get(
+                CacheKeysTemplates.FORCE_STOP_OUTPUT_REQUEST.format(
+                    request_id=request_id,
+                    output_id=output_id))
+            for output_id in output_ids)
+
+    def register(self,
+                 process,
+                 request_id: str,
+                 output_ids: list[str]) -> bool:
+        """register a running process of the outputs to kill it by
+        the revoke signals, returns True when the process has been
+        killed because it's already cancelled
+        """
+        self._ensure_subscriber()
+        with self._lock:
+            # the processes that have been exited
+            for key, (item, _, _) in list(self._processes.items()):
+                if item.poll() is not None:
+                    del self._processes[key]
+            self._processes[id(process)] = (
+                process, request_id, output_ids)
+            is_cancelled = self._is_cancelled(request_id, output_ids)
+        if is_cancelled or self._is_forced_to_stop(request_id, output_ids):
+            self._kill(process)
+            return True
+        return False
+
+    def unregister(self, process):
+        with self._lock:
+            self._processes.pop(id(process), None)
+
+    @staticmethod
+    def _kill(process):
+        try:
+            process.kill()
+        except Exception as e:
+            print(e)
+
+    def _ensure_subscriber(self):
+        """start the subscriber thread once for every worker process,
+        the threads are not inherited by the forked processes
+        """
+        with self._lock:
+            if self._subscriber_pid == os.getpid():
+                return
+            self._subscriber_pid = os.getpid()
+        threading.Thread(target=self._subscribe, daemon=True).start()
+
+    def _subscribe(self):
+        while True:
+            try:
+                pubsub = self.cache.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CHANNEL)
+                self._check_registered()
+                for message in pubsub.listen():
+                    self._on_message(message)
+            except Exception as e:
+                # TODO notify developer
+                print(e)
+                time.sleep(self.RECONNECT_INTERVAL)
+
+    def _check_registered(self):
+        """kill the registered processes that have been cancelled
+        before subscribing
+        """
+        with self._lock:
+            processes = list(self._processes.values())
+        for process, request_id, output_ids in processes:
+            if self._is_forced_to_stop(request_id, output_ids):
+                self._kill(process)
+
+    def _on_message(self, message: dict):
+        signal: dict = json.loads(message['data'])
+        to_kill = []
+        with self._lock:
+            self._cancelled[
+                (signal['request_id'], signal['output_id'])] = None
+            while len(self._cancelled) > self.MAX_CANCELLED:
+                self._cancelled.popitem(last=False)
+            for process, request_id, output_ids in \
+                    self._processes.values():
+                if self._is_cancelled(request_id, output_ids):
+                    to_kill.append(process)
+        for process in to_kill:
+            self._kill(process)
@@ -0,0 +1,138 @@
+import os
+import math
+import time
+import fcntl
+import tempfile
+from contextlib import contextmanager
+from video_streaming import settings
+
+
+class CpuSlots:
+    """node-level slots of the CPUs, that are shared between the ffmpeg
+    processes of all workers of the node, to not run more encoders than
+    the CPUs and thrash them
+
+    every slot is a lock file, a task locks as many slots as its cost
+    before running ffmpeg and unlocks them after it. the locks of a
+    killed process are released by the kernel, so the slots are never
+    leaked. the slots are collected by one task at a time, by holding
+    the turn lock, so a task with a high cost is not starved by the
+    tasks with a low cost
+    """
+
+    DIRECTORY = settings.CPU_SLOTS_DIR or os.path.join(
+        tempfile.gettempdir(), "cpu_slots")
+    TOTAL = settings.CPU_SLOTS or os.cpu_count() or 1
+    WAIT_TIMEOUT = settings.CPU_SLOTS_WAIT_TIMEOUT
+
+    TURN_LOCK_FILENAME = "turn.lock"
+    SLOT_LOCK_FILENAME = "slot_{number}.lock"
+    # seconds between tries to get a lock, to not block the process
+    LOCK_INTERVAL = 0.1
+    # the pixels of a 1080p frame are encoded by a slot
+    PIXELS_PER_SLOT = 1920 * 1080
+
+    def __init__(self,
+                 directory: str = None,
+                 total: int = None,
+                 wait_timeout: float = None):
+        self.directory = directory or self.DIRECTORY
+        self.total = total or self.TOTAL
+        self.wait_timeout = self.WAIT_TIMEOUT if wait_timeout is None \
+            else wait_timeout
+
+    def cost(self,
+             input_size: tuple[int, int],
+             output_sizes: list[tuple[int, int]]) -> int:
+        """slots of a ffmpeg process that decodes the input once and
+        scales and encodes it to every output size
+        """
+        pixels = math.prod(input_size) + sum(
+            math.prod(size) for size in output_sizes)
+        return min(
+            max(1, math.ceil(pixels / self.PIXELS_PER_SLOT)),
+            self.total)
+
+    def _open_lock_file(self, filename: str):
+        os.makedirs(self.directory, exist_ok=True)
+        return open(os.path.join(self.directory, filename), 'a')
+
+    @staticmethod
+    def _try_lock(lock_file) -> bool:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    @staticmethod
+    def _unlock(lock_files: list):
+        for lock_file in lock_files:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _wait_turn(self, deadline: float):
+        """returns the locked turn file, or None after the deadline"""
+        turn = self._open_lock_file(self.TURN_LOCK_FILENAME)
+        # a blocking flock blocks all green threads of a gevent
+        # worker, so it's tried until getting the lock
+        while not self._try_lock(turn):
+            if time.monotonic() >= deadline:
+                turn.close()
+                return None
+            time.sleep(self.LOCK_INTERVAL)
+        return turn
+
+    def acquire(self, cost: int, timeout: float = None) -> None or list:
+        """lock the slots of the cost, returns the locked files of the
+        slots or None when they have been not free until the timeout
+        """
+        cost = min(max(1, cost), self.total)
+        deadline = time.monotonic() + (
+            self.wait_timeout if timeout is None else timeout)
+        turn = self._wait_turn(deadline)
+        if turn is None:
+            return None
+        # locked files of the slots by their numbers
+        slots: dict = {}
+        try:
+            while True:
+                for number in range(self.total):
+                    if len(slots) == cost:
+                        return list(slots.values())
+                    if number in slots:
+                        continue
+                    slot = self._open_lock_file(
+                        self.SLOT_LOCK_FILENAME.format(number=number))
+                    if self._try_lock(slot):
+                        slots[number] = slot
+                    else:
+                        slot.close()
+                if len(slots) == cost:
+                    return list(slots.values())
+                # the collected slots are kept while holding the turn,
+                # other processes just release their slots until the
+                # end of the turn
+                if time.monotonic() >= deadline:
+                    self._unlock(list(slots.values()))
+                    return None
+                time.sleep(self.LOCK_INTERVAL)
+        finally:
+            self._unlock([turn])
+
+    def release(self, slots: list):
+        self._unlock(slots)
+
+    @contextmanager
+    def hold(self, cost: int, timeout: float = None):
+        """yields the number of the granted slots, 0 when they have
+        been not free until the timeout
+        """
+        slots = self.acquire(cost, timeout=timeout)
+        if slots is None:
+            yield 0
+            return
+        try:
+            yield len(slots)
+        finally:
+            self.release(slots)
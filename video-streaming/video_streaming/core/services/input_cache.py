@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+from contextlib import contextmanager
+from video_streaming import settings
+
+
+class InputCache:
+    """a node-local cache of downloaded inputs that is shared between
+    the jobs, objects are addressed by bucket, key and ETag
+
+    an input of a job is a hardlink ( or symlink on another file
+    system ) to the cached object. the job that is using an object is
+    a reference of it, objects without any reference will be evicted
+    by LRU when the cache size is more than max_size.
+
+    the index of objects is a json file, all changes of it are
+    serialized between the workers by a file lock
+    """
+
+    DIRECTORY = settings.INPUT_CACHE_DIR or os.path.join(
+        settings.TMP_DOWNLOADED_DIR or "", "inputs_cache")
+    MAX_SIZE = settings.INPUT_CACHE_MAX_SIZE
+
+    INDEX_FILENAME = "index.json"
+    INDEX_LOCK_FILENAME = "index.lock"
+    OBJECTS_DIRECTORY = "objects"
+    OBJECT_LOCK_SUFFIX = ".lock"
+    # seconds between tries to get a lock, to not block the process
+    LOCK_INTERVAL = 0.1
+
+    def __init__(self, directory: str = None, max_size: int = None):
+        self.directory = directory or self.DIRECTORY
+        self.max_size = self.MAX_SIZE if max_size is None else max_size
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def get_object_id(bucket: str, key: str, etag: str) -> str:
+        return hashlib.sha256(
+            "\0".join((bucket, key, etag)).encode()).hexdigest()
+
+    def _object_path(self, object_id: str) -> str:
+        return os.path.join(
+            self.directory,
+            self.OBJECTS_DIRECTORY,
+            object_id)
+
+    @contextmanager
+    def _file_lock(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as lock_file:
+            # a blocking flock blocks all green threads of a gevent
+            # worker, so it's tried until getting the lock
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    time.sleep(self.LOCK_INTERVAL)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def object_lock(self, object_id: str):
+        """to download an object once, when many workers need it"""
+        return self._file_lock(
+            self._object_path(object_id) + self.OBJECT_LOCK_SUFFIX)
+
+    @contextmanager
+    def _index(self):
+        """yields the index to change it, while it's locked"""
+        with self._file_lock(
+                os.path.join(self.directory, self.INDEX_LOCK_FILENAME)):
+            index_path = os.path.join(self.directory, self.INDEX_FILENAME)
+            try:
+                with open(index_path) as index_file:
+                    index: dict = json.load(index_file)
+            except (FileNotFoundError, ValueError):
+                index = {}
+            yield index
+            tmp_path = index_path + ".tmp"
+            with open(tmp_path, 'w') as index_file:
+                json.dump(index, index_file)
+            os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def _link(source: str, destination: str, symlink: bool = True):
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            os.link(source, destination)
+        except OSError:
+            # e.g. cache directory is on another file system
+            if symlink:
+                os.symlink(source, destination)
+            else:
+                shutil.copyfile(source, destination)
+
+    def link(self,
+             object_id: str,
+             request_id: str,
+             input_path: str) -> bool:
+        """link the cached object to the input path of the job,
+        returns False when the object is not cached
+        """
+        with self._index() as index:
+            entry: dict = index.get(object_id)
+            object_path = self._object_path(object_id)
+            if entry is None or not os.path.isfile(object_path):
+                index.pop(object_id, None)
+                return False
+            self._link(object_path, input_path)
+            entry['refs'][request_id] = input_path
+            entry['last_used'] = time.time()
+            return True
+
+    def add(self,
+            object_id: str,
+            request_id: str,
+            input_path: str):
+        """add the downloaded input of the job to the cache"""
+        object_path = self._object_path(object_id)
+        with self._index() as index:
+            # the input of the job will be deleted, so the object
+            # can not be a symlink to it
+            self._link(input_path, object_path, symlink=False)
+            index[object_id] = dict(
+                size=os.path.getsize(object_path),
+                last_used=time.time(),
+                refs={request_id: input_path})
+            self._evict(index)
+
+    def release(self, request_id: str):
+        """remove the references of the job, when its inputs are
+        going to be deleted
+        """
+        if not os.path.isdir(self.directory):
+            return
+        with self._index() as index:
+            for entry in index.values():
+                entry['refs'].pop(request_id, None)
+            self._evict(index)
+
+    def _evict(self, index: dict):
+        total_size = sum(entry['size'] for entry in index.values())
+        for object_id, entry in sorted(
+                index.items(),
+                key=lambda item: item[1]['last_used']):
+            if total_size <= self.max_size:
+                break
+            # the references of stopped jobs that could not
+            # release them, are not in use
+            if any(os.path.lexists(path)
+                   for path in entry['refs'].values()):
+                continue
+            try:
+                os.remove(self._object_path(object_id))
+            except FileNotFoundError:
+                pass
+            del index[object_id]
+            total_size -= entry['size']
@@ -0,0 +1,202 @@
+import time
+from video_streaming.cache import RedisCache
+from video_streaming.core.constants.cache_keys import CacheKeysTemplates
+from video_streaming.core.constants.cache_scripts import CacheScripts
+from video_streaming.core.constants.status import PrimaryStatus
+
+
+class JobIndex:
+    """sorted sets of the tracking ids of the jobs by their creation
+    time, to list the jobs by reference_id, primary status and creation
+    time without scanning the keys
+
+    the gRPC server adds the jobs to the indexes by creating them, and
+    the workers move them between the status indexes by every change
+    of the primary status. the jobs are kept in the indexes for
+    REDIS_TIMEOUT_SECOND after their creation, the expired jobs that
+    are found by listing are removed from the indexes
+    """
+
+    CREATION_INDEX = CacheKeysTemplates.JOBS_BY_CREATION
+    # the statuses are appended to it
+    STATUS_INDEX_PREFIX = CacheKeysTemplates.JOBS_BY_STATUS.format(
+        status="")
+    # the status indexes are declared as keys of the scripts
+    PRIMARY_STATUSES: tuple[str] = tuple(
+        value for name, value in vars(PrimaryStatus).items()
+        if not name.startswith('_'))
+
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+
+    def __init__(self, cache: RedisCache = None):
+        self.cache = cache or RedisCache()
+
+    @staticmethod
+    def reference_index(reference_id: str) -> str:
+        return CacheKeysTemplates.JOBS_BY_REFERENCE.format(
+            reference_id=reference_id)
+
+    def status_index(self, status: str) -> str:
+        return self.STATUS_INDEX_PREFIX + status
+
+    def _min_created_at(self) -> float:
+        return time.time() - self.cache.TIMEOUT_SECOND
+
+    def add(self, jobs: dict[str, dict], status: str):
+        """add the new jobs to the indexes by one pipeline, jobs is
+        JOB_DETAILS of every request_id, status is their first
+        primary status
+        """
+        if not jobs:
+            return
+        timeout = self.cache.TIMEOUT_SECOND
+        min_created_at = self._min_created_at()
+        indexes: set[str] = {
+            self.CREATION_INDEX,
+            self.status_index(status)}
+        pipe = self.cache.pipeline()
+        for request_id, job_details in jobs.items():
+            created_at: float = job_details['created_at']
+            pipe.zadd(self.CREATION_INDEX, {request_id: created_at})
+            pipe.zadd(self.status_index(status), {request_id: created_at})
+            if job_details['reference_id']:
+                index = self.reference_index(job_details['reference_id'])
+                pipe.zadd(index, {request_id: created_at})
+                indexes.add(index)
+            pipe.hset(
+                CacheKeysTemplates.JOB_HASH.format(request_id=request_id),
+                self.cache.split_key(CacheKeysTemplates.INDEXED_STATUS.
+                                     format(request_id=request_id))[1],
+                status)
+        for index in indexes:
+            pipe.zremrangebyscore(index, '-inf', f'({min_created_at}')
+            pipe.expire(index, timeout)
+        pipe.execute()
+
+    def index_status(self, request_id: str) -> int:
+        """move the job to the index of its current primary status"""
+
+        def field(key_template: str) -> str:
+            return self.cache.split_key(getattr(
+                CacheKeysTemplates, key_template).format(
+                request_id=request_id))[1]
+
+        return self.cache.run_script(
+            CacheScripts.INDEX_PRIMARY_STATUS,
+            keys=[
+                CacheKeysTemplates.JOB_HASH.format(request_id=request_id),
+                *map(self.status_index, self.PRIMARY_STATUSES)],
+            args=[
+                field("JOB_DETAILS"),
+                field("PRIMARY_STATUS"),
+                field("INDEXED_STATUS"),
+                request_id,
+                self.cache.TIMEOUT_SECOND,
+                self._min_created_at(),
+                *self.PRIMARY_STATUSES])
+
+    def remove(self, request_ids: list[str], *indexes: str):
+        """remove the expired jobs from the creation index and the
+        given indexes
+        """
+        if not request_ids:
+            return
+        pipe = self.cache.pipeline()
+        for index in {self.CREATION_INDEX, *indexes}:
+            pipe.zrem(index, *request_ids)
+        pipe.execute()
+
+    @staticmethod
+    def page_token(created_at: float, request_id: str) -> str:
+        return f"{created_at!r}:{request_id}"
+
+    @staticmethod
+    def parse_page_token(page_token: str) -> tuple[float, str]:
+        """raises ValueError when the token is not valid"""
+        created_at, separator, request_id = page_token.partition(":")
+        if not separator or not request_id:
+            raise ValueError(page_token)
+        return float(created_at), request_id
+
+    def query(self,
+              reference_id: str = None,
+              statuses: list[str] = None,
+              created_after: float = None,
+              created_before: float = None,
+              page_size: int = None,
+              page_token: str = None
+              ) -> tuple[list[tuple[str, float]], list[str], str or None]:
+        """returns the jobs of a page as (request_id, created_at) from
+        the newest to the oldest, the indexes that have been read and
+        the token of the next page. the jobs are not checked to be
+        existed, they can be expired.
+
+        the jobs of a reference_id are read by its own index and they
+        are filtered by the statuses, a reference_id has a few jobs.
+        the statuses indexes are merged, otherwise the creation index
+        is read.
+        """
+        page_size = min(
+            page_size or self.DEFAULT_PAGE_SIZE,
+            self.MAX_PAGE_SIZE)
+        maximum = created_before if created_before else '+inf'
+        after: tuple[float, str] or None = None
+        if page_token:
+            after = self.parse_page_token(page_token)
+            maximum = after[0]
+        minimum = created_after if created_after else '-inf'
+
+        limit: int or None = page_size + 1
+        if reference_id:
+            indexes = [self.reference_index(reference_id)]
+            if statuses:
+                # filtered by their statuses, the whole range is read
+                limit = None
+        elif statuses:
+            indexes = [self.status_index(status) for status in statuses]
+        else:
+            indexes = [self.CREATION_INDEX]
+
+        pipe = self.cache.pipeline()
+        for index in indexes:
+            if limit is None:
+                pipe.zrevrangebyscore(
+                    index, maximum, minimum, withscores=True)
+            else:
+                # the jobs of the page token's time are read again, to
+                # skip them by the request id
+                pipe.zrevrangebyscore(
+                    index, maximum, minimum, start=0,
+                    num=limit + (1 if after else 0), withscores=True)
+        # newest to oldest, the same order as the sorted sets
+        candidates: list[tuple[str, float]] = sorted(
+            {item for items in pipe.execute() for item in items},
+            key=lambda item: (item[1], item[0]),
+            reverse=True)
+        if after:
+            candidates = [
+                (request_id, created_at)
+                for request_id, created_at in candidates
+                if created_at < after[0] or request_id < after[1]]
+        if limit is None:
+            candidates = self._filter_statuses(candidates, statuses)
+        if len(candidates) <= page_size:
+            return candidates, indexes, None
+        candidates = candidates[:page_size]
+        return candidates, indexes, self.page_token(
+            candidates[-1][1], candidates[-1][0])
+
+    def _filter_statuses(
+            self,
+            candidates: list[tuple[str, float]],
+            statuses: list[str]) -> list[tuple[str, float]]:
+        pipe = self.cache.pipeline()
+        for request_id, _ in candidates:
+            pipe.hget(*self.cache.split_key(
+                CacheKeysTemplates.PRIMARY_STATUS.format(
+                    request_id=request_id)))
+        return [
+            candidate for candidate, status in zip(
+                candidates, pipe.execute())
+            if status in statuses]
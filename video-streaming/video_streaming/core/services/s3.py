@@ -1,7 +1,10 @@
 import re
 import os
+import threading
 import traceback
 import boto3
+from concurrent import futures
+from functools import partial
 from typing import Union
 from boto3.s3 import transfer
 from botocore import exceptions as botocore_exceptions
@@ -27,6 +30,8 @@ class S3Service:
     TRANSFER_MAX_IO_QUEUE = settings.S3_TRANSFER_MAX_IO_QUEUE
     TRANSFER_IO_CHUNKSIZE = settings.S3_TRANSFER_IO_CHUNKSIZE
     TRANSFER_USE_THREADS = settings.S3_TRANSFER_USE_THREADS
+    UPLOAD_MAX_IN_FLIGHT = settings.S3_UPLOAD_MAX_IN_FLIGHT
+    PRESIGNED_URL_EXPIRES_IN = settings.S3_PRESIGNED_URL_EXPIRES_IN
 
     # exceptions
     exceptions = s3_exceptions
@@ -77,6 +82,12 @@ class S3Service:
             use_ssl = self.IS_SECURE
         if region_name is None:
             region_name = self.REGION_NAME
+        if config is None:
+            # the connection pool is shared by the uploads in flight
+            # and the threads of the transfer manager
+            config = Config(
+                max_pool_connections=self.UPLOAD_MAX_IN_FLIGHT +
+                self.TRANSFER_MAX_CONCURRENCY)
 
         self.client = boto3.client(
             service_name,
@@ -92,6 +103,12 @@ class S3Service:
         # self.s3_exceptions = self.client.exceptions
         self.transfer_config = transfer_config or self.transfer_config_generator()
 
+        # long-lived uploaders of upload_files, see _get_uploaders
+        self._uploaders_pid = None
+        self._transfer_manager = None
+        self._upload_executor = None
+        self._uploaders_lock = threading.Lock()
+
     def _exception_handler(self, exc: Exception):
         """
         returns None for 404 and 403 errors, raises other exceptions
@@ -201,6 +218,24 @@ class S3Service:
                 pass
             return self._exception_handler(e)
 
+    def generate_presigned_url(
+            self,
+            key: str,
+            bucket_name: str = None,
+            expires_in: int = None) -> None or str:
+        """returns a url to get the object by HTTP, ffmpeg can read
+        it by range requests
+        """
+        try:
+            return self.client.generate_presigned_url(
+                'get_object',
+                Params=dict(
+                    Bucket=bucket_name or self.DEFAULT_BUCKET,
+                    Key=key),
+                ExpiresIn=expires_in or self.PRESIGNED_URL_EXPIRES_IN)
+        except Exception as e:
+            return self._exception_handler(e)
+
     def transfer_config_generator(
             self,
             multipart_threshold: int = None,
@@ -242,6 +277,100 @@ class S3Service:
         except Exception as e:
             return self._exception_handler(e)
 
+    def _get_uploaders(self) -> tuple[
+            transfer.TransferManager, futures.ThreadPoolExecutor]:
+        """returns the transfer manager and the executor of the worker
+        process, they are created once for every process, because
+        the threads are not inherited by the forked processes
+        """
+        with self._uploaders_lock:
+            if self._uploaders_pid != os.getpid():
+                self._transfer_manager = transfer.create_transfer_manager(
+                    self.client,
+                    self.transfer_config)
+                self._upload_executor = futures.ThreadPoolExecutor(
+                    max_workers=self.UPLOAD_MAX_IN_FLIGHT)
+                self._uploaders_pid = os.getpid()
+            return self._transfer_manager, self._upload_executor
 
+    def _upload_small_file(
+            self,
+            key: str,
+            file_path: str,
+            bucket_name: str,
+            extra_args: dict = None):
+        # one PUT request, without the overhead of a transfer
+        with open(file_path, 'rb') as body:
+            self.client.put_object(
+                Bucket=bucket_name,
+                Key=key,
+                Body=body,
+                **(extra_args or {}))
 
+    def upload_files(
+            self,
+            files: list[tuple[str, str, int]],
+            bucket_name: str = None,
+            callback: callable = None,
+            extra_args: dict = None,
+            max_in_flight: int = None):
+        """upload many files concurrently, by a window of max_in_flight
+        uploads in order of the files
+
+        files is a list of (key, file_path, file_size), files smaller
+        than the multipart threshold are uploaded by one PUT request,
+        bigger files are uploaded by the transfer manager.
+        callback is called by the number of the file in the list and
+        the uploaded bytes, calls of callback are thread-safe.
+
+        raises when a file has been not uploaded, also for 403 and 404
+        errors, so the files are uploaded when it returns
+        """
+        bucket_name = bucket_name or self.DEFAULT_BUCKET
+        max_in_flight = max_in_flight or self.UPLOAD_MAX_IN_FLIGHT
+        transfer_manager, executor = self._get_uploaders()
+        progress_lock = threading.Lock()
+
+        def progress(number, bytes_amount):
+            if callback:
+                with progress_lock:
+                    callback(number, bytes_amount)
 
+        def upload(number, key, file_path, file_size):
+            if file_size < self.transfer_config.multipart_threshold:
+                self._upload_small_file(
+                    key,
+                    file_path,
+                    bucket_name,
+                    extra_args=extra_args)
+                progress(number, file_size)
+                return
+            transfer_manager.upload(
+                file_path,
+                bucket_name,
+                key,
+                extra_args=extra_args,
+                subscribers=[transfer.ProgressCallbackInvoker(
+                    partial(progress, number))]
+            ).result()
+
+        in_flight = set()
+        try:
+            for number, (key, file_path, file_size) in enumerate(files):
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = futures.wait(
+                        in_flight,
+                        return_when=futures.FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(executor.submit(
+                    upload, number, key, file_path, file_size))
+            for future in futures.as_completed(in_flight):
+                future.result()
+        except Exception as e:
+            # the uploads that have not been started
+            for future in in_flight:
+                future.cancel()
+            # _exception_handler returns None for 403 and 404 errors
+            self._exception_handler(e)
+            raise
@@ -0,0 +1,214 @@
+import os
+import math
+import time
+import threading
+from video_streaming import settings
+from video_streaming.cache import RedisCache
+from video_streaming.core.constants.cache_keys import CacheKeysTemplates
+from video_streaming.core.constants.cache_scripts import CacheScripts
+
+
+class TenantQuota:
+    """a distributed semaphore of every tenant for the encodes and the
+    downloads, to not let a tenant with many jobs take all workers
+
+    the capacity of a resource is shared between the running and the
+    waiting tenants by their weights, so the tenants are drained
+    proportionally. a task of a tenant that is over its share is
+    deferred to try again later, instead of waiting on a worker. a
+    tenant can borrow the idle slots when no other tenant is waiting.
+
+    the slots are leases that are renewed by one thread of every worker
+    process while the tasks are running, the slots of a killed worker
+    are released by expiring
+    """
+
+    ENCODE = "encode"
+    DOWNLOAD = "download"
+
+    CAPACITIES = {
+        ENCODE: settings.TENANT_ENCODES_CAPACITY,
+        DOWNLOAD: settings.TENANT_DOWNLOADS_CAPACITY}
+    MAXIMUMS = {
+        ENCODE: settings.TENANT_MAX_ENCODES,
+        DOWNLOAD: settings.TENANT_MAX_DOWNLOADS}
+    LEASE = settings.TENANT_SLOT_LEASE
+    # a tenant is waiting until some retries of its deferred tasks
+    WAITING_WINDOW = 2 * settings.TENANT_RETRY_COUNTDOWN
+    DEFAULT_TENANT = settings.DEFAULT_TENANT
+    REFERENCE_SEPARATOR = settings.TENANT_REFERENCE_SEPARATOR
+    DEFAULT_WEIGHT = 1.0
+
+    def __init__(self, cache: RedisCache = None):
+        self.cache = cache or RedisCache()
+        self.weights = self.parse_weights(settings.TENANT_WEIGHTS)
+        self._lock = threading.Lock()
+        # holder -> resource of the slots of this process
+        self._held: dict[str, str] = {}
+        # the renewer of the worker process, see _ensure_renewer
+        self._renewer_pid = None
+
+    @classmethod
+    def get_tenant(cls, tenant_id: str, reference_id: str) -> str:
+        """the tenant of a job, that is derived from its reference_id
+        when it has no tenant_id
+        """
+        if tenant_id:
+            return tenant_id
+        tenant_id, separator, _ = reference_id.partition(
+            cls.REFERENCE_SEPARATOR)
+        if separator and tenant_id:
+            return tenant_id
+        return cls.DEFAULT_TENANT
+
+    @staticmethod
+    def parse_weights(weights: str) -> dict[str, float]:
+        """parse "tenant:weight,tenant:weight" of TENANT_WEIGHTS"""
+        parsed: dict[str, float] = {}
+        for item in weights.split(","):
+            if not item.strip():
+                continue
+            tenant_id, _, weight = item.rpartition(":")
+            parsed[tenant_id.strip()] = float(weight)
+        return parsed
+
+    def get_weight(self, tenant_id: str) -> float:
+        return self.weights.get(tenant_id, self.DEFAULT_WEIGHT)
+
+    def is_enabled(self, resource: str) -> bool:
+        return self.CAPACITIES[resource] > 0
+
+    @staticmethod
+    def _keys(resource: str) -> list[str]:
+        return [
+            getattr(CacheKeysTemplates, template).format(resource=resource)
+            for template in [
+                "TENANT_LEASES",
+                "TENANT_HOLDERS",
+                "TENANT_RUNNING",
+                "TENANT_WAITING"]]
+
+    def get_share(self,
+                  resource: str,
+                  weight: float,
+                  total_weight: float) -> int:
+        """same as the share of ACQUIRE_TENANT_SLOT"""
+        share = max(1, math.floor(
+            self.CAPACITIES[resource] * weight / total_weight))
+        if self.MAXIMUMS[resource] > 0:
+            share = min(share, self.MAXIMUMS[resource])
+        return share
+
+    def acquire(self, resource: str, tenant_id: str, holder: str) -> bool:
+        """returns False when the tenant is over its share, the task
+        should be deferred
+        """
+        if not self.is_enabled(resource):
+            return True
+        acquired = self.cache.run_script(
+            CacheScripts.ACQUIRE_TENANT_SLOT,
+            keys=[
+                *self._keys(resource),
+                CacheKeysTemplates.TENANT_WEIGHTS],
+            args=[
+                tenant_id,
+                holder,
+                time.time(),
+                self.LEASE,
+                self.CAPACITIES[resource],
+                self.MAXIMUMS[resource],
+                self.get_weight(tenant_id),
+                self.WAITING_WINDOW])
+        if not acquired:
+            return False
+        self._ensure_renewer()
+        with self._lock:
+            self._held[holder] = resource
+        return True
+
+    def release(self, resource: str, holder: str):
+        if not self.is_enabled(resource):
+            return
+        with self._lock:
+            self._held.pop(holder, None)
+        self.cache.run_script(
+            CacheScripts.RELEASE_TENANT_SLOT,
+            keys=self._keys(resource)[:3],
+            args=[holder])
+
+    def _ensure_renewer(self):
+        """start the renewer thread once for every worker process,
+        the threads are not inherited by the forked processes
+        """
+        with self._lock:
+            if self._renewer_pid == os.getpid():
+                return
+            self._renewer_pid = os.getpid()
+            self._held.clear()
+        threading.Thread(target=self._renew, daemon=True).start()
+
+    def _renew(self):
+        while True:
+            time.sleep(self.LEASE / 3)
+            with self._lock:
+                held = list(self._held.items())
+            if not held:
+                continue
+            try:
+                expires_at = time.time() + self.LEASE
+                pipe = self.cache.pipeline()
+                for holder, resource in held:
+                    # an expired lease is not renewed, its slot has
+                    # been released
+                    pipe.zadd(
+                        self._keys(resource)[0],
+                        {holder: expires_at},
+                        xx=True)
+                pipe.execute()
+            except Exception as e:
+                # TODO notify developer
+                print(e)
+
+    def get_usage(self, tenant_ids: list[str] = None) -> dict[str, dict]:
+        """running slots, share and waiting of the tenants for every
+        resource, all of the running and waiting tenants when
+        tenant_ids is empty
+        """
+        resources = [self.ENCODE, self.DOWNLOAD]
+        min_waiting_time = time.time() - self.WAITING_WINDOW
+        pipe = self.cache.pipeline()
+        for resource in resources:
+            _, _, running, waiting = self._keys(resource)
+            pipe.hgetall(running)
+            pipe.zrangebyscore(waiting, min_waiting_time, '+inf')
+        pipe.hgetall(CacheKeysTemplates.TENANT_WEIGHTS)
+        *results, weights = pipe.execute()
+
+        # resource -> running slots of the tenants, and waiting tenants
+        running: dict[str, dict] = {}
+        waiting: dict[str, list[str]] = {}
+        for index, resource in enumerate(resources):
+            running[resource] = results[index * 2]
+            waiting[resource] = results[index * 2 + 1]
+        if not tenant_ids:
+            tenant_ids = sorted({
+                tenant_id
+                for resource in resources
+                for tenant_id in [*running[resource], *waiting[resource]]})
+
+        usage: dict[str, dict] = {}
+        for tenant_id in tenant_ids:
+            weight = self.get_weight(tenant_id)
+            usage[tenant_id] = dict(weight=weight)
+            for resource in resources:
+                others = (set(running[resource]) |
+                          set(waiting[resource])) - {tenant_id}
+                total_weight = weight + sum(
+                    float(weights.get(item, self.DEFAULT_WEIGHT))
+                    for item in others)
+                usage[tenant_id][resource] = dict(
+                    running=int(running[resource].get(tenant_id, 0)),
+                    share=self.get_share(resource, weight, total_weight)
+                    if self.is_enabled(resource) else 0,
+                    waiting=tenant_id in waiting[resource])
+        return usage
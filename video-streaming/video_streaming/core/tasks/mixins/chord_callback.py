@@ -11,10 +11,15 @@ class ChordCallbackMixin(object):
         ->
         args=[arg1 ,arg2]
         kwargs=dict(key1=value1, key2=value2, key3=value3, key4=value4)
+
+        the task can be chained to a task that returns a dict too
         """
         if args and len(args):
             args = list(args)
-            for result in args.pop(0):
+            results = args.pop(0)
+            if isinstance(results, dict):
+                results = [results]
+            for result in results or []:
                 if isinstance(result, dict):
                     kwargs.update(result)
             self.request.args = args
@@ -3,11 +3,16 @@ from .check_output_bucket import check_output_bucket
 from .check_output_key import check_output_key
 
 from .download_input import download_input
+from .stream_input import stream_input
+from .tee_input import tee_input
 from .analyze_input import analyze_input
 from .inputs_funnel import inputs_funnel
 
 from .generate_thumbnail import generate_thumbnail
 from .create_playlist import create_playlist
+from .encode_playlist_chunk import encode_playlist_chunk
+from .stitch_playlist_chunks import stitch_playlist_chunks
+from .encode_shared_renditions import encode_shared_renditions
 from .upload_directory import upload_directory
 from .upload_file import upload_file
 
@@ -21,10 +26,15 @@ __all__ = [
     'check_output_bucket',
     'check_output_key',
     'download_input',
+    'stream_input',
+    'tee_input',
     'analyze_input',
     'inputs_funnel',
     'generate_thumbnail',
     'create_playlist',
+    'encode_playlist_chunk',
+    'stitch_playlist_chunks',
+    'encode_shared_renditions',
     'upload_directory',
     'upload_file',
     'call_webhook',
@@ -1,13 +1,9 @@
-import subprocess
-import time
 import ffmpeg
 from abc import ABC
 from pathlib import Path
 from video_streaming.celery import celery_app
-from video_streaming.core.constants import CacheKeysTemplates
 from video_streaming.core.tasks import ChainCallbackMixin
-from video_streaming.ffmpeg.utils import FfmpegCallback, get_time, \
-    time_left
+from video_streaming.ffmpeg.utils import FfmpegCallback, run_command
 from video_streaming.ffmpeg.constants import TASK_DECORATOR_KWARGS
 from .base import BaseStreamingTask
 from .mixins import AddWatermarkMixin
@@ -26,9 +22,7 @@ class AddWatermarkTask(
         super().save_failed(request_id, output_id)
         # set failed status for all watermarked outputs tasks
 
-        job_details: dict = self.cache.get(
-            CacheKeysTemplates.JOB_DETAILS.format(
-                request_id=request_id))
+        job_details: dict = self.get_job_details(request_id)
         if job_details:
             for output_id in set(job_details['watermarked_outputs_ids']):
                 super().save_failed(request_id, output_id)
@@ -52,10 +46,12 @@ def add_watermark(
         output_path: str = None,
         s3_output_key: str = None,
         request_id: str = None,
-        output_id: str = None
+        output_id: str = None,
+        **kwargs
         ) -> dict:
 
     # TODO add overlay params
+    # kwargs has the "deferrals" of hold_cpu_slots
 
     self.check_add_watermark_requirements(
         request_id=request_id,
@@ -86,48 +82,31 @@ def add_watermark(
     # create directory with all parents, to prevent ffmpeg error
     Path(directory).mkdir(parents=True, exist_ok=True)
 
-    main = ffmpeg.input(video_path)
+    # a streaming input can be downloaded by tee_input
+    video_path = self.get_video_input(video_path, request_id)
+
+    main = ffmpeg.input(
+        video_path,
+        **self.get_input_options(video_path))
     watermark = ffmpeg.input(watermark_path)
-    callback: callable = FfmpegCallback(
+    callback = FfmpegCallback(
                 task=self,
                 task_id=self.request.id.__str__(),
                 output_id=output_id,
                 request_id=request_id
-            ).progress
-
-    stream = ffmpeg.filter(
-        [main, watermark], 'overlay', 0, 0
-        ).output(output_path)
-
-    with subprocess.Popen(
-            stream.compile(),
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            # bufsize=1,
-            universal_newlines=True) as process:
-
-        duration = 1
-        time_ = 0
-        start_time = time.time()
-        while True:
-            line = process.stdout.readline().strip()
-            duration = get_time('Duration: ', line, duration)
-            time_ = get_time('time=', line, time_)
-            if process.poll() is not None:
-                break
-
-            callback(
-                line,
-                duration,
-                time_,
-                time_left(start_time, time_, duration),
-                process)
-
-    if process.returncode != 0:
-        raise subprocess.CalledProcessError(
-            process.returncode,
-            process.args)
+            )
+
+    # the video is encoded once in the size of the input
+    with self.hold_tenant_slot(request_id, self.tenant_quota.ENCODE), \
+            self.hold_cpu_slots(self.encoding_cost(request_id)) as slots:
+        stream = ffmpeg.filter(
+            [main, watermark], 'overlay', 0, 0
+            ).output(output_path, threads=slots)
+
+        run_command(stream.compile(), callback.progress)
+
+    # save the last coalesced progress and usage
+    callback.flush()
 
     self.save_output_status(
         self.output_status.PROCESSING_FINISHED,
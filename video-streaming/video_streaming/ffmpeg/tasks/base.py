@@ -1,15 +1,22 @@
 import json
+import math
 import os
 import shutil
+import uuid
 from abc import ABC
+from contextlib import contextmanager
 from celery import states
+from celery.exceptions import Retry
+from ffmpeg_streaming.ffprobe import Streams
 from celery.utils.log import get_task_logger
 from video_streaming import settings
-from video_streaming.cache import RedisCache
+from video_streaming.cache import RedisCache, MemoryCache
 from video_streaming.core.constants.status import StopReason
 from video_streaming.core.tasks import BaseTask
 from video_streaming.core.constants.cache_keys import CacheKeysTemplates
-from video_streaming.core.services import S3Service
+from video_streaming.core.constants.cache_scripts import CacheScripts
+from video_streaming.core.services import S3Service, InputCache, \
+    CancellationBus, JobIndex, CpuSlots, TenantQuota
 from video_streaming.core.constants import ErrorMessages, \
     PrimaryStatus, InputStatus, OutputStatus
 celery_logger = get_task_logger(__name__)
@@ -21,9 +28,22 @@ class BaseStreamingTask(BaseTask, ABC):
     """
 
     s3_service = S3Service()  # create s3 client
+    input_cache = InputCache()
     error_messages = ErrorMessages
     logger = celery_logger
     cache = RedisCache()
+    # to kill ffmpeg processes by revoke signals immediately
+    cancellation_bus = CancellationBus(cache)
+    # to list the jobs by their primary statuses
+    job_index = JobIndex(cache)
+    # to not run more ffmpeg encoders than the CPUs of the node
+    cpu_slots = CpuSlots()
+    # to share the workers between the tenants by their weights
+    tenant_quota = TenantQuota(cache)
+    # JOB_DETAILS is not changed after creating the job
+    job_details_cache = MemoryCache(
+        settings.JOB_DETAILS_MEMORY_CACHE_SIZE,
+        settings.JOB_DETAILS_MEMORY_CACHE_TIMEOUT)
     primary_status = PrimaryStatus
     input_status = InputStatus
     output_status = OutputStatus
@@ -40,6 +60,31 @@ class BaseStreamingTask(BaseTask, ABC):
     # delete local outputs after all outputs have been uploaded
     delete_outputs: bool = True
 
+    # ffmpeg input options of a streaming input, to continue reading
+    # the url after connection errors
+    HTTP_INPUT_OPTIONS: dict = dict(
+        reconnect=1,
+        reconnect_streamed=1,
+        reconnect_delay_max=5)
+
+    # the stages of the job, the checks, the downloads and the outputs
+    # run alongside, so a primary status is not set after the statuses
+    # of the next stages, e.g. CHECKING of a late check after
+    # OUTPUTS_PROGRESSING
+    PRIMARY_STATUS_STAGES: tuple[str] = (
+        PrimaryStatus.QUEUING_CHECKS,
+        PrimaryStatus.CHECKING,
+        PrimaryStatus.CHECKS_FINISHED,
+        PrimaryStatus.QUEUING_INPUTS_DOWNLOADING,
+        PrimaryStatus.INPUTS_DOWNLOADING,
+        PrimaryStatus.ALL_INPUTS_DOWNLOADED,
+        PrimaryStatus.QUEUING_OUTPUTS,
+        PrimaryStatus.OUTPUTS_PROGRESSING)
+
+    # kwarg of the number of times that the task has been deferred,
+    # see defer
+    DEFERRALS_KWARG: str = "deferrals"
+
     # # attrs that can not be empty or whitespace string
     # _NO_SPACE_STRINGS = [
     #     'request_id',
@@ -85,43 +130,103 @@ class BaseStreamingTask(BaseTask, ABC):
     #     if self.is_forced_to_stop():
     #         raise self.raise_revoke()
 
+    def final_primary_statuses(self, status_name) -> list[str]:
+        """the primary statuses that status_name can not be set after
+        them, 'FAILED', 'REVOKED' and 'FINISHED' are final, the
+        statuses of the next stages are final for the previous ones
+        """
+        statuses = [
+            self.primary_status.FAILED,
+            self.primary_status.REVOKED,
+            self.primary_status.FINISHED]
+        if status_name in self.PRIMARY_STATUS_STAGES:
+            statuses += self.PRIMARY_STATUS_STAGES[
+                self.PRIMARY_STATUS_STAGES.index(status_name) + 1:]
+        return statuses
+
     def save_primary_status(self, status_name, request_id):
         """
             1. check request_id and JOB_DETAILS has been set
-            2. check current status is not 'FAILED' or 'REVOKED'
-            3. add to celery logger
-            4. save primary status on cache
+            2. check current status is not a final status of it,
+               see final_primary_statuses
+            3. save primary status on cache
+            4. add to celery logger
+
+            steps 1 to 3 are done atomically by one round trip
         """
 
         if request_id is None:
             # request_id has been not set
             return
 
-        if not self.cache.get(CacheKeysTemplates.JOB_DETAILS.format(
-                request_id=request_id)):
-            # JOB_DETAILS has been not set
-            return None
-
-        # to prevent set any status after it was set to 'FAILED' or 'REVOKED'
-        if self.can_set_status(request_id):
-
-            # add to celery logger
-            log_message = f"primary status: {status_name}"
-            if request_id:
-                log_message += f" ,request id: {request_id}"
-            self.logger.info(log_message)
-
-            self.cache.set(
-                CacheKeysTemplates.PRIMARY_STATUS.format(
-                    request_id=request_id),
-                status_name
-            )
+        # to prevent set any status after it was set to 'FAILED',
+        # 'REVOKED' or 'FINISHED', or moving back to a previous stage
+        final_statuses = self.final_primary_statuses(status_name)
+        is_set: int = self.cache.run_script(
+            CacheScripts.SET_STATUS,
+            keys=[self.job_hash(request_id)],
+            args=[
+                self.job_field("JOB_DETAILS", request_id),
+                self.job_field("PRIMARY_STATUS", request_id),
+                status_name,
+                self.cache.TIMEOUT_SECOND,
+                len(final_statuses),
+                *final_statuses])
+
+        if is_set == 1:
+            self.log_primary_status(status_name, request_id)
+            self.index_primary_status(request_id)
+            self.notify_job_change(request_id)
 
             # save as celery task status
             # self.update_state(
             #     task_id=self.request.id,
             #     state=status_name)
 
+    def log_primary_status(self, status_name, request_id):
+        # add to celery logger
+        log_message = f"primary status: {status_name}"
+        if request_id:
+            log_message += f" ,request id: {request_id}"
+        self.logger.info(log_message)
+
+    def index_primary_status(self, request_id):
+        """move the job to the index of its new primary status"""
+        try:
+            self.job_index.index_status(request_id)
+        except Exception as e:
+            # TODO notify developer
+            print(e)
+
+    def notify_job_change(self, request_id):
+        """publish a change of the job to its watch_jobs streams"""
+        try:
+            self.cache.publish(
+                CacheKeysTemplates.JOB_CHANGES_CHANNEL.format(
+                    request_id=request_id),
+                request_id)
+        except Exception as e:
+            # TODO notify developer
+            print(e)
+
+    def get_job_details(self, request_id) -> None or dict:
+        """returns JOB_DETAILS of the job from memory of the process,
+        or from the cache when it's not there
+        """
+        if request_id is None:
+            return None
+        job_details: dict = self.job_details_cache.get(request_id)
+        if job_details is None:
+            job_details = self.cache.get(
+                CacheKeysTemplates.JOB_DETAILS.format(
+                    request_id=request_id))
+            if job_details:
+                self.job_details_cache.set(request_id, job_details)
+        return job_details
+
+    def forget_job_details(self, request_id):
+        self.job_details_cache.delete(request_id)
+
     def can_set_status(self, request_id) -> None or bool:
         """to check current primary status of job is
          in 'FAILED' and 'REVOKED'
@@ -136,13 +241,64 @@ class BaseStreamingTask(BaseTask, ABC):
             self.primary_status.REVOKED
         ]
 
-    def incr(self, key_template: str, request_id: str) -> None or int:
+    def incr(self,
+             key_template: str,
+             request_id: str,
+             **key_kwargs) -> None or int:
         if request_id is None:
             return None
         key = getattr(CacheKeysTemplates, key_template).format(
-            request_id=request_id)
-        self.cache.incr(key)
-        return self.cache.get(key)
+            request_id=request_id,
+            **key_kwargs)
+        return self.cache.incr(key)
+
+    def incr_to_primary_status(self,
+                               key_template: str,
+                               total_name: str,
+                               status_name: str,
+                               request_id: str) -> None or int:
+        """increment a counter of the job, and save the primary status
+        when the counter reaches to the total of JOB_DETAILS
+
+        returns the counter or None when JOB_DETAILS has been not set
+        """
+        if request_id is None:
+            return None
+        counter, is_set = self.cache.run_script(
+            CacheScripts.INCR_COUNTER,
+            keys=[self.job_hash(request_id)],
+            args=[
+                self.job_field("JOB_DETAILS", request_id),
+                self.job_field(key_template, request_id),
+                self.cache.TIMEOUT_SECOND,
+                total_name,
+                self.job_field("PRIMARY_STATUS", request_id),
+                status_name,
+                *self.final_primary_statuses(status_name)])
+        if counter == -1:
+            # JOB_DETAILS has been not set
+            return None
+        if is_set:
+            self.log_primary_status(status_name, request_id)
+            self.index_primary_status(request_id)
+        self.notify_job_change(request_id)
+        return counter
+
+    @staticmethod
+    def job_hash(request_id: str) -> str:
+        return CacheKeysTemplates.JOB_HASH.format(request_id=request_id)
+
+    def job_field(self,
+                  key_template: str,
+                  request_id: str,
+                  **key_kwargs) -> str:
+        """name of the field of the key in the job hash, to pass it
+        to the lua scripts
+        """
+        key = getattr(CacheKeysTemplates, key_template).format(
+            request_id=request_id,
+            **key_kwargs)
+        return self.cache.split_key(key)[1]
 
     def inputs_remover(self,
                        directory: str = None,
@@ -150,6 +306,10 @@ class BaseStreamingTask(BaseTask, ABC):
         if not directory:
             directory = self.get_inputs_root_directory(request_id)
 
+        # the inputs of the job are not in use of the cache anymore
+        if request_id and self.input_cache.enabled:
+            self.input_cache.release(request_id)
+
         # check remove directory is safe and not remove other inputs
         if directory and directory != self.INPUTS_DIRECTORY_PREFIX:
             shutil.rmtree(
@@ -196,6 +356,7 @@ class BaseStreamingTask(BaseTask, ABC):
                     total=total,
                     current=current
                 )))
+            self.notify_job_change(request_id)
 
     def save_output_progress(self,
                              total,
@@ -215,6 +376,164 @@ class BaseStreamingTask(BaseTask, ABC):
                     total=total,
                     current=current
                 )))
+            self.notify_job_change(request_id)
+
+    def save_output_chunk_progress(self,
+                                   total,
+                                   current,
+                                   chunk_number,
+                                   request_id,
+                                   output_id):
+        if request_id is not None and \
+                output_id is not None:
+            # save processed seconds of the chunk, then save sum of
+            # all chunks as the output progress
+            key = CacheKeysTemplates.OUTPUT_CHUNKS_PROGRESS.format(
+                request_id=request_id,
+                output_id=output_id)
+            self.cache.hset(key, chunk_number, current)
+            chunks_progress: dict = self.cache.hgetall(key)
+            self.save_output_progress(
+                total=total,
+                current=sum(
+                    float(value) for value in chunks_progress.values()),
+                request_id=request_id,
+                output_id=output_id)
+
+    @staticmethod
+    def is_url(path: str) -> bool:
+        return path.startswith(('http://', 'https://'))
+
+    def get_input_options(self, input_path: str) -> dict:
+        """ffmpeg options of the input"""
+        if self.is_url(input_path):
+            return dict(self.HTTP_INPUT_OPTIONS)
+        return {}
+
+    def get_video_input(self, video_path: str, request_id: str) -> str:
+        """returns the local path of a streaming video input when the
+        tee_input task has been downloaded it, otherwise video_path
+        """
+        if video_path and self.is_url(video_path):
+            tee_path = self.cache.get(
+                CacheKeysTemplates.INPUT_VIDEO_TEE_PATH.format(
+                    request_id=request_id),
+                decode=False)
+            # inputs can be deleted after all outputs were processed
+            if tee_path and os.path.isfile(tee_path):
+                return tee_path
+        return video_path
+
+    def get_video_probe(self, request_id) -> None or dict:
+        """the ffprobe data of the video input, that analyze_input has
+        been cached, includes 'streams' and 'format'
+        """
+        return self.cache.get(
+            CacheKeysTemplates.INPUT_FFPROBE_DATA.format(
+                request_id=request_id,
+                input_number=0))
+
+    def get_video_size(self, request_id) -> None or tuple[int, int]:
+        """width and height of the video input, by the cached ffprobe
+        data
+        """
+        ffprobe_data = self.get_video_probe(request_id)
+        if not ffprobe_data:
+            return None
+        video: dict = Streams(ffprobe_data['streams']).video()
+        width = int(video.get('width', 0))
+        height = int(video.get('height', 0))
+        if not (width and height):
+            return None
+        return width, height
+
+    def encoding_cost(self,
+                      request_id: str,
+                      output_sizes: list[tuple[int, int]] = None) -> int:
+        """CPU slots of a ffmpeg process that encodes the video input
+        of the job to the output sizes, default is one output in the
+        size of the input
+        """
+        input_size = self.get_video_size(request_id)
+        if output_sizes is None:
+            output_sizes = [input_size] if input_size else []
+        if input_size is None:
+            # e.g. the input has been not analyzed, it's at least as
+            # large as the largest output
+            input_size = max(output_sizes, key=math.prod, default=(0, 0))
+        return self.cpu_slots.cost(input_size, output_sizes)
+
+    def defer(self, countdown: int) -> Retry:
+        """re-queue the task to run it again after the countdown, like
+        retry but request.retries is not increased. waiting for a shared
+        resource is not a failure, so it must not use the retries of
+        the task. the deferrals are counted by the "deferrals" kwarg,
+        so a task that can be deferred has to accept **kwargs.
+
+        returns the Retry exception to raise it, same as retry
+        """
+        request = self.request
+        kwargs = dict(request.kwargs or {})
+        kwargs[self.DEFERRALS_KWARG] = kwargs.get(
+            self.DEFERRALS_KWARG, 0) + 1
+        signature = self.signature_from_request(
+            request,
+            request.args,
+            kwargs,
+            countdown=countdown,
+            retries=request.retries)
+        deferral = Retry(
+            when=countdown,
+            is_eager=request.is_eager,
+            sig=signature)
+        if request.called_directly or request.is_eager:
+            return deferral
+        signature.apply_async()
+        return deferral
+
+    @contextmanager
+    def hold_cpu_slots(self, cost: int):
+        """yields the granted CPU slots of the node to run ffmpeg by
+        them, the task is re-queued when the slots have been not free
+        until CPU_SLOTS_WAIT_TIMEOUT
+        """
+        with self.cpu_slots.hold(cost) as slots:
+            if not slots:
+                # the waiting is not counted as a retry
+                raise self.defer(settings.CPU_SLOTS_RETRY_COUNTDOWN)
+            yield slots
+
+    @contextmanager
+    def hold_tenant_slot(self, request_id: str, resource: str):
+        """hold a slot of the resource for the tenant of the job, the
+        task is deferred when the tenant is over its share
+        """
+        job_details: dict = self.get_job_details(request_id) or {}
+        tenant_id: str = job_details.get(
+            'tenant_id', self.tenant_quota.DEFAULT_TENANT)
+        holder: str = self.request.id or str(uuid.uuid4())
+        try:
+            acquired = self.tenant_quota.acquire(
+                resource, tenant_id, holder)
+        except Exception as e:
+            # TODO notify developer
+            print(e)
+            acquired = None
+        if acquired is None:
+            # the task is not stopped by an error of the quotas
+            yield
+            return
+        if not acquired:
+            # the deferring is not counted as a retry
+            raise self.defer(settings.TENANT_RETRY_COUNTDOWN)
+        try:
+            yield
+        finally:
+            try:
+                self.tenant_quota.release(resource, holder)
+            except Exception as e:
+                # TODO notify developer, the lease will be expired
+                print(e)
 
     def get_inputs_root_directory(self, request_id) -> None or str:
         if request_id is None:
@@ -231,35 +550,53 @@ class BaseStreamingTask(BaseTask, ABC):
             self.OUTPUTS_DIRECTORY_PREFIX + str(request_id))
 
     def raise_revoke(self, request_id: str = None):
+        self.forget_job_details(request_id)
         if self.delete_inputs:
             self.inputs_remover(request_id=request_id)
         if self.delete_outputs:
             self.outputs_remover(request_id=request_id)
-        self.save_primary_status(
-            self.primary_status.REVOKED,
-            request_id
-        )
-        self.save_job_stop_reason(
-            self.stop_reason.FORCE_REVOKED,
-            request_id
-        )
+        # a failed job keeps its status and stop reason
+        if not self.is_job_failed(request_id):
+            self.save_primary_status(
+                self.primary_status.REVOKED,
+                request_id
+            )
+            self.save_job_stop_reason(
+                self.stop_reason.FORCE_REVOKED,
+                request_id
+            )
         raise self.raise_ignore(
             message=self.error_messages.TASK_WAS_FORCIBLY_STOPPED,
             state=states.REVOKED,
             request_kwargs=self.request.kwargs)
 
     def is_forced_to_stop(self, request_id) -> None or bool:
-        force_stop: None or bool = self.cache.get(
+        """the job has been revoked, or another branch of the job
+        graph has failed it, e.g. a check that has been failed while
+        the outputs are running
+        """
+        # both keys are read by one round trip
+        job = self.cache.get_snapshot(self.job_hash(request_id))
+        force_stop: None or bool = job.get(
             CacheKeysTemplates.FORCE_STOP_REQUEST.format(
                 request_id=request_id))
-        return force_stop
+        if force_stop:
+            return force_stop
+        return job.get(
+            CacheKeysTemplates.PRIMARY_STATUS.format(
+                request_id=request_id),
+            decode=False) == self.primary_status.FAILED
+
+    def is_job_failed(self, request_id) -> bool:
+        return self.cache.get(
+            CacheKeysTemplates.PRIMARY_STATUS.format(
+                request_id=request_id),
+            decode=False) == self.primary_status.FAILED
 
     def save_job_stop_reason(self, reason, request_id):
         # save primary status on cache when request_id
         # and JOB_DETAILS has been set
-        if request_id is None or not self.cache.get(
-                CacheKeysTemplates.JOB_DETAILS.format(
-                request_id=request_id)):
+        if not self.get_job_details(request_id):
             return None
 
         # check already has stop reason, to prevent rewrite reason
@@ -273,6 +610,7 @@ class BaseStreamingTask(BaseTask, ABC):
                     request_id=request_id),
                 reason
             )
+            self.notify_job_change(request_id)
 
     def has_already_stop_reason(self, request_id) -> None or bool:
         """to check already has stop reason"""
@@ -1,16 +1,19 @@
 from abc import ABC
+from celery import chord
 from video_streaming import settings
 from video_streaming.celery import celery_app
 from video_streaming.core.tasks import ChainCallbackMixin
 from video_streaming.ffmpeg.utils import FfmpegCallback
 from video_streaming.ffmpeg.constants import TASK_DECORATOR_KWARGS
 from .base import BaseStreamingTask
-from .mixins import CreatePlaylistMixin
+from .mixins import PlaylistChunksMixin
+from .encode_playlist_chunk import encode_playlist_chunk
+from .stitch_playlist_chunks import stitch_playlist_chunks
 
 
 class CreatePlaylistTask(
         ChainCallbackMixin,
-        CreatePlaylistMixin,
+        PlaylistChunksMixin,
         BaseStreamingTask,
         ABC
         ):
@@ -25,6 +28,78 @@ class CreatePlaylistTask(
             request_id
         )
 
+    def encode_in_chunks(
+            self,
+            protocol,
+            video_path: str,
+            output_path: str,
+            chunk_duration: int,
+            request_id: str,
+            output_id: str,
+            **playlist_kwargs):
+        """replace the task by a chord of encoding chunks in parallel
+        and stitching them, the rest of the chain will be continued
+        after the stitch_playlist_chunks task
+        """
+        total_duration = float(self.get_ffprobe_data(
+            video_path, request_id)['format'].get('duration', 0))
+        if total_duration <= chunk_duration:
+            # there is nothing to be parallel
+            return
+
+        chunks_directory = self.get_chunks_directory(
+            request_id,
+            output_id)
+        try:
+            chunks = self.split_to_chunks(
+                video_path,
+                chunks_directory,
+                chunk_duration)
+        except Exception as e:
+            # TODO notify developer
+            print(e)
+            self.save_job_stop_reason(
+                self.stop_reason.FAILED_SPLIT_INPUT_TO_CHUNKS,
+                request_id)
+            raise self.retry(
+                exc=e,
+                max_retries=settings.TASK_RETRY_FFMPEG_COMMAND_MAX)
+
+        self.save_processing_time(
+            "OUTPUT_START_PROCESSING_TIME",
+            request_id,
+            output_id)
+
+        # chunks have to be encoded by the same representations, also
+        # auto generated representations
+        custom_qualities = self.reps_to_qualities(protocol.reps)
+        encode_kwargs = dict(
+            chunks_directory=chunks_directory,
+            total_duration=total_duration,
+            encode_format=playlist_kwargs['encode_format'],
+            video_codec=playlist_kwargs['video_codec'],
+            custom_qualities=custom_qualities,
+            request_id=request_id,
+            output_id=output_id)
+
+        raise self.replace(chord(
+            [encode_playlist_chunk.si(
+                chunk_path=chunk_path,
+                chunk_number=chunk_number,
+                chunk_start=chunk_start,
+                **encode_kwargs)
+             for chunk_number, (chunk_path, chunk_start) in enumerate(
+                chunks)],
+            stitch_playlist_chunks.s(
+                video_path=video_path,
+                output_path=output_path,
+                chunks_directory=chunks_directory,
+                total_chunks=len(chunks),
+                custom_qualities=custom_qualities,
+                request_id=request_id,
+                output_id=output_id,
+                **playlist_kwargs)))
+
 
 @celery_app.task(name="create_playlist",
                  base=CreatePlaylistTask,
@@ -35,16 +110,19 @@ def create_playlist(
         video_path: str = None,
         output_path: str = None,
         s3_output_key: str = None,
+        s3_output_bucket: str = None,
         fragmented: bool = settings.DEFAULT_SEGMENT_TYPE_IS_FMP4,
         encode_format: str = settings.DEFAULT_ENCODE_FORMAT,
         video_codec: str = None,
         audio_codec: str = None,
         quality_names: list[str] = None,
         custom_qualities: list[dict] = None,
+        per_title: bool = False,
         async_run: bool = False,
         request_id: str = None,
         output_id: str = None,
         is_hls: bool = settings.DEFAULT_PLAYLIST_IS_HLS,
+        chunk_duration: int = settings.DEFAULT_CHUNK_DURATION,
         **kwargs
         ) -> dict:
     """create an playlist ( HLS or DASH )
@@ -53,6 +131,9 @@ def create_playlist(
         self:
         *args:
         s3_output_key:
+        s3_output_bucket:
+            to upload the finished segments while encoding, the rest
+            of the directory will be uploaded by upload_directory
         fragmented:
         encode_format:
         request_id:
@@ -73,6 +154,9 @@ def create_playlist(
         custom_qualities:
             a list of dict includes size and bitrate
             e.g. [dict(size=[256, 144], bitrate=[97280, 65536])]
+        per_title:
+            to set the bitrates of the qualities by the complexity of
+            the video, see PerTitleMixin
         async_run:
             default of async_run is False to don't call async method
             inside the task, it can raise RuntimeError: asyncio.run()
@@ -81,6 +165,10 @@ def create_playlist(
             output_id is using in redis key, to save progress of
             every output, also it's using to create different path
             for outputs
+        chunk_duration:
+            to encode the playlist in parallel by many workers, the
+            input will be split into chunks of about this seconds,
+            0 means to encode it by this task
         **kwargs:
             some unused parameters from previous tasks that set by __call__
 
@@ -107,6 +195,9 @@ def create_playlist(
     if self.is_output_forced_to_stop(request_id, output_id):
         raise self.raise_revoke_output(request_id, output_id)
 
+    # a streaming input can be downloaded by tee_input
+    video_path = self.get_video_input(video_path, request_id)
+
     # save primary status using request_id
     self.save_primary_status(
         self.primary_status.OUTPUTS_PROGRESSING,
@@ -135,32 +226,64 @@ def create_playlist(
         is_hls=is_hls,
         fragmented=fragmented,
         custom_qualities=custom_qualities,
-        quality_names=quality_names)
-
-    try:
-        # self.output_path includes the file name
-        playlist.output(
-            output_path,
-            monitor=FfmpegCallback(
-                task=self,
-                task_id=self.request.id.__str__(),
-                output_id=output_id,
-                request_id=request_id
-            ).progress,
-            ffmpeg_bin=settings.FFMPEG_BIN_PATH,
-            async_run=async_run)
-    except Exception as e:
-
-        if self.is_forced_to_stop(request_id):
-            raise self.raise_revoke(request_id)
-        if self.is_output_forced_to_stop(request_id, output_id):
-            raise self.raise_revoke_output(request_id, output_id)
-
-        # TODO handle possible Runtime Errors
-        # notice : video processing has cost to retry
-        raise self.retry(
-            exc=e,
-            max_retries=settings.TASK_RETRY_FFMPEG_COMMAND_MAX)
+        quality_names=quality_names,
+        per_title=per_title)
+
+    if chunk_duration:
+        self.encode_in_chunks(
+            protocol=playlist,
+            video_path=video_path,
+            output_path=output_path,
+            chunk_duration=chunk_duration,
+            request_id=request_id,
+            output_id=output_id,
+            fragmented=fragmented,
+            encode_format=encode_format,
+            video_codec=video_codec,
+            audio_codec=audio_codec,
+            is_hls=is_hls,
+            s3_output_key=s3_output_key,
+            s3_output_bucket=s3_output_bucket)
+
+    # the slots are waited before starting the segments uploader
+    with self.hold_tenant_slot(request_id, self.tenant_quota.ENCODE), \
+            self.hold_cpu_slots(
+                self.protocol_cost(playlist, request_id)) as slots:
+        self.set_encoder_threads(playlist, slots, is_hls)
+        segments_uploader = self.start_segments_uploader(
+            directory,
+            s3_output_key=s3_output_key,
+            s3_output_bucket=s3_output_bucket,
+            request_id=request_id,
+            output_id=output_id)
+        callback = FfmpegCallback(
+            task=self,
+            task_id=self.request.id.__str__(),
+            output_id=output_id,
+            request_id=request_id
+        )
+        try:
+            # self.output_path includes the file name
+            playlist.output(
+                output_path,
+                monitor=callback.progress,
+                ffmpeg_bin=settings.FFMPEG_BIN_PATH,
+                async_run=async_run)
+        except Exception as e:
+
+            if self.is_forced_to_stop(request_id):
+                raise self.raise_revoke(request_id)
+            if self.is_output_forced_to_stop(request_id, output_id):
+                raise self.raise_revoke_output(request_id, output_id)
+
+            # TODO handle possible Runtime Errors
+            # notice : video processing has cost to retry
+            raise self.retry(
+                exc=e,
+                max_retries=settings.TASK_RETRY_FFMPEG_COMMAND_MAX)
+        finally:
+            if segments_uploader:
+                segments_uploader.stop()
 
     # TODO check ffmpeg is really finished successfully,
     #  Sometimes FfmpegCallback has an error but the Ffmpeg stops
@@ -173,6 +296,9 @@ def create_playlist(
     if self.is_output_forced_to_stop(request_id, output_id):
         raise self.raise_revoke_output(request_id, output_id)
 
+    # save the last coalesced progress and usage
+    callback.flush()
+
     self.save_output_status(
         self.output_status.PROCESSING_FINISHED,
         output_id,
@@ -2,7 +2,7 @@ import os
 from abc import ABC
 from video_streaming import settings
 from video_streaming.celery import celery_app
-from video_streaming.core.tasks import ChordCallbackMixin
+from video_streaming.core.tasks import ChainCallbackMixin
 from video_streaming.ffmpeg.constants import TASK_DECORATOR_KWARGS, \
     InputType
 from .base import BaseStreamingTask
@@ -10,7 +10,7 @@ from .mixins import DownloadInputMixin
 
 
 class DownloadInputTask(
-        ChordCallbackMixin,
+        ChainCallbackMixin,
         DownloadInputMixin,
         BaseStreamingTask,
         ABC
@@ -38,7 +38,8 @@ def download_input(self,
                    input_number: int = None,
                    video_details: dict = None,
                    watermark_details: dict = None,
-                   input_type: str = InputType.VIDEO_INPUT
+                   input_type: str = InputType.VIDEO_INPUT,
+                   **kwargs
                    ) -> dict:
     """download video to local input path
 
@@ -57,6 +58,8 @@ def download_input(self,
         video_details:
         watermark_details:
         input_type:
+        **kwargs:
+            the "deferrals" of hold_tenant_slot
 
     Returns:
 
@@ -98,13 +101,15 @@ def download_input(self,
 
     downloaded = os.path.exists(input_path)
     if not downloaded:
-        downloaded_successfully = self.download_video(
-            input_path,
-            object_details,
-            s3_input_key,
-            s3_input_bucket,
-            input_number,
-            request_id)
+        with self.hold_tenant_slot(
+                request_id, self.tenant_quota.DOWNLOAD):
+            downloaded_successfully = self.download_video(
+                input_path,
+                object_details,
+                s3_input_key,
+                s3_input_bucket,
+                input_number,
+                request_id)
 
         # downloaded_successfully is False when the input is 404 or 403
         if not downloaded_successfully:
@@ -0,0 +1,163 @@
+import os
+from abc import ABC
+from pathlib import Path
+from video_streaming import settings
+from video_streaming.celery import celery_app
+from video_streaming.ffmpeg.utils import FfmpegCallback, run_command
+from video_streaming.ffmpeg.constants import TASK_DECORATOR_KWARGS
+from .base import BaseStreamingTask
+from .mixins import PlaylistChunksMixin
+
+
+class EncodePlaylistChunkTask(
+        PlaylistChunksMixin,
+        BaseStreamingTask,
+        ABC
+        ):
+
+    # rewrite BaseOutputMixin.save_failed
+    def save_failed(self, request_id, output_id):
+        super().save_failed(request_id, output_id)
+        # stop reason will only be set if there is no reason before.
+        # set common reason for the task after many retries or etc.
+        self.save_job_stop_reason(
+            self.stop_reason.FAILED_ENCODE_PLAYLIST_CHUNK,
+            request_id
+        )
+
+
+@celery_app.task(name="encode_playlist_chunk",
+                 base=EncodePlaylistChunkTask,
+                 **TASK_DECORATOR_KWARGS)
+def encode_playlist_chunk(
+        self,
+        *args,
+        chunk_path: str = None,
+        chunk_number: int = None,
+        chunk_start: float = 0.0,
+        chunks_directory: str = None,
+        total_duration: float = None,
+        encode_format: str = settings.DEFAULT_ENCODE_FORMAT,
+        video_codec: str = None,
+        custom_qualities: list[dict] = None,
+        request_id: str = None,
+        output_id: str = None,
+        **kwargs
+        ):
+    """encode the video of a chunk to all representations of the
+    playlist, as a header task of the chord of stitch_playlist_chunks
+
+    Args:
+        self:
+        *args:
+        chunk_path:
+            The local path of the chunk
+        chunk_number:
+            The order of the chunk in the video, starts from zero
+        chunk_start:
+            The start time of the chunk in the video, to force the
+            keyframes of the segments
+        chunks_directory:
+            The local directory of the chunks of the output
+        total_duration:
+            The duration of the video, to aggregate progress of chunks
+        encode_format:
+        video_codec:
+        custom_qualities:
+            all representations of the playlist, that
+            create_playlist has been made
+        request_id:
+        output_id:
+        **kwargs:
+            some unused parameters from previous tasks that set by __call__
+
+    Required parameters:
+        - request_id
+        - output_id
+        - chunk_path
+        - chunks_directory
+
+    """
+
+    self.check_encode_playlist_chunk_requirements(
+        request_id=request_id,
+        output_id=output_id,
+        chunk_path=chunk_path,
+        chunks_directory=chunks_directory)
+
+    if self.is_forced_to_stop(request_id):
+        raise self.raise_revoke(request_id)
+    if self.is_output_forced_to_stop(request_id, output_id):
+        raise self.raise_revoke_output(request_id, output_id)
+
+    # another chunk of the output has been failed
+    if not self.can_set_output_status(output_id, request_id):
+        raise self.raise_ignore(
+            message=self.error_messages.OUTPUT_HAS_BEEN_FAILED,
+            request_kwargs=self.request.kwargs)
+
+    protocol = self.initial_protocol(
+        chunk_path,
+        output_id,
+        request_id,
+        encode_format,
+        video_codec=video_codec,
+        custom_qualities=custom_qualities)
+
+    rendition_paths = []
+    for rep_number in range(len(protocol.reps)):
+        rendition_path = self.get_rendition_path(
+            chunks_directory,
+            rep_number,
+            chunk_number)
+        # create directory with all parents, to prevent ffmpeg error
+        Path(os.path.dirname(rendition_path)).mkdir(
+            parents=True, exist_ok=True)
+        rendition_paths.append(rendition_path)
+
+    callback = FfmpegCallback(
+        task=self,
+        task_id=self.request.id.__str__(),
+        output_id=output_id,
+        request_id=request_id,
+        chunk_number=chunk_number,
+        total_duration=total_duration
+    )
+    with self.hold_tenant_slot(request_id, self.tenant_quota.ENCODE), \
+            self.hold_cpu_slots(
+                self.protocol_cost(protocol, request_id)) as slots:
+        try:
+            run_command(
+                self.encode_chunk_command(
+                    protocol,
+                    chunk_path,
+                    rendition_paths,
+                    slots=slots,
+                    chunk_start=chunk_start),
+                callback.progress)
+        except Exception as e:
+
+            if self.is_forced_to_stop(request_id):
+                raise self.raise_revoke(request_id)
+            if self.is_output_forced_to_stop(request_id, output_id):
+                raise self.raise_revoke_output(request_id, output_id)
+
+            # a partial rendition must not be stitched
+            for rendition_path in rendition_paths:
+                if os.path.isfile(rendition_path):
+                    os.remove(rendition_path)
+
+            # notice : video processing has cost to retry
+            raise self.retry(
+                exc=e,
+                max_retries=settings.TASK_RETRY_FFMPEG_COMMAND_MAX)
+
+    # it's possible process killed in FfmpegCallback
+    # so, checking the force stop before continuing
+    if self.is_forced_to_stop(request_id):
+        raise self.raise_revoke(request_id)
+    if self.is_output_forced_to_stop(request_id, output_id):
+        raise self.raise_revoke_output(request_id, output_id)
+
+    # save the last coalesced progress of the chunk
+    callback.flush()
@@ -0,0 +1,200 @@
+import os
+from abc import ABC
+from celery import states
+from pathlib import Path
+from video_streaming import settings
+from video_streaming.celery import celery_app
+from video_streaming.core.tasks import ChainCallbackMixin
+from video_streaming.ffmpeg.utils import FfmpegCallback, run_command
+from video_streaming.ffmpeg.constants import TASK_DECORATOR_KWARGS
+from .base import BaseStreamingTask
+from .mixins import PlaylistChunksMixin
+
+
+class EncodeSharedRenditionsTask(
+        ChainCallbackMixin,
+        PlaylistChunksMixin,
+        BaseStreamingTask,
+        ABC
+        ):
+
+    # rewrite BaseOutputMixin.save_failed
+    def save_failed(self, request_id, output_ids):
+        # set failed status for all outputs that use the renditions
+        for output_id in output_ids:
+            super().save_failed(request_id, output_id)
+
+        # stop reason will only be set if there is no reason before.
+        # set common reason for the task after many retries or etc.
+        self.save_job_stop_reason(
+            self.stop_reason.FAILED_ENCODE_SHARED_RENDITIONS,
+            request_id
+        )
+
+    def on_failure(self, *request_args, **request_kwargs):
+        request_id = request_kwargs.get('request_id', None)
+        output_ids = request_kwargs.get('output_ids', None)
+        if request_id is not None and output_ids:
+            self.save_failed(request_id, output_ids)
+        return super().on_failure(*request_args, **request_kwargs)
+
+    def raise_ignore(self,
+                     message=None,
+                     state=states.FAILURE,
+                     request_kwargs: dict = None):
+        if request_kwargs:
+            request_id = request_kwargs.get('request_id', None)
+            output_ids = request_kwargs.get('output_ids', None)
+            if request_id is not None and output_ids:
+                if state == states.FAILURE:
+                    self.save_failed(request_id, output_ids)
+                elif state == states.REVOKED:
+                    for output_id in output_ids:
+                        self.save_output_status(
+                            self.output_status.OUTPUT_REVOKED,
+                            output_id,
+                            request_id)
+        super().raise_ignore(
+            message=message,
+            state=state,
+            request_kwargs=request_kwargs)
+
+
+@celery_app.task(name="encode_shared_renditions",
+                 base=EncodeSharedRenditionsTask,
+                 **TASK_DECORATOR_KWARGS)
+def encode_shared_renditions(
+        self,
+        *args,
+        video_path: str = None,
+        encode_format: str = settings.DEFAULT_ENCODE_FORMAT,
+        video_codec: str = None,
+        quality_names: list[str] = None,
+        custom_qualities: list[dict] = None,
+        per_title: bool = False,
+        request_id: str = None,
+        output_ids: list[str] = None,
+        **kwargs
+        ) -> dict:
+    """encode the video once to the renditions of many playlists, to
+    package every playlist by stitch_playlist_chunks without encoding
+
+    Args:
+        self:
+        *args:
+        video_path:
+            The local input path
+        encode_format:
+        video_codec:
+        quality_names:
+        custom_qualities:
+        per_title:
+        request_id:
+        output_ids:
+            ids of the playlists that use the renditions
+        **kwargs:
+            some unused parameters from previous tasks that set by __call__
+
+    Required parameters:
+        - request_id
+        - output_ids
+        - video_path
+
+    Returns:
+        a dict includes video_path, chunks_directory, total_chunks and
+        custom_qualities of the renditions
+
+    """
+
+    self.check_encode_shared_renditions_requirements(
+        request_id=request_id,
+        output_ids=output_ids,
+        video_path=video_path)
+
+    if self.is_forced_to_stop(request_id):
+        raise self.raise_revoke(request_id)
+    if all(self.is_output_forced_to_stop(request_id, output_id)
+           for output_id in output_ids):
+        raise self.raise_revoke_output(request_id, None)
+
+    # a streaming input can be downloaded by tee_input
+    video_path = self.get_video_input(video_path, request_id)
+
+    # save primary status using request_id
+    self.save_primary_status(
+        self.primary_status.OUTPUTS_PROGRESSING,
+        request_id)
+
+    for output_id in output_ids:
+        self.save_output_status(
+            self.output_status.PREPARATION_PROCESSING,
+            output_id,
+            request_id)
+
+    protocol = self.initial_protocol(
+        video_path,
+        None,
+        request_id,
+        encode_format,
+        video_codec=video_codec,
+        quality_names=quality_names,
+        custom_qualities=custom_qualities,
+        output_ids=output_ids,
+        per_title=per_title)
+
+    chunks_directory = self.get_chunks_directory(
+        request_id,
+        "_".join(output_ids))
+    rendition_paths = []
+    for rep_number in range(len(protocol.reps)):
+        rendition_path = self.get_rendition_path(
+            chunks_directory,
+            rep_number,
+            0)
+        # create directory with all parents, to prevent ffmpeg error
+        Path(os.path.dirname(rendition_path)).mkdir(
+            parents=True, exist_ok=True)
+        rendition_paths.append(rendition_path)
+
+    callback = FfmpegCallback(
+        task=self,
+        task_id=self.request.id.__str__(),
+        request_id=request_id,
+        output_ids=output_ids
+    )
+    with self.hold_tenant_slot(request_id, self.tenant_quota.ENCODE), \
+            self.hold_cpu_slots(
+                self.protocol_cost(protocol, request_id)) as slots:
+        try:
+            run_command(
+                self.encode_chunk_command(
+                    protocol,
+                    video_path,
+                    rendition_paths,
+                    slots=slots),
+                callback.progress)
+        except Exception as e:
+
+            if self.is_forced_to_stop(request_id):
+                raise self.raise_revoke(request_id)
+
+            # notice : video processing has cost to retry
+            raise self.retry(
+                exc=e,
+                max_retries=settings.TASK_RETRY_FFMPEG_COMMAND_MAX)
+
+    # it's possible process killed in FfmpegCallback
+    # so, checking the force stop before continuing
+    if self.is_forced_to_stop(request_id):
+        raise self.raise_revoke(request_id)
+
+    # save the last coalesced progress and usage
+    callback.flush()
+
+    return dict(
+        # the audio of the video will be packaged by every playlist
+        video_path=video_path,
+        chunks_directory=chunks_directory,
+        total_chunks=1,
+        # to package the same representations, also auto generated
+        custom_qualities=self.reps_to_qualities(protocol.reps))
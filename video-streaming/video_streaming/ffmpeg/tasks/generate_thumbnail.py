@@ -82,6 +82,9 @@ def generate_thumbnail(
     if self.is_output_forced_to_stop(request_id, output_id):
         raise self.raise_revoke_output(request_id, output_id)
 
+    # a streaming input can be downloaded by tee_input
+    video_path = self.get_video_input(video_path, request_id)
+
     # save primary status using request_id
     self.save_primary_status(
         self.primary_status.OUTPUTS_PROGRESSING,
@@ -121,7 +124,8 @@ def generate_thumbnail(
         (ffmpeg
             .input(
                 video_path,
-                ss=thumbnail_time)
+                ss=thumbnail_time,
+                **self.get_input_options(video_path))
             .filter(
                 'scale',
                 scale_width,
@@ -55,9 +55,15 @@ def inputs_funnel(self,
                   request_id: str = None,
                   watermark_path: str = None,
                   video_path: str = None,
+                  funnel_id: str = None,
+                  total_dependencies: int = None,
                   **kwargs
                   ) -> dict:
-    """
+    """join the dependencies of a node of the job graph
+
+    every dependency of the node sends one message to this task,
+    the last one of them continues the chain and others are ignored.
+    when funnel_id is None, it waits for all inputs of the job.
 
     Args:
         self ():
@@ -65,6 +71,8 @@ def inputs_funnel(self,
         request_id ():
         watermark_path ():
         video_path ():
+        funnel_id (): the name of the node that waits for the funnel
+        total_dependencies (): number of the node dependencies
         **kwargs ():
 
     Returns:
@@ -82,9 +90,7 @@ def inputs_funnel(self,
     if self.is_forced_to_stop(request_id):
         raise self.raise_revoke(request_id)
 
-    job_details: dict = self.cache.get(
-        CacheKeysTemplates.JOB_DETAILS.format(
-            request_id=request_id))
+    job_details: dict = self.get_job_details(request_id)
     if not job_details:
         self.save_job_stop_reason(
             self.stop_reason.JOB_TIMEOUT,
@@ -92,7 +98,17 @@ def inputs_funnel(self,
         raise self.raise_ignore(
             message=self.error_messages.JOB_DETAILS_NOT_FOUND,
             request_kwargs=self.request.kwargs)
-    total_inputs: int = job_details['total_inputs']
+
+    # dependencies are running in parallel, so one of them can be
+    # failed while others are finished, do not continue the job
+    if not self.can_set_status(request_id):
+        # the inputs that have been downloaded are not used anymore
+        if self.delete_inputs:
+            self.inputs_remover(request_id=request_id)
+        raise self.raise_ignore(
+            message=self.error_messages.JOB_HAS_BEEN_STOPPED,
+            state=states.REVOKED,
+            request_kwargs=self.request.kwargs)
 
     if video_path:
         self.cache.set(
@@ -107,8 +123,16 @@ def inputs_funnel(self,
             watermark_path
         )
 
-    aggregated_inputs: int = self.incr("AGGREGATED_INPUTS", request_id)
-    if aggregated_inputs != total_inputs:
+    if funnel_id is None:
+        total: int = job_details['total_inputs']
+        aggregated: int = self.incr("AGGREGATED_INPUTS", request_id)
+    else:
+        total: int = total_dependencies
+        aggregated: int = self.incr(
+            "FUNNEL_DEPENDENCIES",
+            request_id,
+            funnel_id=funnel_id)
+    if aggregated != total:
         # do not stop the job, just ignore this task
         raise self.raise_ignore(
             message=self.error_messages.WAITING_FOR_AGGREGATE_INPUTS,
@@ -127,6 +151,3 @@ def inputs_funnel(self,
             decode=False
         )
     )
-
-
-
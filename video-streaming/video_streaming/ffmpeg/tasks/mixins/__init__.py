@@ -10,7 +10,9 @@ from .analyze_input import AnalyzeInputMixin
 from .output import BaseOutputMixin
 from .generate_thumbnail import GenerateThumbnailMixin
 from .upload_file import UploadFileMixin
+from .per_title import PerTitleMixin
 from .create_playlist import CreatePlaylistMixin
+from .playlist_chunks import PlaylistChunksMixin
 from .upload_directory import UploadDirectoryMixin
 from .call_webhook import CallWebhookMixin
 
@@ -1,7 +1,6 @@
 import json
 import urllib3
 from celery import Task
-from video_streaming.core.constants import CacheKeysTemplates
 from video_streaming.core.tasks import BaseTask
 from video_streaming.ffmpeg.tasks.base import BaseStreamingTask
 
@@ -9,6 +8,7 @@ from video_streaming.ffmpeg.tasks.base import BaseStreamingTask
 class CallWebhookMixin(object):
 
     cache: BaseStreamingTask.cache
+    get_job_details: BaseStreamingTask.get_job_details
     logger: BaseStreamingTask.logger
     error_messages: BaseStreamingTask.error_messages
     raise_ignore: BaseTask.raise_ignore
@@ -23,9 +23,7 @@ class CallWebhookMixin(object):
         returns True when delivered by 2xx HTTP status
         """
 
-        job_details: dict = self.cache.get(
-            CacheKeysTemplates.JOB_DETAILS.format(
-                request_id=request_id))
+        job_details: dict = self.get_job_details(request_id)
         if job_details is None:
             return None
 
@@ -1,13 +1,15 @@
 from celery import states
-from video_streaming.core.constants import CacheKeysTemplates
 from video_streaming.ffmpeg.tasks.base import BaseStreamingTask
 
 
 class BaseCheckMixin(object):
     cache: BaseStreamingTask.cache
+    cancellation_bus: BaseStreamingTask.cancellation_bus
     primary_status: BaseStreamingTask.primary_status
+    delete_inputs: BaseStreamingTask.delete_inputs
+    inputs_remover: BaseStreamingTask.inputs_remover
 
-    incr: BaseStreamingTask.incr
+    incr_to_primary_status: BaseStreamingTask.incr_to_primary_status
     save_primary_status: BaseStreamingTask.save_primary_status
 
     def save_failed(self, request_id):
@@ -18,6 +20,12 @@ class BaseCheckMixin(object):
             self.primary_status.FAILED,
             request_id
         )
+        # the checks run alongside the downloads and the outputs, the
+        # running ffmpeg processes of the job are killed, and the
+        # outputs stop by is_forced_to_stop
+        self.cancellation_bus.publish(request_id)
+        if self.delete_inputs:
+            self.inputs_remover(request_id=request_id)
 
     def on_failure(self, *request_args, **request_kwargs):
         request_id = request_kwargs.get('request_id', None)
@@ -39,13 +47,8 @@ class BaseCheckMixin(object):
             request_kwargs=request_kwargs)
 
     def incr_passed_checks(self, request_id):
-        job_details: dict = self.cache.get(
-            CacheKeysTemplates.JOB_DETAILS.format(
-                request_id=request_id))
-        if job_details:
-            passed_checks = self.incr("PASSED_CHECKS", request_id)
-            if passed_checks == job_details['total_checks']:
-                self.save_primary_status(
-                    self.primary_status.CHECKS_FINISHED,
-                    request_id
-                )
+        self.incr_to_primary_status(
+            "PASSED_CHECKS",
+            'total_checks',
+            self.primary_status.CHECKS_FINISHED,
+            request_id)
@@ -1,19 +1,37 @@
 import os
+import json
 import ffmpeg_streaming
 from celery import Task
 from ffmpeg_streaming import Representation, Size, Bitrate
+from ffmpeg_streaming._reperesentation import AutoRep
+from ffmpeg_streaming.ffprobe import Streams
 from video_streaming import settings
+from video_streaming.core.constants.cache_keys import CacheKeysTemplates
 from video_streaming.ffmpeg.constants import Resolutions, \
     VideoEncodingFormats
 from video_streaming.ffmpeg.tasks.base import BaseStreamingTask
+from video_streaming.ffmpeg.utils import SegmentsUploader
 from .output import BaseOutputMixin
+from .per_title import PerTitleMixin
 
 
-class CreatePlaylistMixin(BaseOutputMixin):
+class CreatePlaylistMixin(PerTitleMixin, BaseOutputMixin):
+
+    # encoders of the formats that can copy the video or audio of the
+    # input, instead of encoding it again
+    H264_ENCODERS = ['libx264', 'h264', 'h264_amf', 'h264_nvenc']
+    AAC_ENCODERS = ['aac', 'libvo_aacenc', 'libfaac', 'libfdk_aac']
+    # the bitrate of the AAC encoders of ffmpeg, when it's not set
+    DEFAULT_AUDIO_BITRATE = 128000
 
     stop_reason: BaseStreamingTask.stop_reason
     error_messages: BaseStreamingTask.error_messages
     save_job_stop_reason: BaseStreamingTask.save_job_stop_reason
+    is_url: BaseStreamingTask.is_url
+    get_input_options: BaseStreamingTask.get_input_options
+    encoding_cost: BaseStreamingTask.encoding_cost
+    get_video_probe: BaseStreamingTask.get_video_probe
+    get_video_input: BaseStreamingTask.get_video_input
 
     request = Task.request
     retry: Task.retry
@@ -59,6 +77,30 @@ class CreatePlaylistMixin(BaseOutputMixin):
                 OUTPUT_PATH_OR_S3_OUTPUT_KEY_IS_REQUIRED,
                 request_kwargs=self.request.kwargs)
 
+    def start_segments_uploader(
+            self,
+            directory: str,
+            s3_output_key: str = None,
+            s3_output_bucket: str = None,
+            request_id: str = None,
+            output_id: str = None) -> None or SegmentsUploader:
+        """start uploading the finished segments of the directory in
+        background, stop it after the ffmpeg has been finished
+        """
+        if not settings.UPLOAD_SEGMENTS_WHILE_PROCESSING or \
+                s3_output_key is None or s3_output_bucket is None:
+            return None
+
+        segments_uploader = SegmentsUploader(
+            task=self,
+            directory=directory,
+            s3_output_key=s3_output_key,
+            s3_output_bucket=s3_output_bucket,
+            output_id=output_id,
+            request_id=request_id)
+        segments_uploader.start()
+        return segments_uploader
+
     def initial_protocol(
             self,
             input_path: str,
@@ -70,14 +112,26 @@ class CreatePlaylistMixin(BaseOutputMixin):
             is_hls: bool = None,
             fragmented: bool = None,
             quality_names: list[str] = None,
-            custom_qualities: list[dict] = None):
+            custom_qualities: list[dict] = None,
+            output_ids: list[str] = None,
+            per_title: bool = False):
 
         """build HLS or MPEG ffmpeg command
         using ffmpeg_streaming package
+
+        the representations are planned by the cached ffprobe data of
+        the video input, the pruned representations are saved for
+        output_ids or output_id, output_ids are the outputs of the
+        shared representations. per_title sets the bitrates by the
+        complexity of the video, see PerTitleMixin. the streams of the
+        input that match a representation are copied, see
+        stream_copy_representations
         """
-        # checking file is exist and not empty
+        # checking file is exist and not empty, a streaming input has
+        # been checked by check_input_key
         try:
-            if os.stat(input_path).st_size == 0:
+            if not self.is_url(input_path) and \
+                    os.stat(input_path).st_size == 0:
                 self.save_output_status(
                     self.output_status.OUTPUT_FAILED,
                     output_id,
@@ -102,7 +156,9 @@ class CreatePlaylistMixin(BaseOutputMixin):
                 message=self.error_messages.INPUT_FILE_IS_NOT_FOUND,
                 request_kwargs=self.request.kwargs)
 
-        video = ffmpeg_streaming.input(input_path)
+        video = ffmpeg_streaming.input(
+            input_path,
+            **self.get_input_options(input_path))
         format_instance = VideoEncodingFormats().get_format_class(
             encode_format,
             video=video_codec,
@@ -121,22 +177,31 @@ class CreatePlaylistMixin(BaseOutputMixin):
         add to the protocol instance
         """
 
+        source = self.source_representation(request_id)
+        reps = []
+
         # generate default representations
         if not (custom_qualities or quality_names):
-            try:
-                protocol.auto_generate_representations(
-                    ffprobe_bin=settings.FFPROBE_BIN_PATH)
-                return
-            except RuntimeError as e:
-                # TODO capture error and notify developer
-                raise self.retry(exc=e)
-            except Exception as e:
-                # FileNotFoundError:
-                # [Errno 2] No such file or directory: 'ffprobe'
-                # TODO capture error and notify developer
-                raise self.retry(exc=e)
-
-        reps = []
+            if source:
+                # same as auto_generate_representations without
+                # probing the input again
+                reps.extend(AutoRep(
+                    source.size,
+                    source.bitrate,
+                    protocol.format))
+            else:
+                try:
+                    protocol.auto_generate_representations(
+                        ffprobe_bin=settings.FFPROBE_BIN_PATH)
+                    return protocol
+                except RuntimeError as e:
+                    # TODO capture error and notify developer
+                    raise self.retry(exc=e)
+                except Exception as e:
+                    # FileNotFoundError:
+                    # [Errno 2] No such file or directory: 'ffprobe'
+                    # TODO capture error and notify developer
+                    raise self.retry(exc=e)
 
         # quality_names is like ["360p","480p","720p"]
         if quality_names:
@@ -146,7 +211,7 @@ class CreatePlaylistMixin(BaseOutputMixin):
 
         # custom_qualities is like :
         # [dict(size=[256, 144], bitrate=[97280, 65536])]
-        for quality in custom_qualities:
+        for quality in custom_qualities or []:
             size = quality.get('size', None)
             bitrate = quality.get('bitrate', None)
 
@@ -175,10 +240,252 @@ class CreatePlaylistMixin(BaseOutputMixin):
             reps.append(
                 Representation(
                     Size(*size),
-                    Bitrate(*bitrate))
+                    Bitrate(*bitrate),
+                    # e.g. the copied streams of the planned
+                    # representations, see reps_to_qualities
+                    **quality.get('options', {}))
             )
 
+        pruned: list[dict] = []
+        if source and settings.PRUNE_REPRESENTATIONS_TO_SOURCE:
+            reps, pruned = self.prune_representations(
+                reps,
+                source,
+                protocol.format.multiply())
+        if per_title:
+            reps, dropped = self.per_title_representations(
+                input_path,
+                reps,
+                source,
+                output_ids or [output_id],
+                request_id)
+            pruned.extend(dropped)
+        # the chunks are encoded by the planned representations, so
+        # nothing is pruned again
+        if pruned:
+            self.save_pruned_representations(
+                pruned,
+                output_ids or [output_id],
+                request_id)
+
+        # a chunk or the watermarked video is not the analyzed input,
+        # the chunks get the copied streams by their options
+        if source and settings.STREAM_COPY_MATCHING_REPRESENTATIONS and \
+                self.is_source_video(input_path, request_id):
+            reps = self.stream_copy_representations(
+                reps,
+                source,
+                self.get_video_probe(request_id),
+                protocol.format,
+                is_hls)
+
         # generate representations
         protocol.representations(*reps)
 
         return protocol
+
+    def source_representation(
+            self, request_id: str) -> None or Representation:
+        """size and bitrate of the video input by its cached ffprobe
+        data, same as FFProbe.video_size and FFProbe.bitrate, None when
+        the input has been not analyzed
+        """
+        ffprobe_data = self.get_video_probe(request_id)
+        if not ffprobe_data:
+            return None
+        streams = Streams(ffprobe_data['streams'])
+        video = streams.video()
+        width = int(video.get('width', 0))
+        height = int(video.get('height', 0))
+        overall = int(ffprobe_data.get('format', {}).get('bit_rate', 0))
+        if not (width and height and overall):
+            return None
+        return Representation(
+            Size(width, height),
+            Bitrate(
+                int(video.get('bit_rate', 0)),
+                int(streams.audio().get('bit_rate', 0)),
+                overall))
+
+    @staticmethod
+    def prune_representations(
+            reps: list[Representation],
+            source: Representation,
+            multiple: int = 2
+    ) -> tuple[list[Representation], list[dict]]:
+        """drop the representations that are higher than the source and
+        cap the video bitrate of the rest by the source, encoding them
+        just wastes CPU and storage without any quality
+
+        when all of them are higher, the lowest one is scaled to the
+        source, to have a representation. returns the representations
+        and the pruned ones, as OUTPUT_PRUNED_REPRESENTATIONS
+        """
+        max_bitrate = source.bitrate.calc_video(convert=False)
+        kept: list[Representation] = []
+        pruned: list[dict] = []
+        for rep in reps:
+            bitrate = rep.bitrate.calc_video(convert=False)
+            details = dict(
+                width=rep.size.width,
+                height=rep.size.height,
+                bitrate=bitrate)
+            if rep.size.height > source.size.height:
+                pruned.append(dict(details, dropped=True))
+                continue
+            if bitrate > max_bitrate:
+                rep = Representation(
+                    rep.size,
+                    Bitrate(
+                        max_bitrate,
+                        rep.bitrate.audio_,
+                        None if rep.bitrate.overall_ is None
+                        else max_bitrate + (rep.bitrate.audio_ or 0)),
+                    **rep.options)
+                pruned.append(dict(
+                    details,
+                    dropped=False,
+                    capped_width=rep.size.width,
+                    capped_height=rep.size.height,
+                    capped_bitrate=max_bitrate))
+            kept.append(rep)
+
+        if reps and not kept:
+            lowest = min(reps, key=lambda item: item.size.height)
+            ratio = source.size.ratio
+            height = ratio.calculate_height(source.size.width, multiple)
+            size = Size(ratio.calculate_width(height, multiple), height)
+            bitrate = min(
+                lowest.bitrate.calc_video(convert=False),
+                max_bitrate)
+            kept.append(Representation(
+                size,
+                Bitrate(bitrate, lowest.bitrate.audio_, None),
+                **lowest.options))
+            pruned[reps.index(lowest)].update(
+                dropped=False,
+                capped_width=size.width,
+                capped_height=size.height,
+                capped_bitrate=bitrate)
+        return kept, pruned
+
+    def save_pruned_representations(
+            self,
+            pruned: list[dict],
+            output_ids: list[str],
+            request_id: str):
+        pruned = json.dumps(pruned)
+        self.cache.set_many({
+            CacheKeysTemplates.OUTPUT_PRUNED_REPRESENTATIONS.format(
+                request_id=request_id,
+                output_id=output_id): pruned
+            for output_id in output_ids if output_id is not None})
+
+    def is_source_video(self, input_path: str, request_id: str) -> bool:
+        """the input path is the video input of the job, or the tee of
+        it, that its ffprobe data has been cached
+        """
+        video_path = self.cache.get(
+            CacheKeysTemplates.INPUT_VIDEO_PATH.format(
+                request_id=request_id),
+            decode=False)
+        return bool(video_path) and input_path in (
+            video_path,
+            self.get_video_input(video_path, request_id))
+
+    def stream_copy_representations(
+            self,
+            reps: list[Representation],
+            source: Representation,
+            ffprobe_data: dict,
+            _format,
+            is_hls: bool) -> list[Representation]:
+        """copy the H.264 video of the input to the representation in
+        the same size that its bitrate is not lower than the input, and
+        the AAC audio of the input, that its bitrate is known, to the
+        representations that their audio bitrates are not lower than
+        it, instead of encoding them again.
+        STREAM_COPY_BITRATE_TOLERANCE is the tolerance of the bitrates.
+
+        the video is copied just when STREAM_COPY_VIDEO is set, the
+        keyframes of the encoded representations are forced on
+        SEGMENT_DURATION, but the copied video keeps the keyframes of
+        the input, so the segments of the playlist would not be aligned
+
+        the streams are copied by the codec options of the
+        representations, see copied_streams. all representations of
+        DASH are one output, so the options have the stream index
+        """
+        streams = Streams(ffprobe_data['streams'])
+        video = streams.video()
+        audio = streams.audio()
+        # every representation of DASH maps all streams of the input
+        can_copy_video = settings.STREAM_COPY_VIDEO and \
+            _format.video in self.H264_ENCODERS and \
+            video.get('codec_name') == 'h264' and \
+            video.get('pix_fmt') == 'yuv420p' and \
+            (is_hls or len(list(streams.videos())) == 1)
+        can_copy_audio = _format.audio in self.AAC_ENCODERS and \
+            audio.get('codec_name') == 'aac' and \
+            (is_hls or len(list(streams.audios())) == 1)
+        video_bitrate = source.bitrate.calc_video(convert=False)
+        audio_bitrate = int(audio.get('bit_rate', 0))
+        tolerance = settings.STREAM_COPY_BITRATE_TOLERANCE
+
+        planned: list[Representation] = []
+        for rep_number, rep in enumerate(reps):
+            stream_index = '' if is_hls else f':{rep_number}'
+            options = dict(rep.options)
+            bitrate = rep.bitrate
+            if can_copy_video and \
+                    rep.size.width == source.size.width and \
+                    rep.size.height == source.size.height and \
+                    video_bitrate <= rep.bitrate.calc_video(
+                        convert=False) * tolerance:
+                options['c:v' + stream_index] = 'copy'
+                # the playlist has the bitrate of the copied video
+                bitrate = Bitrate(
+                    video_bitrate,
+                    rep.bitrate.audio_,
+                    None if rep.bitrate.overall_ is None
+                    else video_bitrate + (rep.bitrate.audio_ or 0))
+            # a representation without the audio bitrate is encoded by
+            # the default bitrate of the encoder
+            if can_copy_audio and 0 < audio_bitrate <= (
+                    rep.bitrate.audio_ or
+                    self.DEFAULT_AUDIO_BITRATE) * tolerance:
+                options['c:a' + stream_index] = 'copy'
+            if options == rep.options:
+                planned.append(rep)
+                continue
+            planned.append(Representation(rep.size, bitrate, **options))
+        return planned
+
+    @staticmethod
+    def copied_streams(rep: Representation) -> set[str]:
+        """'v' and 'a' when the video or audio of the representation is
+        copied from the input
+        """
+        return {
+            key.split(':')[1]
+            for key, value in rep.options.items()
+            if key.startswith('c:') and value == 'copy'}
+
+    def protocol_cost(self, protocol, request_id: str) -> int:
+        """CPU slots to encode all representations of the protocol, the
+        copied videos are not encoded
+        """
+        return self.encoding_cost(
+            request_id,
+            [(rep.size.width, rep.size.height) for rep in protocol.reps
+             if 'v' not in self.copied_streams(rep)])
+
+    @staticmethod
+    def set_encoder_threads(protocol, slots: int, is_hls: bool):
+        """share the granted CPU slots between the encoders as -threads,
+        every representation of HLS is a separate output of ffmpeg, but
+        all representations of DASH are one output
+        """
+        total_outputs = len(list(protocol.reps)) if is_hls else 1
+        protocol.format.codec_options['threads'] = max(
+            1, slots // max(1, total_outputs))
@@ -12,6 +12,7 @@ class DownloadInputMixin(BaseInputMixin):
     stop_reason: BaseStreamingTask.stop_reason
     error_messages: BaseStreamingTask.error_messages
     s3_service: BaseStreamingTask.s3_service
+    input_cache: BaseStreamingTask.input_cache
     get_inputs_root_directory: BaseStreamingTask.get_inputs_root_directory
     save_job_stop_reason: BaseStreamingTask.save_job_stop_reason
 
@@ -94,6 +95,19 @@ class DownloadInputMixin(BaseInputMixin):
 
         return input_path
 
+    def get_input_cache_id(self,
+                           object_details,
+                           s3_input_key,
+                           s3_input_bucket) -> None or str:
+        """returns None when the input can not be cached"""
+        etag = object_details.get('ETag')
+        if not self.input_cache.enabled or not etag:
+            return None
+        return self.input_cache.get_object_id(
+            s3_input_bucket,
+            s3_input_key,
+            etag)
+
     def download_video(self,
                        input_path,
                        object_details,
@@ -105,8 +119,8 @@ class DownloadInputMixin(BaseInputMixin):
         """download video to local input path
 
         1. get video size
-        2. initial callback of downloader
-        3. download video from s3 cloud
+        2. link the input from the inputs cache if it's cached
+        3. download video from s3 cloud and add it to the cache
 
         returns False when the input video is 404 or 403
         """
@@ -138,6 +152,59 @@ class DownloadInputMixin(BaseInputMixin):
                 message=self.error_messages.INPUT_SIZE_CAN_NOT_BE_ZERO,
                 request_kwargs=self.request.kwargs)
 
+        input_cache_id = self.get_input_cache_id(
+            object_details,
+            s3_input_key,
+            s3_input_bucket)
+        if input_cache_id is None:
+            return self._download_video(
+                input_path,
+                object_size,
+                s3_input_key,
+                s3_input_bucket,
+                input_number,
+                request_id)
+
+        # the workers that need the same input wait for one download
+        with self.input_cache.object_lock(input_cache_id):
+            try:
+                if self.input_cache.link(
+                        input_cache_id,
+                        request_id,
+                        input_path):
+                    return True
+            except OSError as e:
+                # TODO notify developer
+                print(e)
+
+            downloaded = self._download_video(
+                input_path,
+                object_size,
+                s3_input_key,
+                s3_input_bucket,
+                input_number,
+                request_id)
+            if downloaded:
+                try:
+                    self.input_cache.add(
+                        input_cache_id,
+                        request_id,
+                        input_path)
+                except OSError as e:
+                    # TODO notify developer
+                    print(e)
+            return downloaded
+
+    def _download_video(self,
+                        input_path,
+                        object_size,
+                        s3_input_key,
+                        s3_input_bucket,
+                        input_number,
+                        request_id
+                        ) -> bool:
+        """download video from s3 cloud with progress callback"""
+
         # Initial callback
         download_callback = S3DownloadCallback(
             object_size,
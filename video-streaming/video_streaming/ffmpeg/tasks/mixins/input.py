@@ -1,5 +1,6 @@
 from celery import states
 from video_streaming.core.constants.cache_keys import CacheKeysTemplates
+from video_streaming.core.constants.cache_scripts import CacheScripts
 from video_streaming.ffmpeg.tasks.base import BaseStreamingTask
 
 
@@ -10,8 +11,11 @@ class BaseInputMixin(object):
     cache: BaseStreamingTask.cache
     logger: BaseStreamingTask.logger
 
-    incr: BaseStreamingTask.incr
+    incr_to_primary_status: BaseStreamingTask.incr_to_primary_status
     save_primary_status: BaseStreamingTask.save_primary_status
+    job_hash: BaseStreamingTask.job_hash
+    job_field: BaseStreamingTask.job_field
+    notify_job_change: BaseStreamingTask.notify_job_change
 
     def save_failed(self, request_id, input_number):
         """
@@ -73,14 +77,33 @@ class BaseInputMixin(object):
             # input_number has been not set
             return None
 
-        if not self.cache.get(CacheKeysTemplates.JOB_DETAILS.format(
-                request_id=request_id)):
-            # JOB_DETAILS has been not set
-            return None
+        # check to delete progress data of downloading
+        delete_fields: list[str] = []
+        if status_name == self.input_status.DOWNLOADING_FINISHED:
+            delete_fields.append(self.job_field(
+                "INPUT_DOWNLOADING_PROGRESS",
+                request_id,
+                input_number=input_number))
 
         # to prevent set input status after it was set to 'INPUT_FAILED'
-        if self.can_set_input_status(input_number, request_id):
-
+        # or 'INPUT_REVOKED', JOB_DETAILS is checked in the same script
+        is_set: int = self.cache.run_script(
+            CacheScripts.SET_STATUS,
+            keys=[self.job_hash(request_id)],
+            args=[
+                self.job_field("JOB_DETAILS", request_id),
+                self.job_field(
+                    "INPUT_STATUS",
+                    request_id,
+                    input_number=input_number),
+                status_name,
+                self.cache.TIMEOUT_SECOND,
+                2,
+                self.input_status.INPUT_REVOKED,
+                self.input_status.INPUT_FAILED,
+                *delete_fields])
+
+        if is_set == 1:
             # add input status name as message to logger
             log_message = f"input status: {status_name}"
             if request_id:
@@ -88,21 +111,7 @@ class BaseInputMixin(object):
             if input_number:
                 log_message += f" ,input number: {input_number}"
             self.logger.info(log_message)
-
-            self.cache.set(
-                CacheKeysTemplates.INPUT_STATUS.format(
-                    request_id=request_id,
-                    input_number=input_number),
-                status_name
-            )
-        
-        # check to delete progress data of downloading
-        if status_name == self.input_status.DOWNLOADING_FINISHED:
-            self.cache.delete(
-                CacheKeysTemplates.INPUT_DOWNLOADING_PROGRESS.format(
-                    request_id=request_id,
-                    input_number=input_number
-                ))
+            self.notify_job_change(request_id)
 
     def can_set_input_status(self,
                              input_number,
@@ -125,13 +134,8 @@ class BaseInputMixin(object):
         ]
 
     def incr_ready_inputs(self, request_id):
-        job_details: dict = self.cache.get(
-            CacheKeysTemplates.JOB_DETAILS.format(
-                request_id=request_id))
-        if job_details:
-            ready_inputs = self.incr("READY_INPUTS", request_id)
-            if ready_inputs == job_details['total_inputs']:
-                self.save_primary_status(
-                    self.primary_status.ALL_INPUTS_DOWNLOADED,
-                    request_id
-                )
+        self.incr_to_primary_status(
+            "READY_INPUTS",
+            'total_inputs',
+            self.primary_status.ALL_INPUTS_DOWNLOADED,
+            request_id)
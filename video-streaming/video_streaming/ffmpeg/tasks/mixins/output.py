@@ -1,6 +1,7 @@
 import os
 from celery import states, Task
 from video_streaming.core.constants.cache_keys import CacheKeysTemplates
+from video_streaming.core.constants.cache_scripts import CacheScripts
 from video_streaming.ffmpeg.tasks.base import BaseStreamingTask
 
 
@@ -14,8 +15,11 @@ class BaseOutputMixin(object):
     cache: BaseStreamingTask.cache
     logger: BaseStreamingTask.logger
 
-    incr: BaseStreamingTask.incr
-    save_primary_status: BaseStreamingTask.save_primary_status
+    log_primary_status: BaseStreamingTask.log_primary_status
+    index_primary_status: BaseStreamingTask.index_primary_status
+    job_hash: BaseStreamingTask.job_hash
+    job_field: BaseStreamingTask.job_field
+    notify_job_change: BaseStreamingTask.notify_job_change
     inputs_remover: BaseStreamingTask.inputs_remover
     outputs_remover: BaseStreamingTask.outputs_remover
     get_outputs_root_directory: BaseStreamingTask.\
@@ -79,55 +83,78 @@ class BaseOutputMixin(object):
             # input_number has been not set
             return None
 
-        if not self.cache.get(CacheKeysTemplates.JOB_DETAILS.format(
-                request_id=request_id)):
-            # JOB_DETAILS has been not set
-            return None
-
-        # to prevent set output status after it was set to
-        # in 'OUTPUT_FAILED' and 'OUTPUT_REVOKED'
-        if self.can_set_output_status(output_id, request_id):
-
-            # add output status name as message to logger
-            log_message = f"output status: {status_name}"
-            if request_id:
-                log_message += f" ,request id: {request_id}"
-            if output_id:
-                log_message += f" ,output id: {output_id}"
-            self.logger.info(log_message)
-
-            self.cache.set(
-                CacheKeysTemplates.OUTPUT_STATUS.format(
+        # the statuses that finish the output, and their counters
+        counter_template: str = {
+            self.output_status.OUTPUT_REVOKED: "REVOKED_OUTPUTS",
+            self.output_status.PROCESSING_FINISHED: "PROCESSED_OUTPUTS",
+            self.output_status.UPLOADING_FINISHED: "READY_OUTPUTS",
+            self.output_status.OUTPUT_FAILED: "FAILED_OUTPUTS",
+        }.get(status_name)
+
+        # JOB_DETAILS is checked, the status is set, the counter is
+        # incremented and finishing of all outputs is checked by
+        # one atomic round trip
+        result: list = self.cache.run_script(
+            CacheScripts.SET_OUTPUT_STATUS,
+            keys=[
+                self.job_hash(request_id),
+                CacheKeysTemplates.OUTPUT_CHUNKS_PROGRESS.format(
                     request_id=request_id,
+                    output_id=output_id)],
+            args=[
+                self.job_field("JOB_DETAILS", request_id),
+                self.job_field(
+                    "OUTPUT_STATUS",
+                    request_id,
                     output_id=output_id),
-                status_name
-            )
-
-            if status_name == self.output_status.OUTPUT_REVOKED:
-                self.incr("REVOKED_OUTPUTS", request_id)
-                self.check_all_outputs_are_finished(request_id)
-            elif status_name == self.output_status.PROCESSING_FINISHED:
-                self.incr("PROCESSED_OUTPUTS", request_id)
-                self.check_to_delete_inputs(request_id)
-                self.check_all_outputs_are_finished(request_id)
-            elif status_name == self.output_status.UPLOADING_FINISHED:
-                self.incr("READY_OUTPUTS", request_id)
-                self.check_all_outputs_are_finished(request_id)
-            elif status_name == self.output_status.OUTPUT_FAILED:
-                self.incr("FAILED_OUTPUTS", request_id)
-                self.check_all_outputs_are_finished(request_id)
+                status_name,
+                self.cache.TIMEOUT_SECOND,
+                self.job_field(counter_template, request_id)
+                if counter_template else "",
+                self.job_field(
+                    "OUTPUT_PROGRESS",
+                    request_id,
+                    output_id=output_id),
+                # to prevent set output status after it was set to
+                # in 'OUTPUT_FAILED' and 'OUTPUT_REVOKED'
+                self.output_status.OUTPUT_REVOKED,
+                self.output_status.OUTPUT_FAILED,
+                self.job_field("PRIMARY_STATUS", request_id),
+                self.primary_status.FINISHED,
+                self.primary_status.REVOKED,
+                self.primary_status.FAILED,
+                self.job_field("READY_OUTPUTS", request_id),
+                self.job_field("REVOKED_OUTPUTS", request_id),
+                self.job_field("FAILED_OUTPUTS", request_id),
+                self.job_field("PROCESSED_OUTPUTS", request_id)])
+
+        if result[0] != 1:
+            # JOB_DETAILS has been not set, or the output is failed
+            # or revoked already
+            return None
 
-            # check to delete unnecessary data
-            if status_name in [
-                    self.output_status.OUTPUT_REVOKED,
-                    self.output_status.PROCESSING_FINISHED,
-                    self.output_status.UPLOADING_FINISHED,
-                    self.output_status.OUTPUT_FAILED]:
-                self.cache.delete(
-                    CacheKeysTemplates.OUTPUT_PROGRESS.format(
-                        request_id=request_id,
-                        output_id=output_id
-                    ))
+        # add output status name as message to logger
+        log_message = f"output status: {status_name}"
+        if request_id:
+            log_message += f" ,request id: {request_id}"
+        if output_id:
+            log_message += f" ,output id: {output_id}"
+        self.logger.info(log_message)
+
+        _, primary_status, is_finished, is_processed = result
+        if primary_status:
+            self.log_primary_status(primary_status, request_id)
+            self.index_primary_status(request_id)
+        self.notify_job_change(request_id)
+
+        if self.delete_inputs and is_processed and \
+                status_name == self.output_status.PROCESSING_FINISHED:
+            # delete all local inputs
+            self.inputs_remover(request_id=request_id)
+
+        if self.delete_outputs and is_finished:
+            # all outputs are finished, failed or revoked
+            self.outputs_remover(request_id=request_id)
 
     def can_set_output_status(self,
                               output_id,
@@ -148,81 +175,6 @@ class BaseOutputMixin(object):
             self.output_status.OUTPUT_REVOKED,
             self.output_status.OUTPUT_FAILED]
 
-    def check_to_delete_inputs(self, request_id):
-        if self.delete_inputs:
-            job_details: dict = self.cache.get(
-                CacheKeysTemplates.JOB_DETAILS.format(
-                    request_id=request_id))
-            if job_details:
-                total_outputs: int = job_details['total_outputs']
-                processed_outputs: int = self.cache.get(
-                    CacheKeysTemplates.PROCESSED_OUTPUTS.format(
-                        request_id=request_id)) or 0
-                revoked_outputs: int = self.cache.get(
-                    CacheKeysTemplates.REVOKED_OUTPUTS.format(
-                        request_id=request_id)) or 0
-                failed_outputs: int = self.cache.get(
-                    CacheKeysTemplates.FAILED_OUTPUTS.format(
-                        request_id=request_id)) or 0
-
-                if total_outputs == (
-                        processed_outputs +
-                        revoked_outputs +
-                        failed_outputs):
-                    # delete all local inputs
-                    self.inputs_remover(request_id=request_id)
-
-    def check_all_outputs_are_finished(self, request_id):
-        """
-            1. check all outputs are finished
-            2. set primary status to 'FINISHED' or 'REVOKED' or 'FAILED'
-            3. remove local outputs files if delete_outputs flag is True
-        """
-
-        job_details: dict = self.cache.get(
-            CacheKeysTemplates.JOB_DETAILS.format(
-                request_id=request_id))
-        if job_details:
-            # calculate that all outputs are finished
-
-            total_outputs: int = job_details['total_outputs']
-            ready_outputs: int = self.cache.get(
-                CacheKeysTemplates.READY_OUTPUTS.format(
-                    request_id=request_id)) or 0
-            revoked_outputs: int = self.cache.get(
-                CacheKeysTemplates.REVOKED_OUTPUTS.format(
-                    request_id=request_id)) or 0
-            failed_outputs: int = self.cache.get(
-                CacheKeysTemplates.FAILED_OUTPUTS.format(
-                    request_id=request_id)) or 0
-
-            is_all_outputs_failed = total_outputs == failed_outputs
-            if is_all_outputs_failed:
-                self.save_primary_status(
-                    status_name=self.primary_status.FAILED,
-                    request_id=request_id
-                )
-
-            is_all_outputs_revoked = total_outputs == revoked_outputs
-            if is_all_outputs_revoked:
-                self.save_primary_status(
-                    self.primary_status.REVOKED,
-                    request_id
-                )
-
-            is_finished = total_outputs == (
-                        ready_outputs + revoked_outputs + failed_outputs)
-            if is_finished:
-                self.save_primary_status(
-                    self.primary_status.FINISHED,
-                    request_id
-                )
-
-            if self.delete_outputs:
-                if is_finished or is_all_outputs_failed or \
-                        is_all_outputs_revoked:
-                    self.outputs_remover(request_id=request_id)
-
     def is_output_forced_to_stop(
             self,
             request_id,
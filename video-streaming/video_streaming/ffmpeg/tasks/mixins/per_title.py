@@ -0,0 +1,211 @@
+import os
+import json
+import tempfile
+import ffmpeg
+from celery.exceptions import Retry
+from ffmpeg_streaming import Representation, Size, Bitrate
+from video_streaming import settings
+from video_streaming.core.constants.cache_keys import CacheKeysTemplates
+from video_streaming.ffmpeg.tasks.base import BaseStreamingTask
+from video_streaming.ffmpeg.utils import run_command
+
+
+class PerTitleMixin(object):
+    """content-adaptive representations, the bitrates are derived from
+    the complexity of the video instead of the same bitrates for every
+    video. a cartoon needs fewer bits than sports in the same size.
+
+    a few segments of the video are sampled and encoded by CRF in the
+    sizes of the representations, the bitrate of every size is what
+    the video needs for the quality of the CRF
+    """
+
+    cache: BaseStreamingTask.cache
+    logger: BaseStreamingTask.logger
+    tenant_quota: BaseStreamingTask.tenant_quota
+    get_input_options: BaseStreamingTask.get_input_options
+    get_video_probe: BaseStreamingTask.get_video_probe
+    encoding_cost: BaseStreamingTask.encoding_cost
+    hold_cpu_slots: BaseStreamingTask.hold_cpu_slots
+    hold_tenant_slot: BaseStreamingTask.hold_tenant_slot
+
+    # the complexity is measured by a fast encoder, the bitrates of
+    # Resolutions are the bitrates of it as well
+    SAMPLE_VIDEO_CODEC = "libx264"
+    SAMPLE_PRESET = "veryfast"
+    SAMPLE_FILENAME = "{size}_{number}.mkv"
+
+    @staticmethod
+    def sample_times(duration: float) -> list[tuple[float, float]]:
+        """start and duration of the samples, in the middle of equal
+        parts of the video, to skip the intro and the credits
+        """
+        samples = settings.PER_TITLE_SAMPLES
+        sample_duration = settings.PER_TITLE_SAMPLE_DURATION
+        if duration <= samples * sample_duration:
+            return [(0.0, duration)]
+        return [
+            (duration * (2 * number + 1) / (2 * samples) -
+             sample_duration / 2, sample_duration)
+            for number in range(samples)]
+
+    def sample_bitrates_command(
+            self,
+            input_path: str,
+            start: float,
+            duration: float,
+            sizes: list[Size],
+            sample_paths: list[str],
+            slots: int = None) -> list[str]:
+        """ffmpeg command to encode one sample of the video to all
+        sizes by CRF, the audio is not encoded
+        """
+        video = ffmpeg.input(
+            input_path,
+            ss=start,
+            t=duration,
+            **self.get_input_options(input_path))['v:0']
+        outputs = []
+        for size, sample_path in zip(sizes, sample_paths):
+            outputs.append(
+                video.output(
+                    sample_path,
+                    **{
+                        'c:v': self.SAMPLE_VIDEO_CODEC,
+                        'preset': self.SAMPLE_PRESET,
+                        'crf': settings.PER_TITLE_CRF,
+                        's': str(size),
+                        'threads': max(1, (slots or 1) // len(sizes)),
+                        'an': None
+                    }))
+        return ffmpeg.merge_outputs(*outputs).compile(
+            cmd=settings.FFMPEG_BIN_PATH,
+            overwrite_output=True)
+
+    def get_sample_bitrates(
+            self,
+            input_path: str,
+            sizes: list[Size],
+            duration: float,
+            request_id: str) -> dict[str, int]:
+        """CRF bitrates of the video by the sizes as "widthxheight",
+        they are cached for the other playlists of the job
+        """
+        key = CacheKeysTemplates.INPUT_SAMPLE_BITRATES.format(
+            request_id=request_id)
+        bitrates: dict[str, int] = self.cache.get(key) or {}
+        sizes = [size for size in sizes if str(size) not in bitrates]
+        if not sizes:
+            return bitrates
+
+        total_bytes: dict[str, int] = dict.fromkeys(map(str, sizes), 0)
+        total_duration = 0.0
+        cost = self.encoding_cost(
+            request_id,
+            [(size.width, size.height) for size in sizes])
+        with self.hold_tenant_slot(request_id, self.tenant_quota.ENCODE), \
+                self.hold_cpu_slots(cost) as slots, \
+                tempfile.TemporaryDirectory() as directory:
+            for number, (start, sample_duration) in enumerate(
+                    self.sample_times(duration)):
+                sample_paths = [
+                    os.path.join(directory, self.SAMPLE_FILENAME.format(
+                        size=size, number=number))
+                    for size in sizes]
+                run_command(self.sample_bitrates_command(
+                    input_path,
+                    start,
+                    sample_duration,
+                    sizes,
+                    sample_paths,
+                    slots=slots))
+                total_duration += min(sample_duration, duration - start)
+                for size, sample_path in zip(sizes, sample_paths):
+                    total_bytes[str(size)] += os.path.getsize(sample_path)
+
+        for size, size_bytes in total_bytes.items():
+            bitrates[size] = int(size_bytes * 8 / total_duration)
+        self.cache.set(key, json.dumps(bitrates))
+        return bitrates
+
+    def per_title_representations(
+            self,
+            input_path: str,
+            reps: list[Representation],
+            source: None or Representation,
+            output_ids: list[str],
+            request_id: str
+    ) -> tuple[list[Representation], list[dict]]:
+        """set the video bitrates of the representations by the CRF
+        bitrates of the video, between PER_TITLE_MIN_FACTOR and
+        PER_TITLE_MAX_FACTOR of their bitrates. a representation that
+        is not PER_TITLE_MIN_BITRATE_STEP times cheaper than the higher
+        one is dropped.
+
+        returns the representations and the dropped ones, as
+        OUTPUT_PRUNED_REPRESENTATIONS. when sampling the video has been
+        failed, the requested bitrates are used and it's saved as
+        OUTPUT_PER_TITLE_FAILED of the outputs
+        """
+        ffprobe_data: dict = self.get_video_probe(request_id) or {}
+        duration = float(ffprobe_data.get('format', {}).get('duration', 0))
+        if not reps or duration <= 0:
+            return reps, []
+
+        try:
+            bitrates = self.get_sample_bitrates(
+                input_path,
+                [rep.size for rep in reps],
+                duration,
+                request_id)
+        except Retry:
+            # the slots have been not free
+            raise
+        except Exception as e:
+            # the requested bitrates are used
+            # TODO notify developer
+            self.logger.error(
+                f"per title sampling has been failed: {e}"
+                f" ,request id: {request_id}")
+            self.cache.set_many({
+                CacheKeysTemplates.OUTPUT_PER_TITLE_FAILED.format(
+                    request_id=request_id,
+                    output_id=output_id): json.dumps(True)
+                for output_id in output_ids if output_id is not None})
+            return reps, []
+
+        max_bitrate = source.bitrate.calc_video(convert=False) \
+            if source else None
+        # index of the representation -> the planned representation
+        planned: dict[int, Representation] = {}
+        dropped: list[dict] = []
+        lower_bound: None or int = None
+        for index, rep in sorted(
+                enumerate(reps),
+                key=lambda item: item[1].size.height,
+                reverse=True):
+            requested = rep.bitrate.calc_video(convert=False)
+            bitrate = min(
+                max(bitrates[str(rep.size)],
+                    requested * settings.PER_TITLE_MIN_FACTOR),
+                requested * settings.PER_TITLE_MAX_FACTOR)
+            if max_bitrate:
+                bitrate = min(bitrate, max_bitrate)
+            bitrate = int(bitrate)
+            if lower_bound is not None and bitrate > lower_bound:
+                dropped.append(dict(
+                    width=rep.size.width,
+                    height=rep.size.height,
+                    bitrate=requested,
+                    dropped=True))
+                continue
+            lower_bound = int(bitrate / settings.PER_TITLE_MIN_BITRATE_STEP)
+            planned[index] = Representation(
+                rep.size,
+                Bitrate(
+                    bitrate,
+                    rep.bitrate.audio_,
+                    None if rep.bitrate.overall_ is None
+                    else bitrate + (rep.bitrate.audio_ or 0)),
+                **rep.options)
+        return [planned[index] for index in sorted(planned)], dropped
@@ -0,0 +1,410 @@
+import os
+import csv
+import math
+import shutil
+import time
+import ffmpeg
+from pathlib import Path
+from ffmpeg_streaming import FFProbe
+from ffmpeg_streaming.ffprobe import Streams
+from video_streaming import settings
+from video_streaming.core.constants import CacheKeysTemplates
+from video_streaming.ffmpeg.tasks.base import BaseStreamingTask
+from .create_playlist import CreatePlaylistMixin
+
+
+class PlaylistChunksMixin(CreatePlaylistMixin):
+    """to encode a playlist in parallel, the input video will be split
+    into keyframe aligned chunks, every chunk will be encoded to all
+    representations by a separate task, then the encoded chunks will
+    be stitched as a HLS or DASH playlist.
+    playlists with the same video encoding are sharing the renditions
+    that are encoded once, as one chunk
+    """
+
+    cache: BaseStreamingTask.cache
+    get_outputs_root_directory: BaseStreamingTask.\
+        get_outputs_root_directory
+    get_video_probe: BaseStreamingTask.get_video_probe
+
+    # same as hls_time of ffmpeg_streaming, keyframes of chunks will
+    # be forced on it, to have same segments as encoding in one piece
+    SEGMENT_DURATION: int = 10
+    CHUNKS_DIRECTORY_SUFFIX: str = "_chunks"
+    SOURCE_CHUNKS_DIRECTORY: str = "source"
+    CHUNK_EXTENSION: str = "mkv"
+    # start and end times of the chunks, by the segment muxer
+    CHUNKS_LIST_FILENAME: str = "chunks.csv"
+    # chunks can be shared, so every output has its own lists
+    CONCAT_LIST_FILENAME: str = "concat_{output_id}.txt"
+
+    def check_encode_playlist_chunk_requirements(
+            self,
+            request_id=None,
+            output_id=None,
+            chunk_path=None,
+            chunks_directory=None):
+
+        if request_id is None:
+            self.save_job_stop_reason(
+                self.stop_reason.INTERNAL_ERROR,
+                request_id)
+            raise self.raise_ignore(
+                message=self.error_messages.REQUEST_ID_IS_REQUIRED,
+                request_kwargs=self.request.kwargs)
+
+        if output_id is None:
+            self.save_job_stop_reason(
+                self.stop_reason.INTERNAL_ERROR,
+                request_id)
+            raise self.raise_ignore(
+                message=self.error_messages.OUTPUT_NUMBER_IS_REQUIRED,
+                request_kwargs=self.request.kwargs)
+
+        if chunk_path is None:
+            self.save_job_stop_reason(
+                self.stop_reason.INTERNAL_ERROR,
+                request_id)
+            raise self.raise_ignore(
+                message=self.error_messages.CHUNK_PATH_IS_REQUIRED,
+                request_kwargs=self.request.kwargs)
+
+        if chunks_directory is None:
+            self.save_job_stop_reason(
+                self.stop_reason.INTERNAL_ERROR,
+                request_id)
+            raise self.raise_ignore(
+                message=self.error_messages.CHUNKS_DIRECTORY_IS_REQUIRED,
+                request_kwargs=self.request.kwargs)
+
+    def check_encode_shared_renditions_requirements(
+            self,
+            request_id=None,
+            output_ids=None,
+            video_path=None):
+
+        if request_id is None:
+            self.save_job_stop_reason(
+                self.stop_reason.INTERNAL_ERROR,
+                request_id)
+            raise self.raise_ignore(
+                message=self.error_messages.REQUEST_ID_IS_REQUIRED,
+                request_kwargs=self.request.kwargs)
+
+        if not output_ids:
+            self.save_job_stop_reason(
+                self.stop_reason.INTERNAL_ERROR,
+                request_id)
+            raise self.raise_ignore(
+                message=self.error_messages.OUTPUT_NUMBER_IS_REQUIRED,
+                request_kwargs=self.request.kwargs)
+
+        if video_path is None:
+            self.save_job_stop_reason(
+                self.stop_reason.INTERNAL_ERROR,
+                request_id)
+            raise self.raise_ignore(
+                message=self.error_messages.INPUT_PATH_IS_REQUIRED,
+                request_kwargs=self.request.kwargs)
+
+    def check_stitch_playlist_chunks_requirements(
+            self,
+            request_id=None,
+            output_id=None,
+            video_path=None,
+            output_path=None,
+            s3_output_key=None,
+            chunks_directory=None):
+
+        self.check_create_playlist_requirements(
+            request_id=request_id,
+            output_id=output_id,
+            video_path=video_path,
+            output_path=output_path,
+            s3_output_key=s3_output_key)
+
+        if chunks_directory is None:
+            self.save_job_stop_reason(
+                self.stop_reason.INTERNAL_ERROR,
+                request_id)
+            raise self.raise_ignore(
+                message=self.error_messages.CHUNKS_DIRECTORY_IS_REQUIRED,
+                request_kwargs=self.request.kwargs)
+
+    def get_chunks_directory(self, request_id, output_id) -> str:
+        # beside the output directory, to not upload the chunks
+        return os.path.join(
+            self.get_outputs_root_directory(request_id),
+            str(output_id) + self.CHUNKS_DIRECTORY_SUFFIX)
+
+    def get_rendition_path(self,
+                           chunks_directory: str,
+                           rep_number: int,
+                           chunk_number: int) -> str:
+        return os.path.join(
+            chunks_directory,
+            str(rep_number),
+            f"{chunk_number:05d}.{self.CHUNK_EXTENSION}")
+
+    def probe_video(self, video_path) -> FFProbe:
+        try:
+            return FFProbe(
+                video_path,
+                cmd=settings.FFPROBE_BIN_PATH)
+        except Exception as e:
+            # TODO capture error and notify developer
+            print(e)
+            raise self.retry(exc=e)
+
+    def get_ffprobe_data(self, video_path, request_id) -> dict:
+        """the cached ffprobe data of the video, the video is probed
+        again only when analyze_input has not cached it
+        """
+        return self.get_video_probe(request_id) or \
+            self.probe_video(video_path).all()
+
+    def save_processing_time(self,
+                             key_template: str,
+                             request_id: str,
+                             output_id: str):
+        """processing time of chunked outputs is from splitting the
+        input until stitching the chunks
+        """
+        self.cache.set(
+            getattr(CacheKeysTemplates, key_template).format(
+                request_id=request_id,
+                output_id=output_id),
+            time.time())
+
+    @staticmethod
+    def reps_to_qualities(reps) -> list[dict]:
+        """representations as custom_qualities, to encode all chunks
+        with the same representations without probing them again, the
+        options have the copied streams
+        """
+        return [
+            dict(
+                size=[rep.size.width, rep.size.height],
+                bitrate=[
+                    rep.bitrate.video_,
+                    rep.bitrate.audio_,
+                    rep.bitrate.overall_],
+                options=rep.options)
+            for rep in reps]
+
+    def split_to_chunks(self,
+                        video_path: str,
+                        chunks_directory: str,
+                        chunk_duration: int
+                        ) -> list[tuple[str, float]]:
+        """split the video stream without re-encoding, the segment
+        muxer splits at the first keyframe after every chunk_duration
+
+        returns sorted list of chunks paths and their start times in
+        the video
+        """
+        directory = os.path.join(
+            chunks_directory,
+            self.SOURCE_CHUNKS_DIRECTORY)
+        chunks_list = os.path.join(
+            chunks_directory,
+            self.CHUNKS_LIST_FILENAME)
+
+        # remove chunks of previous tries
+        shutil.rmtree(directory, ignore_errors=True)
+        Path(directory).mkdir(parents=True, exist_ok=True)
+
+        (ffmpeg
+            .input(
+                video_path,
+                **self.get_input_options(video_path))
+            .output(
+                os.path.join(directory, f"%05d.{self.CHUNK_EXTENSION}"),
+                map='0:v:0',
+                c='copy',
+                f='segment',
+                segment_time=chunk_duration,
+                segment_list=chunks_list,
+                segment_list_type='csv',
+                reset_timestamps=1)
+            .run(
+                cmd=settings.FFMPEG_BIN_PATH,
+                capture_stdout=True,
+                capture_stderr=True,
+                overwrite_output=True))
+
+        # every line is "filename,start,end"
+        with open(chunks_list, newline='') as file:
+            return sorted(
+                (os.path.join(directory, filename), float(start))
+                for filename, start, _ in csv.reader(file))
+
+    def encode_chunk_command(self,
+                             protocol,
+                             chunk_path: str,
+                             rendition_paths: list[str],
+                             slots: int = None,
+                             chunk_start: float = 0.0) -> list[str]:
+        """ffmpeg command to encode the video of one chunk to all
+        representations of the protocol, the granted CPU slots are
+        shared between the encoders of the representations. a copied
+        video is not encoded
+
+        the timestamps of the chunk start from zero, so the keyframes
+        are forced at the multiples of SEGMENT_DURATION in the video,
+        by chunk_start, to keep the segments of the stitched playlist
+        the same as encoding in one piece
+        """
+        codec_options: dict = protocol.format.all
+        # audio will be encoded once by stitching the chunks
+        codec_options.pop('c:a', None)
+        encoded_reps = [
+            rep for rep in protocol.reps
+            if 'v' not in self.copied_streams(rep)]
+        if slots:
+            codec_options['threads'] = max(
+                1, slots // max(1, len(encoded_reps)))
+        first_keyframe = round(math.ceil(
+            chunk_start / self.SEGMENT_DURATION) *
+            self.SEGMENT_DURATION - chunk_start, 6)
+        codec_options['force_key_frames'] = \
+            f"expr:gte(t,{first_keyframe}+" \
+            f"n_forced*{self.SEGMENT_DURATION})"
+
+        video = ffmpeg.input(chunk_path)['v:0']
+        outputs = []
+        for rep, rendition_path in zip(protocol.reps, rendition_paths):
+            if rep not in encoded_reps:
+                outputs.append(
+                    video.output(rendition_path, **{'c:v': 'copy'}))
+                continue
+            outputs.append(
+                video.output(
+                    rendition_path,
+                    **codec_options,
+                    **{
+                        's': str(rep.size),
+                        'b:v': rep.bitrate.calc_video()
+                    }))
+        return ffmpeg.merge_outputs(*outputs).compile(
+            cmd=settings.FFMPEG_BIN_PATH,
+            overwrite_output=True)
+
+    def write_concat_lists(self,
+                           chunks_directory: str,
+                           total_reps: int,
+                           total_chunks: int,
+                           output_id: str) -> None or list[str]:
+        """write a list of encoded chunks for every representation to
+        use by concat demuxer
+
+        returns None when some chunks have not been encoded
+        """
+        concat_lists = []
+        for rep_number in range(total_reps):
+            lines = []
+            for chunk_number in range(total_chunks):
+                rendition_path = self.get_rendition_path(
+                    chunks_directory,
+                    rep_number,
+                    chunk_number)
+                if not os.path.isfile(rendition_path):
+                    return None
+                lines.append(f"file '{rendition_path}'")
+
+            concat_list = os.path.join(
+                chunks_directory,
+                str(rep_number),
+                self.CONCAT_LIST_FILENAME.format(output_id=output_id))
+            with open(concat_list, 'w') as file:
+                file.write("\n".join(lines))
+            concat_lists.append(concat_list)
+        return concat_lists
+
+    def stitch_command(self,
+                       protocol,
+                       concat_lists: list[str],
+                       video_path: str,
+                       output_path: str,
+                       is_hls: bool,
+                       request_id: str) -> list[str]:
+        """ffmpeg command to copy the concatenated video of chunks,
+        and the audio of the original video as a playlist, by same
+        file names of ffmpeg_streaming
+        """
+        directory = os.path.dirname(output_path)
+        name = os.path.basename(output_path).rsplit('.', 1)[0]
+        has_audio = bool(Streams(self.get_ffprobe_data(
+            video_path, request_id)['streams']).audio())
+        audio_input = len(concat_lists)
+        audio_codec = protocol.format.audio
+
+        command = [settings.FFMPEG_BIN_PATH, '-y']
+        for concat_list in concat_lists:
+            command += ['-f', 'concat', '-safe', '0', '-i', concat_list]
+        if has_audio:
+            for option, value in self.get_input_options(
+                    video_path).items():
+                command += [f'-{option}', str(value)]
+            command += ['-i', video_path]
+
+        def audio_args(rep) -> list[str]:
+            codec = 'copy' if 'a' in self.copied_streams(rep) \
+                else audio_codec
+            args = ['-map', f'{audio_input}:a:0', '-c:a', codec]
+            if codec != 'copy' and rep.bitrate.audio_:
+                args += ['-b:a', rep.bitrate.audio]
+            return args
+
+        if is_hls:
+            segment_extension = 'm4s' if protocol.options.get(
+                'hls_segment_type', '') == 'fmp4' else 'ts'
+            for rep_number, rep in enumerate(protocol.reps):
+                height = rep.size.height
+                command += ['-map', f'{rep_number}:v:0', '-c:v', 'copy']
+                if has_audio:
+                    command += audio_args(rep)
+                command += [
+                    '-f', 'hls',
+                    '-hls_list_size', '0',
+                    '-hls_time', str(self.SEGMENT_DURATION),
+                    '-hls_allow_cache', '1',
+                    '-hls_segment_filename',
+                    f"{directory}/{name}_{height}p_%04d.{segment_extension}",
+                    '-hls_fmp4_init_filename',
+                    f"{name}_{height}p_init.mp4"]
+                for option, value in protocol.options.items():
+                    command += [f'-{option}', str(value)]
+                command += [
+                    '-strict', '-2',
+                    f"{directory}/{name}_{height}p.m3u8"]
+            return command
+
+        adaptation_sets = 'id=0,streams=v'
+        for rep_number in range(len(protocol.reps)):
+            command += ['-map', f'{rep_number}:v:0']
+        command += ['-c:v', 'copy']
+        if has_audio:
+            # one audio for all representations, by the best bitrate
+            command += audio_args(max(
+                protocol.reps,
+                key=lambda rep: rep.bitrate.audio_ or 0))
+            adaptation_sets += ' id=1,streams=a'
+        command += [
+            '-f', 'dash',
+            '-use_timeline', '1',
+            '-use_template', '1',
+            '-init_seg_name', f"{name}_init_$RepresentationID$.$ext$",
+            '-media_seg_name',
+            f"{name}_chunk_$RepresentationID$_$Number%05d$.$ext$",
+            '-adaptation_sets', adaptation_sets,
+            '-strict', '-2',
+            f"{directory}/{name}.mpd"]
+        return command
+
+    @staticmethod
+    def save_master_playlist(protocol, output_path: str):
+        # ffmpeg_streaming generates the master playlist of output_
+        # that is set by calling output method
+        protocol.output_ = output_path
+        protocol.save_master_playlist()
@@ -1,6 +1,7 @@
 import os
 from functools import partial
 from celery import Task
+from video_streaming.core.constants import CacheKeysTemplates
 from video_streaming.ffmpeg.tasks.base import BaseStreamingTask
 from video_streaming.ffmpeg.utils import S3UploadCallback
 from .output import BaseOutputMixin
@@ -8,9 +9,14 @@ from .output import BaseOutputMixin
 
 class UploadDirectoryMixin(BaseOutputMixin):
 
+    # manifests will be uploaded after all segments, to never refer
+    # to a segment that has not been uploaded
+    MANIFEST_EXTENSIONS: tuple[str] = ('.m3u8', '.mpd')
+
     stop_reason: BaseStreamingTask.stop_reason
     error_messages: BaseStreamingTask.error_messages
     s3_service: BaseStreamingTask.s3_service
+    cache: BaseStreamingTask.cache
     save_job_stop_reason: BaseStreamingTask.save_job_stop_reason
 
     request: Task.request
@@ -89,35 +95,54 @@ class UploadDirectoryMixin(BaseOutputMixin):
          Returns directory size
          """
 
+        # the segments that have been uploaded while processing, are
+        # not in the directory anymore, see SegmentsUploader
+        uploaded_size = self.cache.get(
+            CacheKeysTemplates.OUTPUT_UPLOADED_SIZE.format(
+                request_id=request_id,
+                output_id=output_id)) or 0
+
         directory_callback = S3UploadCallback(
                 task=self,
                 task_id=self.request.id.__str__(),
                 output_id=output_id,
                 request_id=request_id,
+                uploaded=uploaded_size
             ).directory_progress
 
         total_size, files = self.get_directory_size(directory)
+        total_size += uploaded_size
         total_files = len(files)
-        for number, (file_path, file_name, file_size) in \
-                enumerate(files):
-            partial_callback = partial(
-                directory_callback,
+
+        # s3_output_key as key can be something like : "folder1/folder2/example.m3u8"
+        # file names are something like "example_480p_0003.m4s" ,...
+        # this code will generate key for every file like : "folder1/folder2/example_480p_0003.m4s"
+        # to prevent upload all files with the same key
+        s3_folder = s3_output_key.rpartition('/')[0] + "/"
+
+        segments = []
+        manifests = []
+        for file_path, file_name, file_size in files:
+            if file_name.endswith(self.MANIFEST_EXTENSIONS):
+                manifests.append((s3_folder + file_name, file_path, file_size))
+            else:
+                segments.append((s3_folder + file_name, file_path, file_size))
+
+        def batch_callback(first_number, number, chunk):
+            directory_callback(
                 total_size,
                 total_files,
-                number)
-
-            # s3_output_key as key can be something like : "folder1/folder2/example.m3u8"
-            # file names are something like "example_480p_0003.m4s" ,...
-            # this code will generate key for every file like : "folder1/folder2/example_480p_0003.m4s"
-            # to prevent upload all files with the same key
-            s3_folder = s3_output_key.rpartition('/')[0] + "/"
-
-            self.s3_service.upload_file_by_path(
-                key=s3_folder + file_name,
-                file_path=file_path,
+                first_number + number,
+                chunk)
+
+        # manifests are uploaded after all segments are uploaded, the
+        # numbers of manifests are after the segments
+        for first_number, batch in ((0, segments),
+                                    (len(segments), manifests)):
+            self.s3_service.upload_files(
+                batch,
                 bucket_name=s3_output_bucket,
-                callback=partial_callback
-            )
+                callback=partial(batch_callback, first_number))
 
         # return the directory size
         return total_size
@@ -0,0 +1,191 @@
+import shutil
+from abc import ABC
+from pathlib import Path
+from video_streaming import settings
+from video_streaming.celery import celery_app
+from video_streaming.core.tasks import ChordCallbackMixin
+from video_streaming.ffmpeg.utils import run_command
+from video_streaming.ffmpeg.constants import TASK_DECORATOR_KWARGS
+from .base import BaseStreamingTask
+from .mixins import PlaylistChunksMixin
+
+
+class StitchPlaylistChunksTask(
+        ChordCallbackMixin,
+        PlaylistChunksMixin,
+        BaseStreamingTask,
+        ABC
+        ):
+
+    # rewrite BaseOutputMixin.save_failed
+    def save_failed(self, request_id, output_id):
+        super().save_failed(request_id, output_id)
+        # stop reason will only be set if there is no reason before.
+        # set common reason for the task after many retries or etc.
+        self.save_job_stop_reason(
+            self.stop_reason.FAILED_STITCH_PLAYLIST_CHUNKS,
+            request_id
+        )
+
+
+@celery_app.task(name="stitch_playlist_chunks",
+                 base=StitchPlaylistChunksTask,
+                 **TASK_DECORATOR_KWARGS)
+def stitch_playlist_chunks(
+        self,
+        *args,
+        video_path: str = None,
+        output_path: str = None,
+        s3_output_key: str = None,
+        s3_output_bucket: str = None,
+        chunks_directory: str = None,
+        total_chunks: int = None,
+        fragmented: bool = settings.DEFAULT_SEGMENT_TYPE_IS_FMP4,
+        encode_format: str = settings.DEFAULT_ENCODE_FORMAT,
+        video_codec: str = None,
+        audio_codec: str = None,
+        custom_qualities: list[dict] = None,
+        request_id: str = None,
+        output_id: str = None,
+        is_hls: bool = settings.DEFAULT_PLAYLIST_IS_HLS,
+        delete_chunks: bool = True,
+        **kwargs
+        ) -> dict:
+    """stitch the encoded chunks of every representation, and copy
+    them with the audio of the video as a playlist ( HLS or DASH )
+
+    it's also the packager of encode_shared_renditions outputs, the
+    shared renditions are one chunk that all outputs use it
+
+    Args:
+        self:
+        *args:
+        video_path:
+            The local input path, to use its audio
+        output_path:
+        s3_output_key:
+        s3_output_bucket:
+            to upload the finished segments while packaging
+        chunks_directory:
+            The local directory of the chunks of the output
+        total_chunks:
+        fragmented:
+        encode_format:
+        video_codec:
+        audio_codec:
+        custom_qualities:
+            all representations of the playlist, that
+            create_playlist has been made
+        request_id:
+        output_id:
+        is_hls:
+        delete_chunks:
+            False when other outputs are using the same chunks
+        **kwargs:
+            some unused parameters from previous tasks that set by __call__
+
+    Required parameters:
+        - request_id
+        - output_id
+        - video_path
+        - output_path or s3_output_key
+        - chunks_directory
+
+    Returns:
+        a dict includes directory
+
+    """
+
+    self.check_stitch_playlist_chunks_requirements(
+        request_id=request_id,
+        output_id=output_id,
+        video_path=video_path,
+        output_path=output_path,
+        s3_output_key=s3_output_key,
+        chunks_directory=chunks_directory)
+
+    if self.is_forced_to_stop(request_id):
+        raise self.raise_revoke(request_id)
+    if self.is_output_forced_to_stop(request_id, output_id):
+        raise self.raise_revoke_output(request_id, output_id)
+
+    # a streaming input can be downloaded by tee_input
+    video_path = self.get_video_input(video_path, request_id)
+
+    # get output directory and set output_path if is None
+    output_path, directory = self.ensure_set_output_location(
+       request_id,
+       output_id,
+       output_path=output_path,
+       s3_output_key=s3_output_key)
+
+    # create directory with all parents, to prevent ffmpeg error
+    Path(directory).mkdir(parents=True, exist_ok=True)
+
+    protocol = self.initial_protocol(
+        video_path,
+        output_id,
+        request_id,
+        encode_format,
+        video_codec=video_codec,
+        audio_codec=audio_codec,
+        is_hls=is_hls,
+        fragmented=fragmented,
+        custom_qualities=custom_qualities)
+
+    concat_lists = self.write_concat_lists(
+        chunks_directory,
+        len(protocol.reps),
+        total_chunks,
+        output_id)
+    if concat_lists is None:
+        raise self.raise_ignore(
+            message=self.error_messages.SOME_CHUNKS_ARE_NOT_ENCODED,
+            request_kwargs=self.request.kwargs)
+
+    segments_uploader = self.start_segments_uploader(
+        directory,
+        s3_output_key=s3_output_key,
+        s3_output_bucket=s3_output_bucket,
+        request_id=request_id,
+        output_id=output_id)
+    try:
+        run_command(
+            self.stitch_command(
+                protocol,
+                concat_lists,
+                video_path,
+                output_path,
+                is_hls,
+                request_id))
+    except Exception as e:
+
+        if self.is_forced_to_stop(request_id):
+            raise self.raise_revoke(request_id)
+        if self.is_output_forced_to_stop(request_id, output_id):
+            raise self.raise_revoke_output(request_id, output_id)
+
+        raise self.retry(
+            exc=e,
+            max_retries=settings.TASK_RETRY_FFMPEG_COMMAND_MAX)
+    finally:
+        if segments_uploader:
+            segments_uploader.stop()
+
+    if is_hls:
+        self.save_master_playlist(protocol, output_path)
+
+    if delete_chunks:
+        shutil.rmtree(chunks_directory, ignore_errors=True)
+
+    self.save_processing_time(
+        "OUTPUT_END_PROCESSING_TIME",
+        request_id,
+        output_id)
+
+    self.save_output_status(
+        self.output_status.PROCESSING_FINISHED,
+        output_id,
+        request_id)
+
+    return dict(directory=directory)
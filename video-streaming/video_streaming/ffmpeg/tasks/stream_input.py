@@ -0,0 +1,108 @@
+from abc import ABC
+from video_streaming import settings
+from video_streaming.celery import celery_app
+from video_streaming.core.tasks import ChainCallbackMixin
+from video_streaming.ffmpeg.constants import TASK_DECORATOR_KWARGS, \
+    InputType
+from .base import BaseStreamingTask
+from .mixins import DownloadInputMixin
+
+
+class StreamInputTask(
+        ChainCallbackMixin,
+        DownloadInputMixin,
+        BaseStreamingTask,
+        ABC
+        ):
+
+    # rewrite BaseInputMixin.save_failed
+    def save_failed(self, request_id, input_number):
+        super().save_failed(request_id, input_number)
+        # stop reason will only be set if there is no reason before.
+        # set common reason for the task after many retries or etc.
+        self.save_job_stop_reason(
+            self.stop_reason.DOWNLOADING_FAILED,
+            request_id
+        )
+
+
+@celery_app.task(name="stream_input",
+                 base=StreamInputTask,
+                 **TASK_DECORATOR_KWARGS)
+def stream_input(self,
+                 *args,
+                 request_id: str = None,
+                 s3_input_key: str = None,
+                 s3_input_bucket: str = settings.S3_DEFAULT_INPUT_BUCKET_NAME,
+                 input_number: int = None,
+                 video_details: dict = None,
+                 watermark_details: dict = None,
+                 input_type: str = InputType.VIDEO_INPUT
+                 ) -> dict:
+    """pass a presigned url of the input instead of downloading it,
+    to overlap the network transfer with processing of the outputs
+
+        one of video_details or watermark_details is required according
+        to input_type
+
+    Args:
+        self:
+        *args:
+        request_id:
+        s3_input_key:
+        s3_input_bucket:
+        input_number:
+        video_details:
+        watermark_details:
+        input_type:
+
+    Returns:
+        a dict includes the url as video path or watermark path
+
+    """
+
+    self.check_download_requirements(
+        request_id=request_id,
+        input_number=input_number,
+        video_details=video_details,
+        watermark_details=watermark_details,
+        input_type=input_type,
+        s3_input_key=s3_input_key,
+        s3_input_bucket=s3_input_bucket)
+
+    if self.is_forced_to_stop(request_id):
+        raise self.raise_revoke(request_id)
+
+    input_url = self.s3_service.generate_presigned_url(
+        s3_input_key,
+        bucket_name=s3_input_bucket)
+
+    # the _exception_handler of S3Service returns None
+    # when it's 404 or 403
+    if input_url is None:
+        self.save_primary_status(
+            self.primary_status.FAILED,
+            request_id
+        )
+        self.save_input_status(
+            self.input_status.INPUT_FAILED,
+            input_number,
+            request_id
+        )
+        self.save_job_stop_reason(
+            self.stop_reason.INPUT_VIDEO_ON_S3_IS_404_OR_403,
+            request_id
+        )
+        raise self.raise_ignore(
+            message=self.error_messages.INPUT_VIDEO_404_OR_403,
+            request_kwargs=self.request.kwargs)
+
+    # the input is ready to read by the next tasks
+    self.save_input_status(self.input_status.DOWNLOADING_FINISHED,
+                           input_number,
+                           request_id)
+
+    self.incr_ready_inputs(request_id)
+
+    # pass result to next task as video path or watermark path
+    return {input_type + "_path": input_url}
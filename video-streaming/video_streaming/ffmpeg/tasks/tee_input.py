@@ -0,0 +1,99 @@
+import os
+from abc import ABC
+from video_streaming import settings
+from video_streaming.celery import celery_app
+from video_streaming.core.tasks import ChainCallbackMixin
+from video_streaming.core.constants import CacheKeysTemplates
+from video_streaming.ffmpeg.constants import TASK_DECORATOR_KWARGS, \
+    InputType
+from .base import BaseStreamingTask
+from .mixins import DownloadInputMixin
+
+
+class TeeInputTask(
+        ChainCallbackMixin,
+        DownloadInputMixin,
+        BaseStreamingTask,
+        ABC
+        ):
+
+    # the partial file will not be used by the outputs
+    PART_FILE_SUFFIX: str = ".part"
+
+    # rewrite BaseInputMixin.save_failed
+    def save_failed(self, request_id, input_number):
+        # the outputs are reading the input by its url, so failure of
+        # the tee does not fail the input or the job
+        pass
+
+
+@celery_app.task(name="tee_input",
+                 base=TeeInputTask,
+                 **TASK_DECORATOR_KWARGS)
+def tee_input(self,
+              *args,
+              request_id: str = None,
+              s3_input_key: str = None,
+              s3_input_bucket: str = settings.S3_DEFAULT_INPUT_BUCKET_NAME,
+              input_number: int = None,
+              video_details: dict = None,
+              input_type: str = InputType.VIDEO_INPUT,
+              **kwargs
+              ):
+    """download a streaming video input alongside processing of the
+    outputs, the outputs that start after finishing the download use
+    the local input instead of the url, see get_video_input
+
+    Args:
+        self:
+        *args:
+        request_id:
+        s3_input_key:
+        s3_input_bucket:
+        input_number:
+        video_details:
+        input_type:
+        **kwargs:
+            some unused parameters from previous tasks that set by __call__
+
+    """
+
+    self.check_download_requirements(
+        request_id=request_id,
+        input_number=input_number,
+        video_details=video_details,
+        input_type=input_type,
+        s3_input_key=s3_input_key,
+        s3_input_bucket=s3_input_bucket)
+
+    if self.is_forced_to_stop(request_id):
+        raise self.raise_revoke(request_id)
+
+    input_path = self.generate_input_path(
+        s3_input_key,
+        request_id,
+        input_number)
+    part_path = input_path + self.PART_FILE_SUFFIX
+
+    try:
+        result = self.s3_service.download(
+            s3_input_key,
+            destination_path=part_path,
+            bucket_name=s3_input_bucket)
+        # the _exception_handler of S3Service returns None
+        # when it's 404 or 403
+        if result != part_path:
+            return
+        os.rename(part_path, input_path)
+    except Exception as e:
+        # e.g. the inputs have been deleted, after all outputs were
+        # processed before finishing the download
+        # TODO notify developer
+        print(e)
+        return
+
+    self.cache.set(
+        CacheKeysTemplates.INPUT_VIDEO_TEE_PATH.format(
+            request_id=request_id),
+        input_path
+    )
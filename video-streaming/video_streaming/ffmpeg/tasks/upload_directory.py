@@ -109,6 +109,11 @@ def upload_directory(self,
             output_id=output_id),
         directory_size)
 
+    self.cache.delete(
+        CacheKeysTemplates.OUTPUT_UPLOADED_SIZE.format(
+            request_id=request_id,
+            output_id=output_id))
+
     self.save_output_status(
         self.output_status.UPLOADING_FINISHED,
         output_id,
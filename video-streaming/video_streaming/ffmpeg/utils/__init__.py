@@ -1,13 +1,20 @@
-from .ffmpeg_process import time_left, get_time
+from .ffmpeg_process import time_left, get_time, run_command
 from .s3_download_callback import S3DownloadCallback
 from .ffmpeg_callback import FfmpegCallback
 from .s3_upload_callback import S3UploadCallback
+from .segments_uploader import SegmentsUploader
+from .progress_throttle import ProgressThrottle
+from .resource_sampler import ResourceSampler
 
 
 __all__ = [
     'S3DownloadCallback',
     'FfmpegCallback',
     'S3UploadCallback',
+    'SegmentsUploader',
+    'ProgressThrottle',
+    'ResourceSampler',
     'time_left',
-    'get_time'
+    'get_time',
+    'run_command'
 ]
@@ -1,9 +1,9 @@
-import json
 import time
 import sys
-import psutil
 from celery import Task, states
 from video_streaming.core.constants import CacheKeysTemplates
+from .progress_throttle import ProgressThrottle
+from .resource_sampler import ResourceSampler
 
 
 class FfmpegCallback(object):
@@ -13,44 +13,94 @@ class FfmpegCallback(object):
             task: Task = None,
             task_id: str = None,
             output_id: str = None,
-            request_id: str = None
+            request_id: str = None,
+            chunk_number: int = None,
+            total_duration: float = None,
+            output_ids: list[str] = None
             ):
+        """
+        chunk_number and total_duration are using when the output is
+        encoding in chunks, to aggregate progress of all chunks as
+        the output progress.
+        output_ids is using instead of output_id when the process is
+        shared between many outputs.
+        """
         self.task = task
         # to prevent TypeError, needs sure the task id is not None
         # see https://github.com/celery/celery/issues/1996
         self.task_id = self.task.request.id if self.task.request.id else task_id
         self.first_chunk = True
         self.output_id = output_id
+        self.output_ids = output_ids or [output_id]
         self.request_id = request_id
-        self.start_memory_rss = None
+        self.chunk_number = chunk_number
+        self.total_duration = total_duration
+        # samples resource usage of the process, when it's not a chunk
+        self.resource_sampler = None
+        # the progress is saved at most once per interval, but ffmpeg
+        # writes many lines per second
+        self.throttle = ProgressThrottle(self._save_progress)
+        self.process = None
 
     def progress(self, ffmpeg_line, duration, time_, time_left, process):
-        try:
-            self._check_to_kill(process)
-            psutil_process = psutil.Process(process.pid)
-            if self.first_chunk:
+        if self.first_chunk:
+            self._register(process)
+            for output_id in self.output_ids:
                 # save output status using output_id and request_id
                 self.task.save_output_status(
                     self.task.output_status.PROCESSING,
-                    self.output_id,
+                    output_id,
                     self.request_id)
-                self._save_start_usage(psutil_process)
-                self.first_chunk = False
-            self._save_end_usage(psutil_process)
-            self.task.save_output_progress(
-                total=duration,
+                if self.chunk_number is None:
+                    self._save_start_time(output_id)
+            if self.chunk_number is None:
+                self.resource_sampler = ResourceSampler(
+                    process.pid,
+                    task=self.task,
+                    request_id=self.request_id,
+                    output_ids=self.output_ids)
+                self.resource_sampler.start()
+            self.first_chunk = False
+        self.throttle.update(duration, time_)
+
+    def flush(self):
+        """save the last progress that has been coalesced by the
+        throttle and the resource usage, call it after finishing
+        the process
+        """
+        if self.resource_sampler is not None:
+            self.resource_sampler.stop()
+        if self.process is not None:
+            self.task.cancellation_bus.unregister(self.process)
+        self.throttle.flush()
+
+    def _save_progress(self, duration, time_):
+        if self.chunk_number is None:
+            for output_id in self.output_ids:
+                self._save_end_time(output_id)
+                self.task.save_output_progress(
+                    total=duration,
+                    current=time_,
+                    request_id=self.request_id,
+                    output_id=output_id
+                )
+        else:
+            # usage of chunks are on different processes and
+            # workers, just the processing time will be saved
+            # by splitting and stitching the chunks
+            self.task.save_output_chunk_progress(
+                total=self.total_duration,
                 current=time_,
+                chunk_number=self.chunk_number,
                 request_id=self.request_id,
                 output_id=self.output_id
             )
-            if self.task.request.called_directly:
-                percent = round(time_ / duration * 100)
-                sys.stdout.write(
-                    f"\r{self.request_id} | {self.output_id} Processing...({percent}%) {time_} [{'#' * percent}{'-' * (100 - percent)}]"
-                )
-                sys.stdout.flush()
-        except psutil.NoSuchProcess as e:
-            print(e)
+        if self.task.request.called_directly:
+            percent = round(time_ / duration * 100)
+            sys.stdout.write(
+                f"\r{self.request_id} | {self.output_id or self.output_ids} Processing...({percent}%) {time_} [{'#' * percent}{'-' * (100 - percent)}]"
+            )
+            sys.stdout.flush()
 
     # def ffmpeg_progress(self, ffmpeg_line, process):
     #     try:
@@ -68,19 +118,18 @@ class FfmpegCallback(object):
     #     except psutil.NoSuchProcess as e:
     #         print(e)
 
-    def _check_to_kill(self, process):
-        is_job_stop = self.request_id is not None and \
-                      self.task.is_forced_to_stop(self.request_id)
-        is_output_stop = self.request_id is not None and \
-            self.output_id is not None and \
-            self.task.is_output_forced_to_stop(self.request_id,
-                                               self.output_id)
-
-        if is_job_stop or is_output_stop:
-            try:
-                process.kill()
-            except Exception as e:
-                print(e)
+    def _register(self, process):
+        """the process is killed by the cancellation bus of the worker,
+        as soon as the job or all outputs of it are revoked
+        """
+        self.process = process
+        if self.request_id is None:
+            return
+        is_killed = self.task.cancellation_bus.register(
+            process,
+            self.request_id,
+            self.output_ids)
+        if is_killed:
             # raise inside callback, is just to finish processing,
             # so, will write 'ffmpeg executed command successfully' log
             self.task.raise_ignore(
@@ -90,63 +139,24 @@ class FfmpegCallback(object):
                 request_kwargs=self.task.request.kwargs
             )
 
-    def _save_end_usage(self, psutil_process):
+    def _save_end_time(self, output_id):
         try:
             self.task.cache.set(
                 CacheKeysTemplates.OUTPUT_END_PROCESSING_TIME.format(
                     request_id=self.request_id,
-                    output_id=self.output_id),
+                    output_id=output_id),
                 time.time())
-            cpu_times = psutil_process.cpu_times()
-            if cpu_times:
-                self.task.cache.set(
-                    CacheKeysTemplates.OUTPUT_END_CPU_TIMES.format(
-                        request_id=self.request_id,
-                        output_id=self.output_id),
-                    json.dumps(cpu_times))
-
-            current_memory_rss = psutil_process.memory_info().rss
-            if not current_memory_rss:
-                return
-            if self.start_memory_rss is None:
-                return
-            if current_memory_rss < self.start_memory_rss:
-                return
-            last_memory_rss = self.task.cache.get(
-                CacheKeysTemplates.OUTPUT_END_MEMORY_RSS.format(
-                    request_id=self.request_id,
-                    output_id=self.output_id)) or 0
-            if current_memory_rss < last_memory_rss:
-                return
-            self.task.cache.set(
-                CacheKeysTemplates.OUTPUT_END_MEMORY_RSS.format(
-                    request_id=self.request_id,
-                    output_id=self.output_id),
-                current_memory_rss)
         except Exception as e:
             # TODO notify developer
             print(e)
 
-    def _save_start_usage(self, psutil_process):
+    def _save_start_time(self, output_id):
         try:
             self.task.cache.set(
                 CacheKeysTemplates.OUTPUT_START_PROCESSING_TIME.format(
                     request_id=self.request_id,
-                    output_id=self.output_id),
+                    output_id=output_id),
                 time.time())
-            cpu_times = psutil_process.cpu_times()
-            self.task.cache.set(
-                CacheKeysTemplates.OUTPUT_START_CPU_TIMES.format(
-                    request_id=self.request_id,
-                    output_id=self.output_id),
-                json.dumps(cpu_times))
-            memory_rss = psutil_process.memory_info().rss
-            self.task.cache.set(
-                CacheKeysTemplates.OUTPUT_START_MEMORY_RSS.format(
-                    request_id=self.request_id,
-                    output_id=self.output_id),
-                memory_rss)
-            self.start_memory_rss = memory_rss
         except Exception as e:
             # TODO notify developer
             print(e)
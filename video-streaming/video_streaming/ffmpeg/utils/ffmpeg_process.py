@@ -1,4 +1,5 @@
 import re
+import subprocess
 import time
 
 
@@ -17,3 +18,40 @@ def time_left(start_time, unit, total):
         return 0
     diff_time = time.time() - start_time
     return total * diff_time / unit - diff_time
+
+
+def run_command(command: list[str], callback: callable = None):
+    """run a ffmpeg command and call the callback like the monitor
+     of ffmpeg_streaming for every line of the output
+
+    raises subprocess.CalledProcessError when ffmpeg fails
+    """
+    with subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True) as process:
+
+        duration = 1
+        time_ = 0
+        start_time = time.time()
+        while True:
+            line = process.stdout.readline().strip()
+            duration = get_time('Duration: ', line, duration)
+            time_ = get_time('time=', line, time_)
+            if process.poll() is not None:
+                break
+
+            if callback is not None:
+                callback(
+                    line,
+                    duration,
+                    time_,
+                    time_left(start_time, time_, duration),
+                    process)
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode,
+            process.args)
@@ -0,0 +1,85 @@
+import time
+import threading
+from video_streaming import settings
+
+
+class ProgressThrottle(object):
+    """coalesce frequent progress updates, to save a progress at most
+    once per min_interval and when it has been changed at least
+    min_delta of total
+
+    the updates between two saves are coalesced to the last one, that
+    can be saved by flush. the final progress ( current >= total )
+    is always saved.
+
+    it's thread-safe, boto calls the transfer callbacks from many
+    threads, saves are serialized to not overwrite a newer progress
+    by an older one
+    """
+
+    MIN_INTERVAL = settings.PROGRESS_MIN_INTERVAL
+    MIN_DELTA = settings.PROGRESS_MIN_DELTA
+
+    def __init__(
+            self,
+            save: callable,
+            min_interval: float = None,
+            min_delta: float = None
+            ):
+        """
+        save is called by total and current, to save the progress
+        """
+        self.save = save
+        self.min_interval = self.MIN_INTERVAL \
+            if min_interval is None else min_interval
+        self.min_delta = self.MIN_DELTA if min_delta is None else min_delta
+        self.current = 0
+        self._lock = threading.Lock()
+        self._last_time = None
+        self._last_current = None
+        # (total, current) of the last update that has been not saved
+        self._pending = None
+
+    def _is_due(self, total, current, now) -> bool:
+        if self._last_time is None:
+            return True
+        if current >= total and current != self._last_current:
+            # the final progress
+            return True
+        if now - self._last_time < self.min_interval:
+            return False
+        return current - self._last_current >= self.min_delta * total
+
+    def _update(self, total, current, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and not self._is_due(total, current, now):
+            self._pending = (total, current)
+            return False
+        self._last_time = now
+        self._last_current = current
+        self._pending = None
+        self.save(total, current)
+        return True
+
+    def update(self, total, current, force: bool = False) -> bool:
+        """returns True when the progress has been saved"""
+        with self._lock:
+            self.current = current
+            return self._update(total, current, force=force)
+
+    def add(self, total, amount) -> bool:
+        """add amount to the current progress, e.g. bytes of a chunk,
+        returns True when the progress has been saved
+        """
+        with self._lock:
+            self.current += amount
+            return self._update(total, self.current)
+
+    def flush(self) -> bool:
+        """save the last coalesced update, returns True when there
+        was an update to save
+        """
+        with self._lock:
+            if self._pending is None:
+                return False
+            return self._update(*self._pending, force=True)
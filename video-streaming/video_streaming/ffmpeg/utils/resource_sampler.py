@@ -0,0 +1,128 @@
+import json
+import time
+import threading
+import psutil
+from celery import Task
+from video_streaming import settings
+from video_streaming.core.constants import CacheKeysTemplates
+
+
+class ResourceSampler(threading.Thread):
+    """sample the resource usage of a ffmpeg process and its child
+    processes on a separate thread, instead of the loop of the output
+    lines of ffmpeg
+
+    the summary is saved as OUTPUT_RESOURCE_USAGE of the outputs
+    every publish_interval seconds and when the process has exited
+    """
+
+    SAMPLE_INTERVAL = settings.RESOURCE_SAMPLE_INTERVAL
+    PUBLISH_INTERVAL = settings.RESOURCE_PUBLISH_INTERVAL
+
+    def __init__(
+            self,
+            pid: int,
+            task: Task = None,
+            request_id: str = None,
+            output_ids: list[str] = None,
+            sample_interval: float = None,
+            publish_interval: float = None
+            ):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.task = task
+        self.request_id = request_id
+        self.output_ids = output_ids
+        self.sample_interval = sample_interval or self.SAMPLE_INTERVAL
+        self.publish_interval = publish_interval or self.PUBLISH_INTERVAL
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+        self.start_time = time.time()
+        self.peak_memory_rss = 0
+        # (pid, create time) -> last sample of the process, a finished
+        # child process keeps its last sample
+        self._cpu_seconds = {}
+        self._io_bytes = {}
+
+    def run(self):
+        last_publish = time.monotonic()
+        try:
+            process = psutil.Process(self.pid)
+            while not self._stop_event.is_set():
+                if not self.sample(process):
+                    break
+                if time.monotonic() - last_publish >= \
+                        self.publish_interval:
+                    self.publish()
+                    last_publish = time.monotonic()
+                self._stop_event.wait(self.sample_interval)
+        except psutil.NoSuchProcess:
+            # the process exited before starting the sampler
+            pass
+        self.publish()
+
+    def stop(self):
+        """stop sampling and save the summary, call it after finishing
+        the process
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def sample(self, process: psutil.Process) -> bool:
+        """returns False when the process has exited"""
+        try:
+            processes = [process] + process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return False
+
+        memory_rss = 0
+        for item in processes:
+            try:
+                with item.oneshot():
+                    key = (item.pid, item.create_time())
+                    cpu_times = item.cpu_times()
+                    memory_rss += item.memory_info().rss
+                    io_counters = item.io_counters() \
+                        if hasattr(item, 'io_counters') else None
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                if item is process:
+                    return False
+                continue
+            with self._lock:
+                # threads of the process are included in its times
+                self._cpu_seconds[key] = cpu_times.user + cpu_times.system
+                if io_counters:
+                    self._io_bytes[key] = (
+                        io_counters.read_bytes,
+                        io_counters.write_bytes)
+
+        with self._lock:
+            self.peak_memory_rss = max(self.peak_memory_rss, memory_rss)
+        return True
+
+    def summary(self) -> dict:
+        with self._lock:
+            cpu_seconds = sum(self._cpu_seconds.values())
+            spent_time = time.time() - self.start_time
+            return dict(
+                seconds=cpu_seconds,
+                used=cpu_seconds / spent_time if spent_time else 0.0,
+                peak_memory_rss=self.peak_memory_rss,
+                read_bytes=sum(read for read, _ in self._io_bytes.values()),
+                write_bytes=sum(
+                    write for _, write in self._io_bytes.values()))
+
+    def publish(self):
+        try:
+            usage = json.dumps(self.summary())
+            for output_id in self.output_ids:
+                self.task.cache.set(
+                    CacheKeysTemplates.OUTPUT_RESOURCE_USAGE.format(
+                        request_id=self.request_id,
+                        output_id=output_id),
+                    usage)
+        except Exception as e:
+            # TODO notify developer
+            print(e)
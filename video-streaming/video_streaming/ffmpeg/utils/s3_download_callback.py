@@ -1,5 +1,6 @@
 import sys
 from celery import Task
+from .progress_throttle import ProgressThrottle
 
 
 class S3DownloadCallback(object):
@@ -13,7 +14,6 @@ class S3DownloadCallback(object):
             request_id: str = None
             ):
 
-        self.downloaded = 0
         self._object_size = object_size
         self.task = task
 
@@ -24,27 +24,37 @@ class S3DownloadCallback(object):
         self.input_number = input_number
         self.request_id = request_id
 
+        # boto calls the callback for every chunk from many threads
+        self.throttle = ProgressThrottle(self._save_progress)
+        self.is_started = False
+
+    @property
+    def downloaded(self) -> int:
+        return self.throttle.current
+
     def progress(self, chunk):
-        if self.downloaded == 0:
+        self.throttle.add(self._object_size, chunk)
+
+    def _save_progress(self, total, downloaded):
+        if not self.is_started:
             # save input status using input_number and request_id
             self.task.save_input_status(
                 self.task.input_status.DOWNLOADING,
                 self.input_number,
                 self.request_id)
-
-        self.downloaded += chunk
+            self.is_started = True
 
         self.task.save_input_downloading_progress(
-            total=self._object_size,
-            current=self.downloaded,
+            total=total,
+            current=downloaded,
             request_id=self.request_id,
             input_number=self.input_number
         )
 
         if self.task.request.called_directly:
-            percent = round(self.downloaded / self._object_size * 100)
+            percent = round(downloaded / total * 100)
             sys.stdout.write(
-                f"\rDownloading...({percent}%) {self.downloaded} [{'#' * percent}{'-' * (100 - percent)}]"
+                f"\rDownloading...({percent}%) {downloaded} [{'#' * percent}{'-' * (100 - percent)}]"
             )
             sys.stdout.flush()
 
@@ -1,5 +1,6 @@
 import sys
 from celery import Task
+from .progress_throttle import ProgressThrottle
 
 
 class S3UploadCallback(object):
@@ -9,9 +10,9 @@ class S3UploadCallback(object):
             task: Task = None,
             task_id: str = None,
             output_id: str = None,
-            request_id: str = None
+            request_id: str = None,
+            uploaded: int = 0
             ):
-        self.uploaded = 0
         self.task = task
 
         # to prevent TypeError, needs sure the task id is not None
@@ -21,54 +22,54 @@ class S3UploadCallback(object):
         self.output_id = output_id
         self.request_id = request_id
 
-    def directory_progress(self, total_size, total_files, number, chunk):
-
-        if self.uploaded == 0:
-            # save input status using input_number and request_id
-            self.task.save_output_status(
-                self.task.output_status.UPLOADING,
-                self.output_id,
-                self.request_id
-            )
+        # boto calls the callback for every chunk from many threads
+        self.throttle = ProgressThrottle(self._save_progress)
+        # uploaded can be more than zero, when some files have been
+        # uploaded before, e.g. by SegmentsUploader
+        self.throttle.current = uploaded
+        self.is_started = False
+        # to show the progress when the task is called directly
+        self.total_files = None
+        self.number = None
 
-        self.uploaded += chunk
+    @property
+    def uploaded(self) -> int:
+        return self.throttle.current
 
-        self.task.save_output_progress(
-            total=total_size,
-            current=self.uploaded,
-            request_id=self.request_id,
-            output_id=self.output_id
-        )
-
-        if self.task.request.called_directly:
-            bytes_percent = round(self.uploaded / total_size * 100)
-            sys.stdout.write(
-                f"\r{self.request_id} | {self.output_id} Uploading {number}/{total_files} files...({bytes_percent}%) {self.uploaded} [{'#' * bytes_percent}{'-' * (100 - bytes_percent)}]"
-            )
-            sys.stdout.flush()
+    def directory_progress(self, total_size, total_files, number, chunk):
+        self.total_files = total_files
+        self.number = number
+        self.throttle.add(total_size, chunk)
 
     def file_progress(self, file_size, chunk):
+        self.throttle.add(file_size, chunk)
+
+    def _save_progress(self, total, uploaded):
 
-        if self.uploaded == 0:
-            # save input status using input_number and request_id
+        if not self.is_started:
+            # save output status using output_id and request_id
             self.task.save_output_status(
                 self.task.output_status.UPLOADING,
                 self.output_id,
                 self.request_id
             )
-
-        self.uploaded += chunk
+            self.is_started = True
 
         self.task.save_output_progress(
-            total=file_size,
-            current=self.uploaded,
+            total=total,
+            current=uploaded,
             request_id=self.request_id,
             output_id=self.output_id
         )
 
         if self.task.request.called_directly:
-            bytes_percent = round(self.uploaded / file_size * 100)
-            sys.stdout.write(
-                f"\r{self.request_id} | {self.output_id} Uploading files...({bytes_percent}%) {self.uploaded} [{'#' * bytes_percent}{'-' * (100 - bytes_percent)}]"
-            )
+            bytes_percent = round(uploaded / total * 100)
+            if self.number is None:
+                sys.stdout.write(
+                    f"\r{self.request_id} | {self.output_id} Uploading files...({bytes_percent}%) {uploaded} [{'#' * bytes_percent}{'-' * (100 - bytes_percent)}]"
+                )
+            else:
+                sys.stdout.write(
+                    f"\r{self.request_id} | {self.output_id} Uploading {self.number}/{self.total_files} files...({bytes_percent}%) {uploaded} [{'#' * bytes_percent}{'-' * (100 - bytes_percent)}]"
+                )
             sys.stdout.flush()
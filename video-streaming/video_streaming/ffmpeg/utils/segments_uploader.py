@@ -0,0 +1,114 @@
+import os
+import re
+import threading
+from collections import defaultdict
+from celery import Task
+from video_streaming.core.constants import CacheKeysTemplates
+
+
+class SegmentsUploader(threading.Thread):
+    """upload the segments of a playlist while ffmpeg is still
+    writing them
+
+    ffmpeg writes the segments of every representation one after
+    another, so a segment is finished when there is a next segment of
+    the same representation. finished segments will be uploaded and
+    removed from the local directory.
+
+    init files, manifests and last segments are uploaded by the
+    upload_directory task, manifests last of all
+    """
+
+    # e.g. "example_480p_0003.m4s" or "example_chunk_1_00003.m4s"
+    SEGMENT_PATTERN = re.compile(
+        r'^(?P<prefix>.+_)(?P<number>\d+)\.(?P<extension>m4s|ts)$')
+    INIT_FILE_NEEDLE = "_init"
+
+    def __init__(
+            self,
+            task: Task = None,
+            directory: str = None,
+            s3_output_key: str = None,
+            s3_output_bucket: str = None,
+            output_id: str = None,
+            request_id: str = None,
+            interval: float = 1.0
+            ):
+        super().__init__(daemon=True)
+        self.task = task
+        self.directory = directory
+        # see UploadDirectoryMixin.upload_directory
+        self.s3_folder = s3_output_key.rpartition('/')[0] + "/"
+        self.s3_output_bucket = s3_output_bucket
+        self.output_id = output_id
+        self.request_id = request_id
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+        # every try of ffmpeg writes all segments again, so they are
+        # uploaded and counted again
+        self.task.cache.delete(
+            CacheKeysTemplates.OUTPUT_UPLOADED_SIZE.format(
+                request_id=self.request_id,
+                output_id=self.output_id))
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.upload_finished_segments()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def finished_segments(self) -> list[os.DirEntry]:
+        # prefix of the representation -> list of (number, entry)
+        representations = defaultdict(list)
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            # ffmpeg has not created the directory yet
+            return []
+        for entry in entries:
+            if not entry.is_file() or \
+                    self.INIT_FILE_NEEDLE in entry.name:
+                continue
+            match = self.SEGMENT_PATTERN.match(entry.name)
+            if match:
+                representations[match.group('prefix')].append(
+                    (int(match.group('number')), entry))
+
+        segments = []
+        for items in representations.values():
+            items.sort(key=lambda item: item[0])
+            # the last segment can be still in writing
+            segments.extend(entry for _, entry in items[:-1])
+        return segments
+
+    def upload_finished_segments(self):
+        segments = self.finished_segments()
+        if not segments:
+            return
+        try:
+            # (key, file_path, file_size) of S3Service.upload_files
+            files = [
+                (self.s3_folder + entry.name,
+                 entry.path,
+                 entry.stat().st_size)
+                for entry in segments]
+            self.task.s3_service.upload_files(
+                files,
+                bucket_name=self.s3_output_bucket)
+        except Exception as e:
+            # upload_files raises when a file has been not uploaded,
+            # the segments remain in the directory, so they will be
+            # uploaded by the next try or the upload_directory task
+            # TODO notify developer
+            print(e)
+            return
+        for _, file_path, _ in files:
+            os.remove(file_path)
+        self.task.cache.incr(
+            CacheKeysTemplates.OUTPUT_UPLOADED_SIZE.format(
+                request_id=self.request_id,
+                output_id=self.output_id),
+            sum(file_size for _, _, file_size in files))
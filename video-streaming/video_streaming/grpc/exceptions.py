@@ -11,7 +11,8 @@ __all__ = [
     'JobIsFailedException',
     'JobIsRevokedException',
     'JobIsFinishedException',
-    'NoWatermarkToUseException'
+    'NoWatermarkToUseException',
+    'PageTokenIsNotValidException'
 ]
 
 
@@ -58,3 +59,8 @@ class JobIsFinishedException(GrpcBaseException):
 class NoWatermarkToUseException(GrpcBaseException):
     status_code = ErrorCodes.NO_WATERMARK_TO_USE
     message = ErrorMessages.NO_WATERMARK_TO_USE
+
+
+class PageTokenIsNotValidException(GrpcBaseException):
+    status_code = ErrorCodes.PAGE_TOKEN_IS_NOT_VALID
+    message = ErrorMessages.PAGE_TOKEN_IS_NOT_VALID
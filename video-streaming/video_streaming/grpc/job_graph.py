@@ -0,0 +1,115 @@
+from celery import chain, group, Signature
+from video_streaming.ffmpeg import tasks
+
+
+__all__ = [
+    'JobGraph'
+]
+
+
+class JobGraph(object):
+    """a DAG of the job tasks that compiles to one celery canvas
+
+    every node is a chain of tasks that starts as soon as its own
+    dependencies have been finished, instead of waiting for the
+    slowest task of a whole level.
+
+    a node with more than one dependency is joined by the
+    inputs_funnel task, every dependency sends a funnel message and
+    just the last one of them continues to run the node tasks.
+
+    the priority of the job is set on every signature of the canvas,
+    the nested chains and groups are sent by the workers.
+    """
+
+    def __init__(self, request_id: str, priority: int = None):
+        self.request_id = request_id
+        # options of all signatures of the canvas
+        self._options: dict = {}
+        if priority is not None:
+            self._options['priority'] = priority
+        # node name -> tasks of the node as a chain
+        self._tasks: dict[str, list[Signature]] = {}
+        # node name -> names of the dependencies
+        self._dependencies: dict[str, list[str]] = {}
+
+    def has_node(self, name: str) -> bool:
+        return name in self._tasks
+
+    def add_node(self,
+                 name: str,
+                 *node_tasks: Signature,
+                 depends_on: list[str] = None) -> str:
+        """add a chain of tasks as a node of the graph
+
+        the result of the last task of every dependency will be passed
+        to the first task of the node, so tasks should accept it by
+        ChainCallbackMixin
+        """
+        if self.has_node(name):
+            raise ValueError(f"`{name}` node is already exist.")
+        self._tasks[name] = list(node_tasks)
+        # remove duplicate dependencies but keep the order
+        self._dependencies[name] = list(dict.fromkeys(depends_on or []))
+        return name
+
+    def _children(self, name: str) -> list[str]:
+        return [child for child, dependencies in
+                self._dependencies.items() if name in dependencies]
+
+    def _validate(self):
+        for name, dependencies in self._dependencies.items():
+            for dependency in dependencies:
+                if not self.has_node(dependency):
+                    raise ValueError(
+                        f"`{name}` depends on `{dependency}`"
+                        f" that is not exist.")
+
+        # the graph should be acyclic, removes nodes that all of
+        # their dependencies have been removed before
+        resolved: set[str] = set()
+        remaining: dict[str, list[str]] = dict(self._dependencies)
+        while remaining:
+            ready = [name for name, dependencies in remaining.items()
+                     if resolved.issuperset(dependencies)]
+            if not ready:
+                raise ValueError(
+                    f"there is a cycle between: {list(remaining)}")
+            for name in ready:
+                resolved.add(name)
+                del remaining[name]
+
+    def _entry(self, name: str) -> Signature:
+        """the canvas that runs the node from one of its dependencies"""
+        items: list[Signature] = []
+        total_dependencies: int = len(self._dependencies[name])
+        if total_dependencies > 1:
+            items.append(
+                tasks.inputs_funnel.s(
+                    request_id=self.request_id,
+                    funnel_id=name,
+                    total_dependencies=total_dependencies
+                ).set(**self._options))
+        items.extend(self._build(name))
+        return chain(*items)
+
+    def _build(self, name: str) -> list[Signature]:
+        # every path to a node needs its own copy of signatures
+        items: list[Signature] = [
+            task.clone(**self._options) for task in self._tasks[name]]
+        children = self._children(name)
+        if len(children) == 1:
+            items.append(self._entry(children[0]))
+        elif children:
+            items.append(
+                group(*[self._entry(child) for child in children]))
+        return items
+
+    def compile(self) -> Signature:
+        """returns a group of the root nodes, with all their
+        dependents
+        """
+        self._validate()
+        roots = [name for name, dependencies in
+                 self._dependencies.items() if not dependencies]
+        return group(*[chain(*self._build(root)) for root in roots])
@@ -1,5 +1,7 @@
+import asyncio
 from video_streaming.core.commands import GrpcServerBaseCommand
-from video_streaming.grpc.servicers import Health, Streaming
+from video_streaming.grpc.servicers import Health, Streaming, \
+    AsyncHealth, AsyncStreaming
 
 
 class GrpcServer(GrpcServerBaseCommand):
@@ -9,6 +11,10 @@ class GrpcServer(GrpcServerBaseCommand):
 
     def serve(self):
         args = self.parse_args()
+        if args.aio:
+            asyncio.run(self.serve_aio(args))
+            return
+
         server = self.create_server()
 
         # add StreamingServicer to the server
@@ -25,3 +31,20 @@ class GrpcServer(GrpcServerBaseCommand):
 
         self.set_server_status(server, health_servicer)
 
+    async def serve_aio(self, args):
+        server = self.create_aio_server()
+
+        # add StreamingServicer to the server
+        AsyncStreaming()._add_to_server(server)
+
+        # add HealthServicer to the server
+        health_servicer = AsyncHealth()._add_to_server(server)
+
+        # check args to add secure port to the server
+        server = self.config_ssl(args, server)
+
+        print('Starting asyncio server. Listening on port {}...'.format(
+            args.port))
+        await server.start()
+
+        await self.set_aio_server_status(server, health_servicer)
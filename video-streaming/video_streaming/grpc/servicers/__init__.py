@@ -1,7 +1,9 @@
-from .health_servicer import Health
-from .streaming_servicer import Streaming
+from .health_servicer import Health, AsyncHealth
+from .streaming_servicer import Streaming, AsyncStreaming
 
 __all__ = [
     'Health',
-    'Streaming'
+    'AsyncHealth',
+    'Streaming',
+    'AsyncStreaming'
 ]
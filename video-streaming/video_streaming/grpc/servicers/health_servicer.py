@@ -8,3 +8,15 @@ class Health(health.HealthServicer):
             self,
             server)
         return self
+
+
+class AsyncHealth(health.aio.HealthServicer):
+    """HealthServicer of the asyncio server, set method of it
+    is a coroutine
+    """
+
+    def _add_to_server(self, server):
+        health_pb2_grpc.add_HealthServicer_to_server(
+            self,
+            server)
+        return self
@@ -2,10 +2,16 @@ from .get_results import GetResultsMixin
 from .create_job import CreateJobMixin
 from .revoke_jobs import RevokeJobsMixin
 from .revoke_outputs import RevokeOutputsMixin
+from .watch_jobs import WatchJobsMixin
+from .list_jobs import ListJobsMixin
+from .tenants_usage import TenantsUsageMixin
 
 __all__ = [
     'GetResultsMixin',
     'CreateJobMixin',
     'RevokeJobsMixin',
-    'RevokeOutputsMixin'
+    'RevokeOutputsMixin',
+    'WatchJobsMixin',
+    'ListJobsMixin',
+    'TenantsUsageMixin'
 ]
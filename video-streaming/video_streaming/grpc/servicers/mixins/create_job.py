@@ -1,24 +1,39 @@
 import json
+import time
 import uuid
-from celery import result as celery_result, chain, group, signature, \
-    chord
+from celery import result as celery_result, Signature
 from google.protobuf import reflection
+from video_streaming import settings
 from video_streaming.cache import RedisCache
+from video_streaming.celery import celery_app
 from video_streaming.core.constants import CacheKeysTemplates, \
     PrimaryStatus
-from video_streaming.core.services import S3Service
+from video_streaming.core.services import S3Service, JobIndex, \
+    TenantQuota
 from video_streaming.ffmpeg import tasks
 from video_streaming.ffmpeg.constants import VideoEncodingFormats, \
     InputType
 from video_streaming.grpc import exceptions
+from video_streaming.grpc.job_graph import JobGraph
 from video_streaming.grpc.protos import streaming_pb2
 
 
 class CreateJobMixin(object):
 
     cache: RedisCache
+    job_index: JobIndex
     pb2: streaming_pb2
 
+    # names of the job graph nodes, outputs nodes are named
+    # by their output ids
+    _CHECK_INPUT_NODE = "check_input_{input_number}"
+    _CHECK_BUCKET_NODE = "check_bucket_{bucket}"
+    _CHECK_KEY_NODE = "check_key_{bucket}_{key}"
+    _INPUT_NODE = "input_{input_number}"
+    _TEE_INPUT_NODE = "tee_input_{input_number}"
+    _UPLOAD_WATERMARKED_VIDEO_NODE = "upload_watermarked_video"
+    _SHARED_RENDITIONS_NODE = "renditions_{output_ids}"
+
     def _get_format(self, output):
         encode_format = output.options.WhichOneof('encode_format')
         video_codec = None
@@ -125,14 +140,21 @@ class CreateJobMixin(object):
             self,
             request_id: str,
             playlists: streaming_pb2.PlaylistOutput,
-            no_watermarked_tasks: list[chain],
-            watermarked_tasks: list[chain],
+            graph: JobGraph,
+            video_node: str,
+            output_checks: dict[tuple, list[str]],
+            watermark_dependencies: list[str],
             request_has_watermark: bool,
             no_watermarked_playlists_ids: list[str],
             watermarked_playlists_ids: list[str]):
         """initial processing tasks by playlists formats
-        and chains them with upload task
+        and chains them with upload task as nodes of the job graph,
+        playlists with the same video encoding are packaged from
+        shared renditions instead of encoding the video again
         """
+        # playlists that can share the renditions of one encoding
+        shared_encodings: dict[str, list[tuple]] = {}
+        playlists_options: list[tuple] = []
         for number, output in enumerate(playlists):
             if output.use_watermark and not request_has_watermark:
                 raise exceptions.NoWatermarkToUseException
@@ -150,52 +172,199 @@ class CreateJobMixin(object):
                 output.options.quality_names)
             custom_qualities: list[dict] = self._parse_custom_qualities(
                 output.options.custom_qualities)
-
-            # chain of create playlist and upload_directory
-            chain_tasks = chain(
-                # video_path will come from third level
-                tasks.create_playlist.s(
-                    s3_output_key=output.upload_to.key,
-                    fragmented=output.options.fmp4,
-                    # just for HLS type
-                    encode_format=encode_format,
-                    video_codec=video_codec,
-                    audio_codec=audio_codec,
-                    quality_names=quality_names,
-                    custom_qualities=custom_qualities,
-                    request_id=request_id,
-                    output_id=output_id,
-                    is_hls=output.protocol == self.pb2.Protocol.HLS
-                ),
-                # directory will come from create playlist task and callback
-                tasks.upload_directory.s(
-                    s3_output_key=output.upload_to.key,
-                    s3_output_bucket=output.upload_to.bucket,
-                    request_id=request_id,
-                    output_id=output_id
-                ),
-                tasks.call_webhook.s(request_id=request_id)
-            )
+            chunk_duration: int = output.options.chunk_duration or \
+                settings.DEFAULT_CHUNK_DURATION
+
+            encoding_key = self._shared_encoding_key(
+                output,
+                encode_format,
+                video_codec,
+                quality_names,
+                custom_qualities,
+                chunk_duration)
+            if encoding_key is not None:
+                shared_encodings.setdefault(
+                    encoding_key, []).append((output, output_id))
+            playlists_options.append((
+                output,
+                output_id,
+                encode_format,
+                video_codec,
+                audio_codec,
+                quality_names,
+                custom_qualities,
+                chunk_duration,
+                encoding_key))
+
+        for output, output_id, encode_format, video_codec, audio_codec, \
+                quality_names, custom_qualities, chunk_duration, \
+                encoding_key in playlists_options:
+
+            shared_outputs = shared_encodings.get(encoding_key, [])
+            if len(shared_outputs) > 1:
+                # the renditions will be packaged by
+                # stitch_playlist_chunks as the only chunk
+                shared_node = self._SHARED_RENDITIONS_NODE.format(
+                    output_ids="_".join(
+                        shared_output_id for _, shared_output_id
+                        in shared_outputs))
+                if not graph.has_node(shared_node):
+                    self._add_shared_renditions_node(
+                        request_id,
+                        graph,
+                        shared_node,
+                        shared_outputs,
+                        video_node,
+                        output_checks,
+                        watermark_dependencies,
+                        use_watermark=output.use_watermark,
+                        encode_format=encode_format,
+                        video_codec=video_codec,
+                        quality_names=quality_names,
+                        custom_qualities=custom_qualities,
+                        per_title=output.options.per_title)
+                graph.add_node(
+                    output_id,
+                    # video_path, chunks_directory and custom_qualities
+                    # will come from encode_shared_renditions task
+                    tasks.stitch_playlist_chunks.s(
+                        s3_output_key=output.upload_to.key,
+                        s3_output_bucket=output.upload_to.bucket,
+                        fragmented=output.options.fmp4,
+                        encode_format=encode_format,
+                        video_codec=video_codec,
+                        audio_codec=audio_codec,
+                        request_id=request_id,
+                        output_id=output_id,
+                        is_hls=output.protocol == self.pb2.Protocol.HLS,
+                        delete_chunks=False
+                    ),
+                    tasks.upload_directory.s(
+                        s3_output_key=output.upload_to.key,
+                        s3_output_bucket=output.upload_to.bucket,
+                        request_id=request_id,
+                        output_id=output_id
+                    ),
+                    tasks.call_webhook.s(request_id=request_id),
+                    depends_on=[shared_node]
+                )
+            else:
+                # chain of create playlist and upload_directory
+                chain_tasks = (
+                    # video_path will come from the video input or
+                    # add_watermark node
+                    tasks.create_playlist.s(
+                        s3_output_key=output.upload_to.key,
+                        s3_output_bucket=output.upload_to.bucket,
+                        fragmented=output.options.fmp4,
+                        # just for HLS type
+                        encode_format=encode_format,
+                        video_codec=video_codec,
+                        audio_codec=audio_codec,
+                        quality_names=quality_names,
+                        custom_qualities=custom_qualities,
+                        per_title=output.options.per_title,
+                        request_id=request_id,
+                        output_id=output_id,
+                        is_hls=output.protocol == self.pb2.Protocol.HLS,
+                        chunk_duration=chunk_duration
+                    ),
+                    # directory will come from create playlist task and callback
+                    tasks.upload_directory.s(
+                        s3_output_key=output.upload_to.key,
+                        s3_output_bucket=output.upload_to.bucket,
+                        request_id=request_id,
+                        output_id=output_id
+                    ),
+                    tasks.call_webhook.s(request_id=request_id)
+                )
+                self._add_output_node(
+                    graph,
+                    output,
+                    output_id,
+                    chain_tasks,
+                    video_node,
+                    output_checks,
+                    watermark_dependencies)
             if output.use_watermark:
                 watermarked_playlists_ids.append(output_id)
-                watermarked_tasks.append(
-                    chain_tasks)
             else:
                 no_watermarked_playlists_ids.append(output_id)
-                no_watermarked_tasks.append(
-                    chain_tasks)
+
+    def _shared_encoding_key(
+            self,
+            output,
+            encode_format: str,
+            video_codec: str,
+            quality_names: list[str],
+            custom_qualities: list[dict],
+            chunk_duration: int) -> None or str:
+        """playlists with fragmented mp4 segments, DASH and HLS fmp4,
+        and the same video encoding can share the renditions.
+        audio is encoded by packaging every playlist, so it can be
+        different. chunked playlists are encoding in parallel instead.
+        """
+        if chunk_duration:
+            return None
+        if output.protocol == self.pb2.Protocol.HLS and \
+                not output.options.fmp4:
+            return None
+        return json.dumps([
+            output.use_watermark,
+            encode_format,
+            video_codec,
+            quality_names,
+            custom_qualities,
+            output.options.per_title])
+
+    @staticmethod
+    def _add_shared_renditions_node(
+            request_id: str,
+            graph: JobGraph,
+            shared_node: str,
+            shared_outputs: list[tuple],
+            video_node: str,
+            output_checks: dict[tuple, list[str]],
+            watermark_dependencies: list[str],
+            use_watermark: bool,
+            **encoding_kwargs):
+        """the renditions will be encoded after the checks of all
+        playlists that use them, like the add_watermark node
+        """
+        checks: list[str] = []
+        for output, _ in shared_outputs:
+            checks.extend(output_checks.get(
+                (output.upload_to.bucket, output.upload_to.key), []))
+        if use_watermark:
+            watermark_dependencies.extend(checks)
+            depends_on = [CacheKeysTemplates.
+                          WATERMARKED_VIDEO_OUTPUT_ID.format(number=0)]
+        else:
+            depends_on = [video_node, *checks]
+        graph.add_node(
+            shared_node,
+            # video_path will come from the video input or
+            # add_watermark node
+            tasks.encode_shared_renditions.s(
+                request_id=request_id,
+                output_ids=[output_id for _, output_id
+                            in shared_outputs],
+                **encoding_kwargs),
+            depends_on=depends_on)
 
     def _append_thumbnails_tasks(
             self,
             request_id: str,
             thumbnails: streaming_pb2.ThumbnailOutput,
-            no_watermarked_tasks: list[chain],
-            watermarked_tasks: list[chain],
+            graph: JobGraph,
+            video_node: str,
+            output_checks: dict[tuple, list[str]],
+            watermark_dependencies: list[str],
             request_has_watermark,
             no_watermarked_thumbnails_ids: list[str],
             watermarked_thumbnails_ids: list[str]):
         """initial processing tasks by thumbnails options
-        and chains them with upload task
+        and chains them with upload task as nodes of the job graph
         """
         for number, output in enumerate(thumbnails):
             if output.use_watermark and not request_has_watermark:
@@ -209,8 +378,9 @@ class CreateJobMixin(object):
                     number=number)
 
             # chain of create generate_thumbnail and upload_file and callback
-            chain_tasks = chain(
-                # video_path will come from third level
+            chain_tasks = (
+                # video_path will come from the video input or
+                # add_watermark node
                 tasks.generate_thumbnail.s(
                     s3_output_key=output.upload_to.key,
                     request_id=request_id,
@@ -228,27 +398,48 @@ class CreateJobMixin(object):
                 ),
                 tasks.call_webhook.s(request_id=request_id)
             )
-
+            self._add_output_node(
+                graph,
+                output,
+                output_id,
+                chain_tasks,
+                video_node,
+                output_checks,
+                watermark_dependencies)
             if output.use_watermark:
                 watermarked_thumbnails_ids.append(output_id)
-                watermarked_tasks.append(
-                    chain_tasks)
             else:
                 no_watermarked_thumbnails_ids.append(output_id)
-                no_watermarked_tasks.append(
-                    chain_tasks)
+
+    @staticmethod
+    def _add_output_node(
+            graph: JobGraph,
+            output,
+            output_id: str,
+            chain_tasks: tuple,
+            video_node: str,
+            output_checks: dict[tuple, list[str]],
+            watermark_dependencies: list[str]):
+        """a no watermarked output just waits for the video input and
+        its own checks, a watermarked output waits for the add_watermark
+        node and its checks will be the add_watermark dependencies
+        """
+        checks = output_checks.get(
+            (output.upload_to.bucket, output.upload_to.key), [])
+        if output.use_watermark:
+            watermark_dependencies.extend(checks)
+            depends_on = [CacheKeysTemplates.
+                          WATERMARKED_VIDEO_OUTPUT_ID.format(number=0)]
+        else:
+            depends_on = [video_node, *checks]
+        graph.add_node(output_id, *chain_tasks, depends_on=depends_on)
 
     def _apply_job(
             self,
             request_id,
-            ordered_levels):
-
-        chain_items = []
-        for level_tasks in ordered_levels:
-            if level_tasks:
-                chain_items.append(group(*level_tasks))
+            graph: JobGraph):
 
-        job = chain(*chain_items)
+        job = graph.compile()
 
         # set first primary status as QUEUING_CHECKS
         self.cache.set(
@@ -300,17 +491,24 @@ class CreateJobMixin(object):
         # print(outputs)
         return any(output.upload_to.key and not output.upload_to.key.isspace() for output in outputs)
 
-    def _create_job(self, request, context):
-        request_id: str = str(uuid.uuid4())
-        print("request_id =", request_id)
-
-        first_level: list = []
-        second_level: list = []
-        third_level: list = []
-        fourth_level: list = []
-        fifth_level: list = []
-        no_watermarked_tasks: list = []
-        watermarked_tasks: list = []
+    def _prepare_job(
+            self,
+            request,
+            context,
+            request_id: str) -> tuple[dict, JobGraph]:
+        """validate the request and returns the job details and
+        the graph of the job tasks
+        """
+        priority: str = self.pb2.JobPriority.Name(request.priority)
+        graph = JobGraph(
+            request_id,
+            priority=settings.JOB_PRIORITIES[priority])
+        total_checks: int = 0
+        total_inputs: int = 0
+        # (bucket, key) of every output -> names of its checks nodes
+        output_checks: dict[tuple, list[str]] = {}
+        # checks of watermarked outputs, add_watermark waits for them
+        watermark_dependencies: list[str] = []
         watermarked_outputs_ids: list[str] = []
         watermarked_playlists_ids: list[str] = []
         watermarked_thumbnails_ids: list[str] = []
@@ -330,6 +528,10 @@ class CreateJobMixin(object):
             (0, request.video, InputType.VIDEO_INPUT),
             (1, request.watermark, InputType.WATERMARK_INPUT),
         )
+        video_node: str = self._INPUT_NODE.format(input_number=0)
+        stream_video: bool = request.video.stream or \
+            settings.DEFAULT_STREAM_INPUT
+        watermark_node: str = self._INPUT_NODE.format(input_number=1)
 
         # For strings in proto3, the default value is the empty string
         # check input key to not be empty string
@@ -341,34 +543,48 @@ class CreateJobMixin(object):
                 # watermark is optional input, skip it if empty
                 continue
             # is video exist on the cloud
-            first_level.append(
+            check_node = graph.add_node(
+                self._CHECK_INPUT_NODE.format(input_number=input_number),
                 tasks.check_input_key.s(
                     s3_input_key=input_object.s3_input.key,
                     s3_input_bucket=input_object.s3_input.bucket,
                     request_id=request_id,
                     input_type=input_type)
             )
-            third_level.append(
-                chain(
-                    # video or watermark object details will
-                    # come from previous levels
-                    tasks.download_input.s(
-                        request_id=request_id,
-                        s3_input_key=input_object.s3_input.key,
-                        s3_input_bucket=input_object.s3_input.bucket,
-                        input_number=input_number,
-                        input_type=input_type)
-                    ,
-                    tasks.analyze_input.s(
-                        request_id=request_id,
-                        input_number=input_number,
-                        input_type=input_type)
-                )
+            total_checks += 1
+
+            input_kwargs = dict(
+                request_id=request_id,
+                s3_input_key=input_object.s3_input.key,
+                s3_input_bucket=input_object.s3_input.bucket,
+                input_number=input_number,
+                input_type=input_type)
+            if input_type == InputType.VIDEO_INPUT and stream_video:
+                # outputs read the video by url, while it's
+                # downloading for the next outputs
+                input_task = tasks.stream_input.s(**input_kwargs)
+                if settings.STREAM_INPUT_TEE:
+                    graph.add_node(
+                        self._TEE_INPUT_NODE.format(
+                            input_number=input_number),
+                        tasks.tee_input.s(**input_kwargs),
+                        depends_on=[check_node])
+            else:
+                input_task = tasks.download_input.s(**input_kwargs)
+
+            # the input will be downloaded just after its own check
+            graph.add_node(
+                self._INPUT_NODE.format(input_number=input_number),
+                # video or watermark object details will
+                # come from the check_input_key task
+                input_task,
+                tasks.analyze_input.s(
+                    request_id=request_id,
+                    input_number=input_number,
+                    input_type=input_type),
+                depends_on=[check_node]
             )
-
-        fourth_level.append(
-            tasks.inputs_funnel.s(request_id=request_id)
-        )
+            total_inputs += 1
 
         # is there any defined output
         if not self._has_any_output(*request_outputs):
@@ -392,44 +608,61 @@ class CreateJobMixin(object):
             output_locations.append(
                 (output.upload_to.bucket, output.upload_to.key))
 
-            if output.upload_to.dont_replace:
-                # check to can be replace output
-                # when output key is already exist
-                second_level.append(
-                    tasks.check_output_key.s(
-                        s3_output_key=output.upload_to.key,
-                        s3_output_bucket=output.upload_to.bucket,
-                        s3_dont_replace=output.upload_to.dont_replace,
-                        request_id=request_id
-                    )
-                )
-
         # check duplicate output locations in current request
         if len(output_locations) != len(set(output_locations)):
             raise exceptions.DuplicateOutputLocationsException
 
         # check unique output buckets are exist on the cloud or
-        # create them if has one create flag ,as first level tasks
+        # create them if has one create flag, they will be run
+        # alongside the inputs downloading
         for bucket in set(output_buckets):
             # search bucket has one create flag
             s3_create_bucket = self._has_create_flag(
                 bucket, *request_outputs)
 
-            first_level.append(
+            graph.add_node(
+                self._CHECK_BUCKET_NODE.format(bucket=bucket),
                 tasks.check_output_bucket.s(
                     s3_output_bucket=bucket,
                     s3_create_bucket=s3_create_bucket,
                     request_id=request_id
                 )
             )
+            total_checks += 1
+
+        for output in request_outputs:
+            if output.upload_to.key.isspace():
+                continue
+            location = (output.upload_to.bucket, output.upload_to.key)
+            output_checks[location] = [
+                self._CHECK_BUCKET_NODE.format(
+                    bucket=output.upload_to.bucket)]
+
+            if output.upload_to.dont_replace:
+                # check to can be replace output
+                # when output key is already exist
+                output_checks[location].append(graph.add_node(
+                    self._CHECK_KEY_NODE.format(
+                        bucket=output.upload_to.bucket,
+                        key=output.upload_to.key),
+                    tasks.check_output_key.s(
+                        s3_output_key=output.upload_to.key,
+                        s3_output_bucket=output.upload_to.bucket,
+                        s3_dont_replace=output.upload_to.dont_replace,
+                        request_id=request_id
+                    )
+                ))
+                total_checks += 1
 
         # initial processing tasks by output formats
         # and chains them with upload task
         self._append_playlists_tasks(
             request_id=request_id,
             playlists=request.playlists,
-            no_watermarked_tasks=no_watermarked_tasks,
-            watermarked_tasks=watermarked_tasks,
+            graph=graph,
+            video_node=video_node,
+            output_checks=output_checks,
+            watermark_dependencies=watermark_dependencies,
             request_has_watermark=request_has_watermark,
             no_watermarked_playlists_ids=no_watermarked_playlists_ids,
             watermarked_playlists_ids=watermarked_playlists_ids)
@@ -438,54 +671,64 @@ class CreateJobMixin(object):
         self._append_thumbnails_tasks(
             request_id=request_id,
             thumbnails=request.thumbnails,
-            no_watermarked_tasks=no_watermarked_tasks,
-            watermarked_tasks=watermarked_tasks,
+            graph=graph,
+            video_node=video_node,
+            output_checks=output_checks,
+            watermark_dependencies=watermark_dependencies,
             request_has_watermark=request_has_watermark,
             no_watermarked_thumbnails_ids=no_watermarked_thumbnails_ids,
             watermarked_thumbnails_ids=watermarked_thumbnails_ids)
         watermarked_outputs_ids.extend(watermarked_thumbnails_ids)
 
-        # add all no watermarked outputs to fifth_level
-        fifth_level.extend(no_watermarked_tasks)
-
-        # update watermarked_tasks
+        # update watermarked outputs
         if request_has_watermark and upload_watermarked_video:
             watermarked_outputs_ids.append(watermarked_video_output_id)
-            watermarked_tasks.append(
-                chain(
-                    # file_path will come from add_watermark task
-                    tasks.upload_file.s(
-                        s3_output_key=request.watermark.upload_to.key,
-                        s3_output_bucket=request.watermark.upload_to.bucket,
-                        request_id=request_id,
-                        output_id=watermarked_video_output_id
-                    ),
-                    tasks.call_webhook.s(request_id=request_id)
-                )
+            watermark_dependencies.extend(output_checks.get(
+                (request.watermark.upload_to.bucket,
+                 request.watermark.upload_to.key), []))
+            graph.add_node(
+                self._UPLOAD_WATERMARKED_VIDEO_NODE,
+                # file_path will come from add_watermark task
+                tasks.upload_file.s(
+                    s3_output_key=request.watermark.upload_to.key,
+                    s3_output_bucket=request.watermark.upload_to.bucket,
+                    request_id=request_id,
+                    output_id=watermarked_video_output_id
+                ),
+                tasks.call_webhook.s(request_id=request_id),
+                depends_on=[watermarked_video_output_id]
             )
 
-        # append add_watermark task to fifth_level
-        if request_has_watermark and watermarked_tasks:
-            fifth_level.append(
-                chain(
-                    # video_path and watermark_path
-                    # will come from previous level
-                    tasks.add_watermark.s(
-                        s3_output_key=request.watermark.upload_to.key,
-                        request_id=request_id,
-                        output_id=watermarked_video_output_id
-                    ),
-                    # add all watermarked outputs
-                    group(*watermarked_tasks)
-                )
+        # add_watermark waits for both inputs and the checks of
+        # the watermarked outputs
+        if request_has_watermark and watermarked_outputs_ids:
+            graph.add_node(
+                watermarked_video_output_id,
+                # video_path and watermark_path
+                # will come from the inputs_funnel task
+                tasks.add_watermark.s(
+                    s3_output_key=request.watermark.upload_to.key,
+                    request_id=request_id,
+                    output_id=watermarked_video_output_id
+                ),
+                depends_on=[
+                    video_node,
+                    watermark_node,
+                    *watermark_dependencies]
             )
 
         job_details = dict(
             reference_id=request.reference_id,
+            created_at=time.time(),
+            priority=priority,
+            tenant_id=TenantQuota.get_tenant(
+                request.tenant_id, request.reference_id),
             webhook_url=request.webhook_url,
-            total_checks=len(first_level)+len(second_level),
-            total_inputs=len(third_level),
-            total_outputs=len(no_watermarked_tasks) + len(watermarked_tasks),
+            total_checks=total_checks,
+            total_inputs=total_inputs,
+            total_outputs=len(no_watermarked_playlists_ids) +
+            len(no_watermarked_thumbnails_ids) +
+            len(watermarked_outputs_ids),
             total_playlists=len(request.playlists),
             total_thumbnails=len(request.thumbnails),
             watermarked_outputs_ids=watermarked_outputs_ids,
@@ -495,6 +738,13 @@ class CreateJobMixin(object):
             no_watermarked_thumbnails_ids=no_watermarked_thumbnails_ids
         )
         print(job_details)
+        return job_details, graph
+
+    def _create_job(self, request, context):
+        request_id: str = str(uuid.uuid4())
+        print("request_id =", request_id)
+
+        job_details, graph = self._prepare_job(request, context, request_id)
 
         # saving job details
         self.cache.set(
@@ -503,15 +753,60 @@ class CreateJobMixin(object):
             ),
             json.dumps(job_details))
 
-        ordered_levels = [
-            first_level,  # checks
-            second_level,  # checks
-
-            third_level,  # downloads
-            fourth_level,  # wait
-
-            fifth_level  # outputs
-        ]
+        # indexed before applying, the workers move it to the index of
+        # the next statuses
+        self.job_index.add(
+            {request_id: job_details},
+            PrimaryStatus.QUEUING_CHECKS)
 
-        self._apply_job(request_id, ordered_levels)
+        self._apply_job(request_id, graph)
         return self._job_response(request_id)
+
+    def _create_jobs(self, request, context):
+        """create a batch of jobs, an invalid job does not fail the
+        others and its error is returned in place of its tracking_id
+        """
+        results: list[streaming_pb2.CreatedJob] = []
+        # request_id -> compiled graph of the valid jobs
+        jobs: dict[str, Signature] = {}
+        jobs_details: dict[str, dict] = {}
+        # JOB_DETAILS and first primary status of the valid jobs
+        job_keys: dict[str, str] = {}
+        for job_request in request.jobs:
+            request_id: str = str(uuid.uuid4())
+            try:
+                # context is not passed, to not set the error as
+                # the status of the whole batch
+                job_details, graph = self._prepare_job(
+                    job_request, None, request_id)
+                jobs[request_id] = graph.compile()
+                jobs_details[request_id] = job_details
+            except exceptions.GrpcBaseException as exc:
+                results.append(self.pb2.CreatedJob(
+                    error_code=exc.status_code,
+                    error_message=exc.message))
+                continue
+            job_keys[CacheKeysTemplates.JOB_DETAILS.format(
+                request_id=request_id)] = json.dumps(job_details)
+            job_keys[CacheKeysTemplates.PRIMARY_STATUS.format(
+                request_id=request_id)] = PrimaryStatus.QUEUING_CHECKS
+            results.append(self.pb2.CreatedJob(tracking_id=request_id))
+        print("created jobs =", len(jobs), "of", len(request.jobs))
+
+        # saving details of all jobs by one round trip, then indexing
+        # them by another one, before applying them
+        self.cache.set_many(job_keys)
+        self.job_index.add(jobs_details, PrimaryStatus.QUEUING_CHECKS)
+
+        # apply tasks of all jobs by one producer, instead of
+        # acquiring a broker connection for every job
+        result_ids: dict[str, str] = {}
+        with celery_app.producer_or_acquire() as producer:
+            for request_id, job in jobs.items():
+                result = job.apply_async(producer=producer)
+                result_ids[CacheKeysTemplates.REQUEST_RESULT_ID.format(
+                    request_id=request_id)] = str(result.id)
+
+        # saving celery result ids of the jobs
+        self.cache.set_many(result_ids)
+        return self.pb2.JobsResponse(results=results)
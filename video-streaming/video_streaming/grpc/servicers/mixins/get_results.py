@@ -1,7 +1,8 @@
 import pprint
 
 from ffmpeg_streaming.ffprobe import Streams
-from video_streaming.cache import RedisCache
+from video_streaming.cache import RedisCache, AsyncRedisCache, \
+    HashSnapshot
 from video_streaming.core.constants import CacheKeysTemplates, \
     PrimaryStatus
 from video_streaming.grpc.protos import streaming_pb2
@@ -10,42 +11,40 @@ from video_streaming.grpc.protos import streaming_pb2
 class GetResultsMixin(object):
 
     cache: RedisCache
+    async_cache: AsyncRedisCache
     pb2: streaming_pb2
 
-    @staticmethod
-    def get_cpu_usage(start: list, end: list):
-
-        # iowait: (Linux) time spent waiting for blocking I/O to
-        # complete. This value is excluded from user and system times
-        # count (because the CPU is not doing any work).
-        start_iowait = start.pop()
-        end_iowait = end.pop()
-
-        # total CPU time at start (including idle time)
-        start_total = sum(start)
-        # calculates the busy CPU time at start
-        start_busy = start_total - start_iowait
-
-        # total CPU time at end (including idle time)
-        end_total = sum(end)
-        # calculates the busy CPU time at end
-        end_busy = end_total - end_iowait
-
-        if end_busy <= start_busy:
-            return 0.0
-
-        busy_delta = end_busy - start_busy
-        return busy_delta
+    def _resource_usage(self, job, request_id, output_id, output_details):
+        start_progressing_times: float = job.get(
+            CacheKeysTemplates.OUTPUT_START_PROCESSING_TIME.format(
+                request_id=request_id,
+                output_id=output_id))
+        end_progressing_times: float = job.get(
+            CacheKeysTemplates.OUTPUT_END_PROCESSING_TIME.format(
+                request_id=request_id,
+                output_id=output_id))
+        if start_progressing_times and end_progressing_times:
+            output_details['spent_time'] = end_progressing_times - start_progressing_times
+        resource_usage: dict = job.get(
+            CacheKeysTemplates.OUTPUT_RESOURCE_USAGE.format(
+                request_id=request_id,
+                output_id=output_id))
+        if resource_usage:
+            output_details['resource_usage'] = self.pb2.ResourceUsage(
+                **resource_usage)
+            output_details['cpu_usage'] = resource_usage['seconds']
+            output_details['memory_usage'] = resource_usage[
+                'peak_memory_rss']
 
-    def _playlists(self, request_id, output_ids, outputs):
+    def _playlists(self, job, request_id, output_ids, outputs):
         for output_id in output_ids:
-            output_status = self.cache.get(
+            output_status = job.get(
                 CacheKeysTemplates.OUTPUT_STATUS.format(
                     request_id=request_id,
                     output_id=output_id),
                 decode=False)
             if output_status:
-                directory_size: int = self.cache.get(
+                directory_size: int = job.get(
                     CacheKeysTemplates.OUTPUT_SIZE.format(
                         request_id=request_id,
                         output_id=output_id)) or 0
@@ -55,7 +54,7 @@ class GetResultsMixin(object):
                         output_status),
                     directory_size=directory_size,
                 )
-                progress: dict = self.cache.get(
+                progress: dict = job.get(
                     CacheKeysTemplates.OUTPUT_PROGRESS.format(
                         request_id=request_id,
                         output_id=output_id))
@@ -63,51 +62,36 @@ class GetResultsMixin(object):
                     output_details['output_progress'] = self.pb2.\
                         Progress(**progress)
 
-                start_progressing_times: float = self.cache.get(
-                    CacheKeysTemplates.OUTPUT_START_PROCESSING_TIME.format(
+                self._resource_usage(
+                    job,
+                    request_id,
+                    output_id,
+                    output_details)
+
+                pruned_representations: list = job.get(
+                    CacheKeysTemplates.OUTPUT_PRUNED_REPRESENTATIONS.format(
                         request_id=request_id,
                         output_id=output_id))
-                end_progressing_times: float = self.cache.get(
-                    CacheKeysTemplates.OUTPUT_END_PROCESSING_TIME.format(
+                if pruned_representations:
+                    output_details['pruned_representations'] = [
+                        self.pb2.PrunedRepresentation(**item)
+                        for item in pruned_representations]
+                output_details['per_title_failed'] = bool(job.get(
+                    CacheKeysTemplates.OUTPUT_PER_TITLE_FAILED.format(
                         request_id=request_id,
-                        output_id=output_id))
-                if start_progressing_times and end_progressing_times:
-                    output_details['spent_time'] = end_progressing_times - start_progressing_times
-                    start_cpu_times: list = self.cache.get(
-                        CacheKeysTemplates.OUTPUT_START_CPU_TIMES.format(
-                            request_id=request_id,
-                            output_id=output_id))
-                    end_cpu_times: list = self.cache.get(
-                        CacheKeysTemplates.OUTPUT_END_CPU_TIMES.format(
-                            request_id=request_id,
-                            output_id=output_id))
-                    if start_cpu_times and end_cpu_times:
-                        output_details['cpu_usage'] = self.get_cpu_usage(
-                            list(start_cpu_times),
-                            list(end_cpu_times)
-                        )
-                    start_memory_rss: int = self.cache.get(
-                        CacheKeysTemplates.OUTPUT_START_MEMORY_RSS.format(
-                            request_id=request_id,
-                            output_id=output_id))
-                    end_memory_rss: int = self.cache.get(
-                        CacheKeysTemplates.OUTPUT_END_MEMORY_RSS.format(
-                            request_id=request_id,
-                            output_id=output_id))
-                    if start_memory_rss and end_memory_rss:
-                        output_details['memory_usage'] = end_memory_rss - start_memory_rss
+                        output_id=output_id)))
 
                 outputs.append(self.pb2.PlaylistDetails(**output_details))
 
-    def _thumbnails(self, request_id, output_ids, outputs):
+    def _thumbnails(self, job, request_id, output_ids, outputs):
         for output_id in output_ids:
-            output_status = self.cache.get(
+            output_status = job.get(
                 CacheKeysTemplates.OUTPUT_STATUS.format(
                     request_id=request_id,
                     output_id=output_id),
                 decode=False)
             if output_status:
-                file_size: int = self.cache.get(
+                file_size: int = job.get(
                     CacheKeysTemplates.OUTPUT_SIZE.format(
                         request_id=request_id,
                         output_id=output_id)) or 0
@@ -121,18 +105,19 @@ class GetResultsMixin(object):
 
     def _watermarked_video(
             self,
+            job,
             request_id
             ) -> None or streaming_pb2.WatermarkedVideoDetails:
         # output id of watermarked video
         output_id = CacheKeysTemplates. \
             WATERMARKED_VIDEO_OUTPUT_ID.format(number=0)
-        output_status = self.cache.get(
+        output_status = job.get(
             CacheKeysTemplates.OUTPUT_STATUS.format(
                 request_id=request_id,
                 output_id=output_id),
             decode=False)
         if output_status:
-            file_size: int = self.cache.get(
+            file_size: int = job.get(
                 CacheKeysTemplates.OUTPUT_SIZE.format(
                     request_id=request_id,
                     output_id=output_id)) or 0
@@ -142,7 +127,7 @@ class GetResultsMixin(object):
                     output_status),
                 file_size=file_size
             )
-            progress: dict = self.cache.get(
+            progress: dict = job.get(
                 CacheKeysTemplates.OUTPUT_PROGRESS.format(
                     request_id=request_id,
                     output_id=output_id))
@@ -150,46 +135,18 @@ class GetResultsMixin(object):
                 output_details['output_progress'] = self.pb2. \
                     Progress(**progress)
 
-            start_progressing_times: float = self.cache.get(
-                CacheKeysTemplates.OUTPUT_START_PROCESSING_TIME.format(
-                    request_id=request_id,
-                    output_id=output_id))
-            end_progressing_times: float = self.cache.get(
-                CacheKeysTemplates.OUTPUT_END_PROCESSING_TIME.format(
-                    request_id=request_id,
-                    output_id=output_id))
-            if start_progressing_times and end_progressing_times:
-                output_details['spent_time'] = end_progressing_times - start_progressing_times
-                start_cpu_times: list = self.cache.get(
-                    CacheKeysTemplates.OUTPUT_START_CPU_TIMES.format(
-                        request_id=request_id,
-                        output_id=output_id))
-                end_cpu_times: list = self.cache.get(
-                    CacheKeysTemplates.OUTPUT_END_CPU_TIMES.format(
-                        request_id=request_id,
-                        output_id=output_id))
-                if start_cpu_times and end_cpu_times:
-                    output_details['cpu_usage'] = self.get_cpu_usage(
-                        list(start_cpu_times),
-                        list(end_cpu_times)
-                    )
-                start_memory_rss: int = self.cache.get(
-                    CacheKeysTemplates.OUTPUT_START_MEMORY_RSS.format(
-                        request_id=request_id,
-                        output_id=output_id))
-                end_memory_rss: int = self.cache.get(
-                    CacheKeysTemplates.OUTPUT_END_MEMORY_RSS.format(
-                        request_id=request_id,
-                        output_id=output_id))
-                if start_memory_rss and end_memory_rss:
-                    output_details['memory_usage'] = end_memory_rss - start_memory_rss
+            self._resource_usage(
+                job,
+                request_id,
+                output_id,
+                output_details)
 
             return self.pb2.WatermarkedVideoDetails(**output_details)
 
-    def _inputs(self, request_id, total_inputs):
+    def _inputs(self, job, request_id, total_inputs):
         inputs: list[streaming_pb2.InputDetails] = []
         for input_number in range(total_inputs):
-            input_status: str = self.cache.get(
+            input_status: str = job.get(
                 CacheKeysTemplates.INPUT_STATUS.format(
                     request_id=request_id,
                     input_number=input_number),
@@ -200,14 +157,14 @@ class GetResultsMixin(object):
                     status=self.pb2.InputStatus.Value(
                         input_status),
                     )
-                progress: dict = self.cache.get(
+                progress: dict = job.get(
                     CacheKeysTemplates.INPUT_DOWNLOADING_PROGRESS.format(
                         request_id=request_id,
                         input_number=input_number)) or {}
                 if progress:
                     input_details['input_progress'] = self.pb2.\
                         Progress(**progress)
-                ffprobe_data: dict = self.cache.get(
+                ffprobe_data: dict = job.get(
                     CacheKeysTemplates.INPUT_FFPROBE_DATA.format(
                         request_id=request_id,
                         input_number=input_number
@@ -245,12 +202,17 @@ class GetResultsMixin(object):
         return inputs
 
     def _get_result(self,
-                    request_id: str
+                    request_id: str,
+                    job: HashSnapshot = None
                     ) -> None or streaming_pb2.ResultDetails:
-        primary_status: str = self.cache.get(
+        if job is None:
+            # all keys of the job are read by one round trip
+            job = self.cache.get_snapshot(
+                CacheKeysTemplates.JOB_HASH.format(request_id=request_id))
+        primary_status: str = job.get(
             CacheKeysTemplates.PRIMARY_STATUS.format(
                 request_id=request_id), decode=False)
-        job_details: dict = self.cache.get(
+        job_details: dict = job.get(
             CacheKeysTemplates.JOB_DETAILS.format(
                 request_id=request_id))
         if primary_status and job_details:
@@ -263,18 +225,18 @@ class GetResultsMixin(object):
             # total_playlists: int = job_details['total_playlists']
             # total_thumbnails: int = job_details['total_thumbnails']
 
-            ready_outputs: int = self.cache.get(
+            ready_outputs: int = job.get(
                 CacheKeysTemplates.READY_OUTPUTS.format(
                     request_id=request_id)) or 0
-            revoked_outputs: int = self.cache.get(
+            revoked_outputs: int = job.get(
                 CacheKeysTemplates.REVOKED_OUTPUTS.format(
                     request_id=request_id)) or 0
-            failed_outputs: int = self.cache.get(
+            failed_outputs: int = job.get(
                 CacheKeysTemplates.FAILED_OUTPUTS.format(
                     request_id=request_id)) or 0
             checks = self.pb2.Checks(
                 total=total_checks,
-                passed=self.cache.get(
+                passed=job.get(
                     CacheKeysTemplates.PASSED_CHECKS.format(
                         request_id=request_id)) or 0)
 
@@ -282,19 +244,23 @@ class GetResultsMixin(object):
             thumbnails_outputs: list[streaming_pb2.ThumbnailDetails] = []
 
             self._playlists(
+                job,
                 request_id,
                 job_details['no_watermarked_playlists_ids'],
                 playlists_outputs)
             self._playlists(
+                job,
                 request_id,
                 job_details['watermarked_playlists_ids'],
                 playlists_outputs)
 
             self._thumbnails(
+                job,
                 request_id,
                 job_details['no_watermarked_thumbnails_ids'],
                 thumbnails_outputs)
             self._thumbnails(
+                job,
                 request_id,
                 job_details['watermarked_thumbnails_ids'],
                 thumbnails_outputs)
@@ -308,18 +274,18 @@ class GetResultsMixin(object):
                 ready_outputs=ready_outputs,
                 failed_outputs=failed_outputs,
                 checks=checks,
-                inputs=self._inputs(request_id, total_inputs),
+                inputs=self._inputs(job, request_id, total_inputs),
                 playlists=self.pb2.Playlists(
                     outputs=playlists_outputs),
                 thumbnails=self.pb2.Thumbnails(
                     outputs=thumbnails_outputs),
-                watermarked_video=self._watermarked_video(request_id)
+                watermarked_video=self._watermarked_video(job, request_id)
             )
             # get stop reason if primary status is FAILED or REVOKED
             if primary_status in [
                     PrimaryStatus.FAILED,
                     PrimaryStatus.REVOKED]:
-                stop_reason: str = self.cache.get(
+                stop_reason: str = job.get(
                     CacheKeysTemplates.STOP_REASON.format(
                         request_id=request_id), decode=False)
                 if stop_reason:
@@ -328,10 +294,31 @@ class GetResultsMixin(object):
 
             return self.pb2.ResultDetails(**result_details)
 
-    def _get_results(self, request, context):
+    def _results(self,
+                 request_ids: list[str],
+                 jobs: list[HashSnapshot]
+                 ) -> streaming_pb2.JobsResultsResponse:
         results: list[streaming_pb2.ResultDetails] = []
-        for request_id in request.tracking_ids:
-            result = self._get_result(request_id)
+        for request_id, job in zip(request_ids, jobs):
+            result = self._get_result(request_id, job)
             if result:
                 results.append(result)
         return self.pb2.JobsResultsResponse(results=results)
+
+    def _get_results(self, request, context):
+        # the hashes of all jobs are read by one pipeline, instead of
+        # a round trip for every job
+        jobs: list[HashSnapshot] = self.cache.get_snapshots(*[
+            CacheKeysTemplates.JOB_HASH.format(request_id=request_id)
+            for request_id in request.tracking_ids])
+        return self._results(request.tracking_ids, jobs)
+
+    async def _async_get_results(self, request, context):
+        """same as _get_results for the asyncio server, all keys that
+        are used by _get_result are in the job hash, so the snapshots
+        need no more round trips
+        """
+        jobs: list[HashSnapshot] = await self.async_cache.get_snapshots(*[
+            CacheKeysTemplates.JOB_HASH.format(request_id=request_id)
+            for request_id in request.tracking_ids])
+        return self._results(request.tracking_ids, jobs)
@@ -0,0 +1,53 @@
+from video_streaming.cache import RedisCache, HashSnapshot
+from video_streaming.core.constants import CacheKeysTemplates
+from video_streaming.core.services import JobIndex
+from video_streaming.grpc import exceptions
+from video_streaming.grpc.protos import streaming_pb2
+
+
+class ListJobsMixin(object):
+
+    cache: RedisCache
+    job_index: JobIndex
+    pb2: streaming_pb2
+
+    def _list_jobs(self, request, context):
+        try:
+            candidates, indexes, next_page_token = self.job_index.query(
+                reference_id=request.reference_id or None,
+                statuses=[
+                    self.pb2.PrimaryStatus.Name(status)
+                    for status in request.statuses],
+                created_after=request.created_after or None,
+                created_before=request.created_before or None,
+                page_size=request.page_size,
+                page_token=request.page_token or None)
+        except ValueError:
+            raise exceptions.PageTokenIsNotValidException(context=context)
+
+        jobs: list[HashSnapshot] = self.cache.get_snapshots(*[
+            CacheKeysTemplates.JOB_HASH.format(request_id=request_id)
+            for request_id, _ in candidates])
+        summaries: list[streaming_pb2.JobSummary] = []
+        # the jobs that have been expired, but are still in the indexes
+        expired: list[str] = []
+        for (request_id, created_at), job in zip(candidates, jobs):
+            primary_status: str = job.get(
+                CacheKeysTemplates.PRIMARY_STATUS.format(
+                    request_id=request_id), decode=False)
+            job_details: dict = job.get(
+                CacheKeysTemplates.JOB_DETAILS.format(
+                    request_id=request_id))
+            if not primary_status or not job_details:
+                expired.append(request_id)
+                continue
+            summaries.append(self.pb2.JobSummary(
+                tracking_id=request_id,
+                reference_id=job_details['reference_id'],
+                status=self.pb2.PrimaryStatus.Value(primary_status),
+                created_at=created_at))
+        self.job_index.remove(expired, *indexes)
+
+        return self.pb2.ListJobsResponse(
+            jobs=summaries,
+            next_page_token=next_page_token or "")
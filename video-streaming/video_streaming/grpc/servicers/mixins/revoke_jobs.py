@@ -2,6 +2,7 @@ import json
 from celery.result import AsyncResult
 from video_streaming.celery import celery_app
 from video_streaming.cache import RedisCache
+from video_streaming.core.services import CancellationBus
 from video_streaming.core.constants import CacheKeysTemplates
 from video_streaming.grpc.protos import streaming_pb2
 
@@ -9,6 +10,7 @@ from video_streaming.grpc.protos import streaming_pb2
 class RevokeJobsMixin(object):
 
     cache: RedisCache
+    cancellation_bus: CancellationBus
     pb2: streaming_pb2
 
     def _revoke_job(self,
@@ -34,6 +36,8 @@ class RevokeJobsMixin(object):
                 CacheKeysTemplates.FORCE_STOP_REQUEST.format(
                     request_id=request_id),
                 json.dumps(True))
+            # the workers kill the running processes of the job
+            self.cancellation_bus.publish(request_id)
 
             # celery result id
             result_id: str = self.cache.get(
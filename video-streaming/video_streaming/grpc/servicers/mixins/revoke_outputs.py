@@ -1,5 +1,6 @@
 import json
 from video_streaming.cache import RedisCache
+from video_streaming.core.services import CancellationBus
 from video_streaming.grpc import exceptions
 from video_streaming.core.constants import CacheKeysTemplates, \
     PrimaryStatus, OutputStatus
@@ -9,6 +10,7 @@ from video_streaming.grpc.protos import streaming_pb2
 class RevokeOutputsMixin(object):
 
     cache: RedisCache
+    cancellation_bus: CancellationBus
     pb2: streaming_pb2
 
     @staticmethod
@@ -36,6 +38,8 @@ class RevokeOutputsMixin(object):
                     request_id=request_id,
                     output_id=output_id),
                 json.dumps(True))
+            # the workers kill the running processes of the output
+            self.cancellation_bus.publish(request_id, output_id)
 
     def _outputs_to_revoke(
             self,
@@ -0,0 +1,21 @@
+from video_streaming.core.services import TenantQuota
+from video_streaming.grpc.protos import streaming_pb2
+
+
+class TenantsUsageMixin(object):
+
+    tenant_quota: TenantQuota
+    pb2: streaming_pb2
+
+    def _get_tenants_usage(self, request, context):
+        usage: dict[str, dict] = self.tenant_quota.get_usage(
+            list(request.tenant_ids))
+        return self.pb2.TenantsUsageResponse(tenants=[
+            self.pb2.TenantUsage(
+                tenant_id=tenant_id,
+                weight=tenant_usage['weight'],
+                encodes=self.pb2.QuotaUsage(
+                    **tenant_usage[TenantQuota.ENCODE]),
+                downloads=self.pb2.QuotaUsage(
+                    **tenant_usage[TenantQuota.DOWNLOAD]))
+            for tenant_id, tenant_usage in usage.items()])
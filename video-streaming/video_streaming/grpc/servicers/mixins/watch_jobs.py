@@ -0,0 +1,220 @@
+import time
+from video_streaming import settings
+from video_streaming.cache import RedisCache, AsyncRedisCache, \
+    HashSnapshot
+from video_streaming.core.constants import CacheKeysTemplates
+from video_streaming.grpc.protos import streaming_pb2
+from .get_results import GetResultsMixin
+
+
+class WatchJobsMixin(object):
+    """stream the changes of jobs instead of polling get_results
+
+    the stream is subscribed to the changes channels of the jobs, that
+    the workers publish to them by notify_job_change, then the changed
+    jobs are read by one pipeline and just the changed fields of their
+    ResultDetails are sent. the jobs are read again every
+    RESYNC_INTERVAL seconds without any change, to not miss a change
+    that has been not notified
+    """
+
+    cache: RedisCache
+    async_cache: AsyncRedisCache
+    pb2: streaming_pb2
+
+    _get_result: GetResultsMixin._get_result
+
+    RESYNC_INTERVAL = settings.WATCH_JOBS_RESYNC_INTERVAL
+
+    # there is no change of a job after these statuses
+    DONE_STATUSES = [
+        streaming_pb2.FINISHED,
+        streaming_pb2.FAILED,
+        streaming_pb2.REVOKED]
+
+    @staticmethod
+    def _job_hashes(request_ids) -> list[str]:
+        return [
+            CacheKeysTemplates.JOB_HASH.format(request_id=request_id)
+            for request_id in request_ids]
+
+    @staticmethod
+    def _channels(request_ids) -> list[str]:
+        return [
+            CacheKeysTemplates.JOB_CHANGES_CHANNEL.format(
+                request_id=request_id)
+            for request_id in request_ids]
+
+    @staticmethod
+    def _changed_items(previous, items) -> list:
+        """the items of inputs, playlists or thumbnails that have been
+        changed, by their ids
+        """
+        previous_items: dict = {item.id: item for item in previous}
+        return [
+            item for item in items
+            if previous_items.get(item.id) != item]
+
+    def _changed_fields(
+            self,
+            previous: streaming_pb2.ResultDetails,
+            result: streaming_pb2.ResultDetails
+            ) -> tuple[streaming_pb2.ResultDetails, list[str]]:
+        details = self.pb2.ResultDetails()
+        changed_fields: list[str] = []
+        for field in result.DESCRIPTOR.fields:
+            value = getattr(result, field.name)
+            previous_value = getattr(previous, field.name)
+            if value == previous_value:
+                continue
+            changed_fields.append(field.name)
+            if field.name == 'inputs':
+                details.inputs.extend(
+                    self._changed_items(previous_value, value))
+            elif field.name in ['playlists', 'thumbnails']:
+                getattr(details, field.name).outputs.extend(
+                    self._changed_items(
+                        previous_value.outputs,
+                        value.outputs))
+            elif field.message_type is not None:
+                getattr(details, field.name).CopyFrom(value)
+            else:
+                setattr(details, field.name, value)
+        return details, changed_fields
+
+    def _job_changes(self,
+                     watched: dict,
+                     request_ids: list[str],
+                     jobs: list[HashSnapshot],
+                     is_resync: bool) -> list[streaming_pb2.JobChange]:
+        """returns the changes of the jobs since their last sent
+        results, watched is the last sent result of every job, the
+        done jobs are removed from it
+        """
+        changes: list[streaming_pb2.JobChange] = []
+        for request_id, job in zip(request_ids, jobs):
+            previous: streaming_pb2.ResultDetails = watched[request_id]
+            result: streaming_pb2.ResultDetails = self._get_result(
+                request_id, job)
+            if result is None:
+                # the job is not found, or it has been expired
+                del watched[request_id]
+                changes.append(self.pb2.JobChange(
+                    tracking_id=request_id,
+                    is_done=True,
+                    not_found=previous is None))
+                continue
+
+            # the stop reason is saved after the FAILED or REVOKED
+            # status, it's waited until it's saved or the next resync
+            is_done = result.status in self.DONE_STATUSES and (
+                result.status == streaming_pb2.FINISHED or
+                result.reason or is_resync)
+
+            if previous is None:
+                change = self.pb2.JobChange(
+                    tracking_id=request_id,
+                    is_snapshot=True,
+                    details=result,
+                    is_done=is_done)
+            else:
+                details, changed_fields = self._changed_fields(
+                    previous, result)
+                if not changed_fields and not is_done:
+                    continue
+                change = self.pb2.JobChange(
+                    tracking_id=request_id,
+                    details=details,
+                    changed_fields=changed_fields,
+                    is_done=is_done)
+
+            if is_done:
+                del watched[request_id]
+            else:
+                watched[request_id] = result
+            changes.append(change)
+        return changes
+
+    def _watch_jobs(self, request, context):
+        # the last sent result of every job, in the order of the request
+        watched: dict = dict.fromkeys(request.tracking_ids)
+        pubsub = self.cache.pubsub(ignore_subscribe_messages=True)
+        try:
+            # subscribe before the snapshots, to not miss a change
+            pubsub.subscribe(*self._channels(watched))
+            request_ids, is_resync = list(watched), False
+            while watched and context.is_active():
+                jobs: list[HashSnapshot] = self.cache.get_snapshots(
+                    *self._job_hashes(request_ids))
+                yield from self._job_changes(
+                    watched, request_ids, jobs, is_resync)
+                if not watched:
+                    break
+                request_ids, is_resync = self._wait_changes(
+                    pubsub.get_message, watched)
+        finally:
+            pubsub.close()
+
+    def _wait_changes(self,
+                      get_message: callable,
+                      watched: dict) -> tuple[list[str], bool]:
+        """returns the changed jobs and False, or all of the watched
+        jobs and True when there is no change until the resync
+        """
+        changed: set = set()
+        deadline = time.monotonic() + self.RESYNC_INTERVAL
+        while not changed:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return list(watched), True
+            message = get_message(timeout=timeout)
+            if message and message['data'] in watched:
+                changed.add(message['data'])
+        # the pending changes are coalesced, to read them at once
+        message = get_message()
+        while message:
+            changed.add(message['data'])
+            message = get_message()
+        return [item for item in watched if item in changed], False
+
+    async def _async_watch_jobs(self, request, context):
+        """same as _watch_jobs for the asyncio server"""
+        watched: dict = dict.fromkeys(request.tracking_ids)
+        pubsub = self.async_cache.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(*self._channels(watched))
+            request_ids, is_resync = list(watched), False
+            while watched:
+                jobs: list[HashSnapshot] = \
+                    await self.async_cache.get_snapshots(
+                        *self._job_hashes(request_ids))
+                for change in self._job_changes(
+                        watched, request_ids, jobs, is_resync):
+                    yield change
+                if not watched:
+                    break
+                request_ids, is_resync = await self._async_wait_changes(
+                    pubsub, watched)
+        finally:
+            await pubsub.close()
+
+    async def _async_wait_changes(self,
+                                  pubsub,
+                                  watched: dict) -> tuple[list[str], bool]:
+        changed: set = set()
+        deadline = time.monotonic() + self.RESYNC_INTERVAL
+        while not changed:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return list(watched), True
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=timeout)
+            if message and message['data'] in watched:
+                changed.add(message['data'])
+        message = await pubsub.get_message(ignore_subscribe_messages=True)
+        while message:
+            changed.add(message['data'])
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True)
+        return [item for item in watched if item in changed], False
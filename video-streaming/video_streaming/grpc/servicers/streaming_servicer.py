@@ -1,15 +1,22 @@
 import pprint
+import asyncio
+import functools
 import traceback
-from video_streaming.cache import RedisCache
+from video_streaming.cache import RedisCache, AsyncRedisCache
+from video_streaming.core.services import CancellationBus, JobIndex, \
+    TenantQuota
 from video_streaming.core.constants import ErrorMessages
 from video_streaming.grpc import exceptions
 from video_streaming.grpc.protos import streaming_pb2_grpc, \
     streaming_pb2
 from .mixins import CreateJobMixin, GetResultsMixin, RevokeJobsMixin, \
-    RevokeOutputsMixin
+    RevokeOutputsMixin, WatchJobsMixin, ListJobsMixin, TenantsUsageMixin
 
 
 class Streaming(
+        TenantsUsageMixin,
+        ListJobsMixin,
+        WatchJobsMixin,
         RevokeOutputsMixin,
         RevokeJobsMixin,
         GetResultsMixin,
@@ -17,6 +24,9 @@ class Streaming(
         streaming_pb2_grpc.StreamingServicer):
 
     cache = RedisCache()
+    cancellation_bus = CancellationBus(cache)
+    job_index = JobIndex(cache)
+    tenant_quota = TenantQuota(cache)
     pb2 = streaming_pb2
 
     def _add_to_server(self, server):
@@ -40,6 +50,13 @@ class Streaming(
         except Exception as exc:
             self._exception_handler(exc)
 
+    def create_jobs(self, request, context):
+        """create a batch of jobs"""
+        try:
+            return self._create_jobs(request, context)
+        except Exception as exc:
+            self._exception_handler(exc)
+
     def get_results(self, request, context):
         """get results for a list of jobs"""
         try:
@@ -62,3 +79,98 @@ class Streaming(
             return self._revoke_job_outputs(request, context)
         except Exception as exc:
             self._exception_handler(exc)
+
+    def list_jobs(self, request, context):
+        """list the jobs by reference_id, statuses and creation time"""
+        try:
+            return self._list_jobs(request, context)
+        except Exception as exc:
+            self._exception_handler(exc)
+
+    def get_tenants_usage(self, request, context):
+        """the usage of the quotas of the tenants"""
+        try:
+            return self._get_tenants_usage(request, context)
+        except Exception as exc:
+            self._exception_handler(exc)
+
+    def watch_jobs(self, request, context):
+        """stream a snapshot of every job and then just the changes
+        of it, until all of the jobs are done
+        """
+        try:
+            yield from self._watch_jobs(request, context)
+        except Exception as exc:
+            self._exception_handler(exc)
+
+
+class AsyncStreaming(Streaming):
+    """StreamingServicer of the asyncio server
+
+    get_results is a coroutine on the async cache, it's the most
+    frequent RPC. the others still call Celery and the sync cache,
+    so they are run on the default executor of the loop to not
+    block it
+    """
+
+    def __init__(self):
+        # the connection pool should be created inside the running loop
+        self.async_cache = AsyncRedisCache()
+
+    async def _run_in_executor(self, method, request, context):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                None,
+                functools.partial(method, request, context))
+        except Exception as exc:
+            self._exception_handler(exc)
+
+    async def create_job(self, request, context):
+        pprint.pprint(request)
+        return await self._run_in_executor(
+            self._create_job, request, context)
+
+    async def create_jobs(self, request, context):
+        """create a batch of jobs"""
+        return await self._run_in_executor(
+            self._create_jobs, request, context)
+
+    async def get_results(self, request, context):
+        """get results for a list of jobs"""
+        try:
+            return await self._async_get_results(request, context)
+        except Exception as exc:
+            self._exception_handler(exc)
+
+    async def revoke_jobs(self, request, context):
+        """force stop a list of jobs
+        to kill job outputs processes and delete all local files
+        """
+        return await self._run_in_executor(
+            self._revoke_jobs, request, context)
+
+    async def revoke_job_outputs(self, request, context):
+        """force stop a list of outputs for one job"""
+        return await self._run_in_executor(
+            self._revoke_job_outputs, request, context)
+
+    async def list_jobs(self, request, context):
+        """list the jobs by reference_id, statuses and creation time"""
+        return await self._run_in_executor(
+            self._list_jobs, request, context)
+
+    async def get_tenants_usage(self, request, context):
+        """the usage of the quotas of the tenants"""
+        return await self._run_in_executor(
+            self._get_tenants_usage, request, context)
+
+    async def watch_jobs(self, request, context):
+        """stream a snapshot of every job and then just the changes
+        of it, until all of the jobs are done
+        """
+        try:
+            async for change in self._async_watch_jobs(request, context):
+                yield change
+        except Exception as exc:
+            self._exception_handler(exc)
@@ -27,6 +27,50 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_BROKER_HEARTBEAT = 60
 
+# queues of the I/O-bound and CPU-bound tasks, to run them on separate
+# worker pools, checks, downloads, uploads and webhooks are not waiting
+# behind the encodes
+CELERY_IO_QUEUE = env_config.get(
+    "CELERY_IO_QUEUE",
+    default="io",
+    cast=str)
+CELERY_CPU_QUEUE = env_config.get(
+    "CELERY_CPU_QUEUE",
+    default="cpu",
+    cast=str)
+
+# the tasks that run ffmpeg to process the videos, the others are
+# I/O-bound
+CPU_BOUND_TASKS = [
+    'create_playlist',
+    'encode_playlist_chunk',
+    'encode_shared_renditions',
+    'stitch_playlist_chunks',
+    'add_watermark',
+    'generate_thumbnail',
+]
+CELERY_TASK_DEFAULT_QUEUE = CELERY_IO_QUEUE
+CELERY_TASK_ROUTES = {
+    name: {'queue': CELERY_CPU_QUEUE} for name in CPU_BOUND_TASKS}
+# the tasks are acknowledged after running them, with the prefetch
+# multiplier of 1 of the workers, a worker reserves just the tasks
+# that it's running, and the waiting tasks are delivered by their
+# priorities
+CELERY_TASK_ACKS_LATE = True
+
+# message priorities of the lanes of JobPriority, all tasks of a job are
+# sent by the priority of its lane and the queues deliver the higher
+# priorities first, the tasks that are sent by a task inherit its
+# priority, e.g. the chunks of a playlist
+JOB_PRIORITIES = {
+    'LOW': 0,
+    'NORMAL': 5,
+    'HIGH': 9,
+}
+CELERY_TASK_QUEUE_MAX_PRIORITY = max(JOB_PRIORITIES.values())
+CELERY_TASK_DEFAULT_PRIORITY = JOB_PRIORITIES['NORMAL']
+CELERY_TASK_INHERIT_PARENT_PRIORITY = True
+
 
 # load task modules from modules
 AUTO_DISCOVER_TASKS = [
@@ -80,6 +124,59 @@ DEFAULT_ENCODE_FORMAT = env_config.get(
     default="h264",
     cast=str)
 
+# Split the input into chunks of about this seconds to encode a
+# playlist in parallel on many workers, 0 to encode it on one worker.
+# TMP_PROCESSED_DIR must be shared between workers to use it
+DEFAULT_CHUNK_DURATION = env_config.get(
+    "DEFAULT_CHUNK_DURATION",
+    default=0,
+    cast=int)
+
+# Upload the finished segments of a playlist while ffmpeg is still
+# encoding it, the rest of files will be uploaded by upload_directory
+UPLOAD_SEGMENTS_WHILE_PROCESSING = env_config.get(
+    "UPLOAD_SEGMENTS_WHILE_PROCESSING",
+    default=True,
+    cast=bool)
+
+# Process the video input by a presigned url of S3, instead of waiting
+# for the download of the whole input
+DEFAULT_STREAM_INPUT = env_config.get(
+    "DEFAULT_STREAM_INPUT",
+    default=False,
+    cast=bool)
+
+# Download a streaming input alongside the processing, the outputs
+# that start after the download will use the local input
+STREAM_INPUT_TEE = env_config.get(
+    "STREAM_INPUT_TEE",
+    default=True,
+    cast=bool)
+
+# Minimum seconds between two saves of the progress of an input or
+# output, the updates between them are coalesced to the last one
+PROGRESS_MIN_INTERVAL = env_config.get(
+    "PROGRESS_MIN_INTERVAL",
+    default=1.0,
+    cast=float)
+
+# Minimum change of the progress to save it, as a fraction of total
+PROGRESS_MIN_DELTA = env_config.get(
+    "PROGRESS_MIN_DELTA",
+    default=0.01,
+    cast=float)
+
+# Seconds between two samples of the resource usage of a ffmpeg
+# process, and between two saves of the summary of the samples
+RESOURCE_SAMPLE_INTERVAL = env_config.get(
+    "RESOURCE_SAMPLE_INTERVAL",
+    default=0.5,
+    cast=float)
+RESOURCE_PUBLISH_INTERVAL = env_config.get(
+    "RESOURCE_PUBLISH_INTERVAL",
+    default=5.0,
+    cast=float)
+
 
 ##################################################
 #    S3 Object Storage                           #
@@ -127,6 +224,13 @@ S3_DEFAULT_OUTPUT_BUCKET_NAME = env_config.get(
     default=S3_DEFAULT_BUCKET,
     cast=str)
 
+# Seconds that a presigned url of a streaming input is valid, it should
+# be more than the processing time of the outputs
+S3_PRESIGNED_URL_EXPIRES_IN = env_config.get(
+    "S3_PRESIGNED_URL_EXPIRES_IN",
+    default=24 * 60 * 60,  # 1 day
+    cast=int)
+
 """
 Configuration object for managed S3 transfers
 """
@@ -188,6 +292,13 @@ S3_TRANSFER_USE_THREADS = env_config.get(
     default=True,
     cast=bool)
 
+# The maximum number of files that will be uploaded concurrently by
+# S3Service.upload_files, e.g. the segments of a playlist
+S3_UPLOAD_MAX_IN_FLIGHT = env_config.get(
+    "S3_UPLOAD_MAX_IN_FLIGHT",
+    default=20,
+    cast=int)
+
 ##################################################
 #    File System                                 #
 ##################################################
@@ -202,6 +313,18 @@ TMP_PROCESSED_DIR = env_config.get(
     "TMP_PROCESSED_DIR",
     default="",
     cast=str)
+# directory of the inputs cache that is shared between jobs, it should
+# be on the file system of TMP_DOWNLOADED_DIR to hardlink the inputs,
+# default is "inputs_cache" in TMP_DOWNLOADED_DIR
+INPUT_CACHE_DIR = env_config.get(
+    "INPUT_CACHE_DIR",
+    default="",
+    cast=str)
+# maximum bytes of the inputs cache, 0 to disable it
+INPUT_CACHE_MAX_SIZE = env_config.get(
+    "INPUT_CACHE_MAX_SIZE",
+    default=0,
+    cast=int)
 
 ##################################################
 #    FFmpeg                                      #
@@ -216,6 +339,91 @@ FFMPEG_BIN_PATH = env_config.get(
     default="/usr/local/bin/ffmpeg",
     cast=str)
 
+# CPU slots of a node that are shared between the ffmpeg processes of
+# all workers of it, an encoding task acquires slots by its cost before
+# running ffmpeg. 0 means the number of CPUs of the node
+CPU_SLOTS = env_config.get(
+    "CPU_SLOTS",
+    default=0,
+    cast=int)
+# directory of the lock files of the CPU slots, it must not be shared
+# between nodes, default is "cpu_slots" in the temporary directory
+CPU_SLOTS_DIR = env_config.get(
+    "CPU_SLOTS_DIR",
+    default="",
+    cast=str)
+# seconds that a task waits for its CPU slots, before re-queueing it
+CPU_SLOTS_WAIT_TIMEOUT = env_config.get(
+    "CPU_SLOTS_WAIT_TIMEOUT",
+    default=300.0,
+    cast=float)
+# seconds after that a re-queued task is run again
+CPU_SLOTS_RETRY_COUNTDOWN = env_config.get(
+    "CPU_SLOTS_RETRY_COUNTDOWN",
+    default=10,
+    cast=int)
+
+# drop the representations that are higher than the input video, and
+# cap the bitrate of the representations by the bitrate of it, the
+# pruned representations are returned by the results of the outputs
+PRUNE_REPRESENTATIONS_TO_SOURCE = env_config.get(
+    "PRUNE_REPRESENTATIONS_TO_SOURCE",
+    default=True,
+    cast=bool)
+
+# per title representations of a playlist, some samples of the video are
+# encoded by PER_TITLE_CRF to measure the bitrates that it needs
+PER_TITLE_SAMPLES = env_config.get(
+    "PER_TITLE_SAMPLES",
+    default=3,
+    cast=int)
+# seconds of every sample
+PER_TITLE_SAMPLE_DURATION = env_config.get(
+    "PER_TITLE_SAMPLE_DURATION",
+    default=4.0,
+    cast=float)
+PER_TITLE_CRF = env_config.get(
+    "PER_TITLE_CRF",
+    default=23,
+    cast=int)
+# the bitrate of a representation is between these factors of its
+# requested bitrate
+PER_TITLE_MIN_FACTOR = env_config.get(
+    "PER_TITLE_MIN_FACTOR",
+    default=0.25,
+    cast=float)
+PER_TITLE_MAX_FACTOR = env_config.get(
+    "PER_TITLE_MAX_FACTOR",
+    default=1.5,
+    cast=float)
+# a representation is dropped when the higher representation is not
+# this times of its bitrate
+PER_TITLE_MIN_BITRATE_STEP = env_config.get(
+    "PER_TITLE_MIN_BITRATE_STEP",
+    default=1.3,
+    cast=float)
+
+# copy the H.264 video and the AAC audio of the input to the matching
+# representations of the playlists, instead of encoding them again
+STREAM_COPY_MATCHING_REPRESENTATIONS = env_config.get(
+    "STREAM_COPY_MATCHING_REPRESENTATIONS",
+    default=True,
+    cast=bool)
+# the copied video keeps the keyframes of the input, its segments are
+# aligned with the encoded representations just when the keyframe
+# interval of the input divides the segment duration, so it's only
+# for the inputs that are known to be aligned
+STREAM_COPY_VIDEO = env_config.get(
+    "STREAM_COPY_VIDEO",
+    default=False,
+    cast=bool)
+# a stream of the input is copied when its bitrate is not more than
+# this times of the bitrate of the representation
+STREAM_COPY_BITRATE_TOLERANCE = env_config.get(
+    "STREAM_COPY_BITRATE_TOLERANCE",
+    default=1.1,
+    cast=float)
+
 ##################################################
 #    Redis                                       #
 ##################################################
@@ -230,3 +438,75 @@ REDIS_URL = env_config.get(
     default="",
     cast=str
 )
+
+# Maximum jobs and seconds that JOB_DETAILS of a job is kept in memory
+# of a worker process, to not read it from Redis by every task
+JOB_DETAILS_MEMORY_CACHE_SIZE = env_config.get(
+    "JOB_DETAILS_MEMORY_CACHE_SIZE",
+    default=1000,
+    cast=int)
+JOB_DETAILS_MEMORY_CACHE_TIMEOUT = env_config.get(
+    "JOB_DETAILS_MEMORY_CACHE_TIMEOUT",
+    default=60.0,
+    cast=float)
+
+# Seconds that a watch_jobs stream waits for a change of its jobs,
+# before reading them again, to not miss a change that has been not
+# notified
+WATCH_JOBS_RESYNC_INTERVAL = env_config.get(
+    "WATCH_JOBS_RESYNC_INTERVAL",
+    default=10.0,
+    cast=float)
+
+##################################################
+#    Tenants                                     #
+##################################################
+
+# the tenant of a job without tenant_id is the part of its reference_id
+# before this separator, or DEFAULT_TENANT
+TENANT_REFERENCE_SEPARATOR = env_config.get(
+    "TENANT_REFERENCE_SEPARATOR",
+    default=":",
+    cast=str)
+DEFAULT_TENANT = env_config.get(
+    "DEFAULT_TENANT",
+    default="default",
+    cast=str)
+# concurrent encodes and downloads of all workers, that are shared
+# between the tenants by their weights, 0 to disable the quotas
+TENANT_ENCODES_CAPACITY = env_config.get(
+    "TENANT_ENCODES_CAPACITY",
+    default=0,
+    cast=int)
+TENANT_DOWNLOADS_CAPACITY = env_config.get(
+    "TENANT_DOWNLOADS_CAPACITY",
+    default=0,
+    cast=int)
+# maximum concurrent encodes and downloads of a tenant, 0 means there
+# is no limit except its share
+TENANT_MAX_ENCODES = env_config.get(
+    "TENANT_MAX_ENCODES",
+    default=0,
+    cast=int)
+TENANT_MAX_DOWNLOADS = env_config.get(
+    "TENANT_MAX_DOWNLOADS",
+    default=0,
+    cast=int)
+# weights of the tenants as "tenant:weight,tenant:weight", the weight
+# of the others is 1
+TENANT_WEIGHTS = env_config.get(
+    "TENANT_WEIGHTS",
+    default="",
+    cast=str)
+# seconds of the lease of a slot, it's renewed while the task is
+# running and it's released by expiring when the worker is killed
+TENANT_SLOT_LEASE = env_config.get(
+    "TENANT_SLOT_LEASE",
+    default=60,
+    cast=int)
+# seconds after that a deferred task of an over-quota tenant is tried
+# again
+TENANT_RETRY_COUNTDOWN = env_config.get(
+    "TENANT_RETRY_COUNTDOWN",
+    default=15,
+    cast=int)